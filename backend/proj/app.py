@@ -1,10 +1,15 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from database import Base, engine
-from sqlalchemy import inspect
-from sqlalchemy.exc import OperationalError
+from utils.compresion import CompresionMiddleware
+from utils.etag import ETagMiddleware
+from utils.metricas_sql import MetricasSQLMiddleware
+from utils.metricas import MetricasMiddleware, registrar_cache_lru, registrar_pool
+from utils import estaticos, respuestas
+from utils.estaticos import ArchivosEstaticos
+from database import engine
+from utils.migraciones import verificar_esquema
+from utils.cambios import monitor_versiones
 from contextlib import asynccontextmanager
 from routes.roles_routes import router as roles_router
 from routes.usuarios_routes import router as usuarios_router
@@ -21,37 +26,27 @@ from routes.detalle_factura_routes import router as detalle_factura_router
 from routes.catalogo_pdf_routes import router as catalogo_pdf_router
 from routes.ubicacion_cliente_routes import router as ubicacion_cliente_router
 from routes.ruta_routes import router as ruta_router
+from routes.metricas_routes import router as metricas_router
+from routes.salud_routes import router as salud_router
+from routes.sync_routes import router as sync_router
 import uvicorn
 
-# Función para verificar si las tablas existen
-def check_tables_exist():
-    inspector = inspect(engine)
-    required_tables = [
-        'roles', 'usuarios', 'categoria', 'marca', 'productos',
-        'ubicacion_cliente', 'cliente', 'ruta', 'asignacion_ruta',
-        'pedido', 'estado_pedido', 'detalle_pedido',
-        'factura', 'detalle_factura'
-    ]
-    
-    existing_tables = inspector.get_table_names()
-    return all(table in existing_tables for table in required_tables)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Código de inicio (startup)
-    try:
-        if not check_tables_exist():
-            print("Creando tablas en la base de datos...")
-            Base.metadata.create_all(bind=engine)
-            print("Tablas creadas exitosamente!")
-        else:
-            print("Todas las tablas ya existen en la base de datos")
-    except OperationalError as e:
-        print(f"Error al conectar con la base de datos: {e}")
-        raise
-    
+    # Código de inicio (startup): una consulta a schema_version. Si el
+    # esquema está atrasado el worker no arranca: las migraciones se corren
+    # con scripts/migrar.py o en el on_starting de gunicorn, no en cada
+    # worker (MIGRAR_AL_INICIAR=auto para migrar aquí en desarrollo).
+    version = verificar_esquema(engine)
+    print(f"Esquema de base de datos en la versión {version}")
+    # Hilo del worker que lee registro_cambio e invalida las cachés en memoria
+    # cuando otro worker confirma cambios
+    monitor_versiones.iniciar(engine)
+
     yield
 
+    monitor_versiones.detener()
+
 # Crear la aplicación con el lifespan manager
 app = FastAPI(lifespan=lifespan)
 
@@ -68,9 +63,12 @@ app.include_router(estado_pedido_router)
 app.include_router(detalle_pedido_router)
 app.include_router(factura_router)
 app.include_router(detalle_factura_router)
-app.include_router(catalogo_pdf_router, prefix="/api", tags=["Catálogo PDF"])
+app.include_router(catalogo_pdf_router)
 app.include_router(ubicacion_cliente_router)
 app.include_router(ruta_router)
+app.include_router(metricas_router)
+app.include_router(salud_router)
+app.include_router(sync_router)
 
 
 # Configurar CORS
@@ -82,11 +80,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETag de los listados con GET condicional (dependencias/etag.py)
+app.add_middleware(ETagMiddleware)
+
+# Comprimir respuestas JSON/texto grandes (Brotli si está disponible, si no GZip)
+app.add_middleware(CompresionMiddleware, minimum_size=1024)
+
+# Latencia por plantilla de ruta, requests en curso y consultas para /metrics
+app.add_middleware(MetricasMiddleware)
+registrar_pool(engine)
+registrar_cache_lru("etag_estaticos", estaticos._etag_contenido)
+registrar_cache_lru("adaptadores_respuesta", respuestas._adaptador_lista)
+
+# Consultas SQL y tiempo de base de datos por request (headers X-DB-* y log;
+# umbrales en UMBRAL_REQUEST_LENTO_MS y UMBRAL_CONSULTAS_REQUEST)
+app.add_middleware(MetricasSQLMiddleware)
+
 # Crear directorio de uploads si no existe
 os.makedirs("uploads/productos", exist_ok=True)
 
-# Montar archivos estáticos
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Montar archivos estáticos (cache inmutable, ETag y variantes WebP/precomprimidas)
+app.mount("/uploads", ArchivosEstaticos(directory="uploads"), name="uploads")
 
+# Solo para desarrollo; en producción: gunicorn -c gunicorn.conf.py app:app
 if __name__ == "__main__":
     uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -1,8 +1,11 @@
 from datetime import timedelta
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from models.models import Usuario
-from utils.security import verify_password_with_salt, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.security import (
+    verify_password_with_salt, verify_password, create_access_token, create_refresh_token,
+    build_user_claims, verify_token, revoke_token, ACCESS_TOKEN_EXPIRE_MINUTES
+)
 
 def authenticate_user(db: Session, rucempresarial: str, correo: str, contrasena: str) -> Usuario:
     """
@@ -58,16 +61,18 @@ def login(db: Session, rucempresarial: str, correo: str, contrasena: str):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Crear token de acceso
+        # Crear token de acceso (con rol y estado firmados) y token de refresco
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": usuario.identificacion}, 
+            data=build_user_claims(usuario), 
             expires_delta=access_token_expires
         )
+        refresh_token = create_refresh_token(usuario.identificacion)
         
         # Retornar respuesta consistente con lo que espera el frontend
         return {
             "access_token": access_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer",
             "user": {
                 "identificacion": usuario.identificacion,
@@ -89,4 +94,53 @@ def login(db: Session, rucempresarial: str, correo: str, contrasena: str):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor"
-        )
\ No newline at end of file
+        )
+
+def refresh(db: Session, refresh_token: str):
+    """
+    Emite un nuevo par de tokens a partir de un token de refresco válido,
+    sin volver a verificar la contraseña (rotación: el token usado se revoca)
+    """
+    payload = verify_token(refresh_token, db, expected_type="refresh")
+    
+    usuario = db.query(Usuario).options(joinedload(Usuario.rol)).filter(
+        Usuario.identificacion == payload.get("sub")
+    ).first()
+    if not usuario or usuario.estado != 'activo':
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario no encontrado o inactivo",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not revoke_token(db, payload):
+        # Otro request ya rotó este refresh token
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    access_token = create_access_token(
+        data=build_user_claims(usuario),
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": create_refresh_token(usuario.identificacion),
+        "token_type": "bearer"
+    }
+
+def logout(db: Session, access_payload: dict = None, refresh_token: str = None):
+    """
+    Revoca el token de acceso actual y, si se envía, el token de refresco
+    """
+    if access_payload:
+        revoke_token(db, access_payload)
+    if refresh_token:
+        try:
+            revoke_token(db, verify_token(refresh_token, db, expected_type="refresh"))
+        except HTTPException:
+            # Un refresh token inválido o ya revocado no impide cerrar sesión
+            pass
+    return {"mensaje": "Logout exitoso"}
@@ -2,7 +2,8 @@ from pydoc import doc
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, 
+    BaseDocTemplate, PageTemplate, Frame, NextPageTemplate, ActionFlowable,
+    Table, TableStyle, Paragraph, Spacer,
     Image as ReportLabImage, PageBreak, KeepTogether
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -11,10 +12,17 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from sqlalchemy.orm import Session
 from controllers.producto_controller import get_productos
+from utils.imagenes import ruta_variante
+from utils.metricas import cache_aciertos, cache_fallos, medir_render
 from datetime import datetime
 import os
+import shutil
 import tempfile
+import itertools
+import multiprocessing
 import requests
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
 from io import BytesIO
 from PIL import Image as PILImage
 import logging
@@ -23,6 +31,94 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # pypdf es opcional: sin él el catálogo se genera en un solo proceso
+    PdfReader = PdfWriter = None
+
+PRODUCTOS_POR_FILA = 4
+# Flowables que se generan de una vez mientras doc.build consume el catálogo
+TAMANO_LOTE_FLOWABLES = 16
+# Miniaturas (JPEG de pocos KB) que se reutilizan dentro de una generación
+MAX_MINIATURAS_EN_CACHE = 512
+# Modo paralelo: cada categoría se renderiza en un proceso aparte.
+# CATALOGO_PDF_PROCESOS=0 usa todos los núcleos; 1 desactiva el modo paralelo.
+PROCESOS_CATALOGO = int(os.getenv("CATALOGO_PDF_PROCESOS", "0"))
+# Por debajo de esto arrancar los procesos cuesta más de lo que se gana
+MIN_PRODUCTOS_PARALELO = 2000
+
+
+class _FlowablesPerezosos(list):
+    """
+    Lista de flowables que se rellena desde un generador a medida que
+    doc.build la consume (build solo usa len, [0], del [0] e inserciones al
+    inicio). Así nunca hay más que un lote de filas del catálogo en memoria.
+    """
+
+    def __init__(self, generador, tamano_lote: int = TAMANO_LOTE_FLOWABLES):
+        super().__init__()
+        self._generador = generador
+        self._tamano_lote = tamano_lote
+
+    def __len__(self):
+        if list.__len__(self) == 0 and self._generador is not None:
+            self.extend(itertools.islice(self._generador, self._tamano_lote))
+            if list.__len__(self) == 0:
+                self._generador = None
+        return list.__len__(self)
+
+
+class _CategoriaActual(ActionFlowable):
+    """Indica al documento la categoría cuya portada se dibuja en la próxima página"""
+
+    def __init__(self, nombre: str):
+        ActionFlowable.__init__(self, ('categoriaActual', nombre))
+
+
+class _ImagenProducto(ReportLabImage):
+    """Imagen en memoria que suelta su buffer apenas se dibuja en la página"""
+
+    def __init__(self, buffer: BytesIO, width, height):
+        super().__init__(buffer, width=width, height=height)
+        self._buffer = buffer
+
+    def draw(self):
+        super().draw()
+        self._img = self._file = None
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+
+class _DocumentoCatalogo(BaseDocTemplate):
+    """
+    Documento con plantillas de página: portada, portada de categoría y productos.
+    Una sección renderizada aparte empieza en la plantilla 'categoria' y no
+    numera sus páginas (el número global se estampa al unir las partes).
+    """
+
+    def __init__(self, filename, generador, plantilla_inicial='portada', categoria_actual="",
+                 numerar_paginas=True, **kwargs):
+        BaseDocTemplate.__init__(self, filename, **kwargs)
+        self.categoria_actual = categoria_actual
+        self.numerar_paginas = numerar_paginas
+        marco = lambda: Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        plantillas = [
+            PageTemplate(id='portada', frames=[marco()], onPage=generador.create_cover_page),
+            PageTemplate(
+                id='categoria', frames=[marco()],
+                onPage=lambda canvas, doc: generador.create_category_page(canvas, doc, doc.categoria_actual)
+            ),
+            PageTemplate(id='productos', frames=[marco()], onPage=generador.create_standard_header),
+        ]
+        # La primera plantilla de la lista es la de la primera página
+        plantillas.sort(key=lambda plantilla: plantilla.id != plantilla_inicial)
+        self.addPageTemplates(plantillas)
+
+    def handle_categoriaActual(self, nombre):
+        self.categoria_actual = nombre
+
+
 class ProfessionalCatalogoPDF:
     def __init__(self):
         self.styles = getSampleStyleSheet()
@@ -119,53 +215,188 @@ class ProfessionalCatalogoPDF:
     def generate_catalog_pdf(self, db: Session, filters: dict = None):
         """Generar PDF del catálogo profesional"""
         try:
-            elements = self.create_professional_catalog(db, filters)
+            productos_por_categoria = self.create_professional_catalog(db, filters)
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            
-            # Configuración de documento con márgenes ajustados
-            doc = SimpleDocTemplate(
-                temp_file.name, 
-                pagesize=A4,
-                topMargin=self.top_margin,
-                bottomMargin=self.bottom_margin,
-                leftMargin=self.left_margin,
-                rightMargin=self.right_margin
-            )
-            
-            # Variable para controlar el tipo de página
-            self.page_type = 'cover'
-            self.category_names = list(self.group_products_by_category(get_productos(db)).keys())
-            self.current_category_index = 0
-            
-            doc.build(
-                elements,
-                onFirstPage=self.create_cover_page,
-                onLaterPages=self.handle_page_types
-            )
-            
-            self.cleanup_temp_files()
+            temp_file.close()
+
+            procesos = self.parallel_processes(productos_por_categoria)
+            if procesos > 1:
+                try:
+                    self.build_catalog_parallel(temp_file.name, productos_por_categoria, procesos)
+                    return temp_file.name
+                except Exception as e:
+                    logger.warning(f"Catálogo en paralelo falló, se genera en un solo proceso: {e}")
+
+            self.build_catalog(temp_file.name, productos_por_categoria)
             return temp_file.name
-            
+
         except Exception as e:
             logger.error(f"Error al generar PDF: {e}")
             raise Exception(f"Error al generar PDF: {str(e)}")
 
-    def handle_page_types(self, canvas, doc):
-        """Manejar diferentes tipos de páginas"""
-        # Determinar si es página de categoría basándose en el número de página
-        # Página 1: Portada
-        # Página 2, 4, 6, etc.: Páginas de categoría 
-        # Página 3, 5, 7, etc.: Páginas de productos
-        
-        if doc.page == 1:
-            # Esta es la portada, ya manejada
-            return
-        elif (doc.page - 2) % 2 == 0:  # Páginas pares después de portada = categorías
-            category_index = (doc.page - 2) // 2
-            if category_index < len(self.category_names):
-                self.create_category_page(canvas, doc, self.category_names[category_index])
-        else:  # Páginas impares después de portada = productos
-            self.create_standard_header(canvas, doc)
+    def _create_document(self, destino, **opciones):
+        # Configuración de documento con márgenes ajustados
+        return _DocumentoCatalogo(
+            destino,
+            self,
+            pagesize=A4,
+            topMargin=self.top_margin,
+            bottomMargin=self.bottom_margin,
+            leftMargin=self.left_margin,
+            rightMargin=self.right_margin,
+            **opciones
+        )
+
+    def build_catalog(self, destino, productos_por_categoria: dict, streaming: bool = True):
+        """
+        Renderizar el catálogo en `destino` (ruta o archivo).
+        En modo streaming los flowables se generan por categoría a medida que
+        se dibujan las páginas, en lugar de armar la lista completa antes de
+        doc.build. Devuelve el número de páginas.
+        """
+        doc = self._create_document(destino)
+        flujo = self.catalog_flowables(productos_por_categoria, miniaturas={})
+        doc.build(_FlowablesPerezosos(flujo) if streaming else list(flujo))
+        return doc.page
+
+    def build_section(self, destino, categoria_nombre: str, productos_categoria: list):
+        """Renderizar una sola categoría (su portada y sus productos), sin números de página"""
+        doc = self._create_document(
+            destino, plantilla_inicial='categoria', categoria_actual=categoria_nombre, numerar_paginas=False
+        )
+        flujo = self.category_flowables(categoria_nombre, productos_categoria, miniaturas={}, nueva_pagina=False)
+        doc.build(_FlowablesPerezosos(flujo))
+        return doc.page
+
+    def parallel_processes(self, productos_por_categoria: dict) -> int:
+        """Procesos a usar para el catálogo; 1 = renderizar en este proceso"""
+        if PdfWriter is None or len(productos_por_categoria) < 2:
+            return 1
+        if sum(len(productos) for productos in productos_por_categoria.values()) < MIN_PRODUCTOS_PARALELO:
+            return 1
+        procesos = PROCESOS_CATALOGO or os.cpu_count() or 1
+        return min(procesos, len(productos_por_categoria))
+
+    def build_catalog_parallel(self, destino, productos_por_categoria: dict, procesos: int):
+        """
+        Renderizar cada categoría en un proceso aparte y unir las partes con
+        pypdf: portada, luego las secciones en orden alfabético, y al final se
+        estampa el número de página global en las páginas de productos.
+        Devuelve el número de páginas.
+        """
+        if PdfWriter is None:
+            raise RuntimeError("pypdf no está instalado")
+
+        secciones = list(productos_por_categoria.items())
+        directorio = tempfile.mkdtemp(prefix='catalogo_')
+        try:
+            rutas = [os.path.join(directorio, f'seccion_{i}.pdf') for i in range(len(secciones))]
+            # spawn: los hijos no heredan los hilos ni las conexiones a la base del servidor
+            contexto = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+                # Las secciones más grandes primero, para repartir mejor la carga
+                orden = sorted(range(len(secciones)), key=lambda i: len(secciones[i][1]), reverse=True)
+                futuros = {
+                    i: pool.submit(
+                        _renderizar_seccion,
+                        rutas[i],
+                        secciones[i][0],
+                        [_producto_para_seccion(producto) for producto in secciones[i][1]],
+                    )
+                    for i in orden
+                }
+                paginas_por_seccion = [futuros[i].result() for i in range(len(secciones))]
+
+            portada = os.path.join(directorio, 'portada.pdf')
+            self.build_catalog(portada, {})
+            return self.merge_sections(destino, portada, list(zip(rutas, paginas_por_seccion)))
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def merge_sections(self, destino, portada, partes: list):
+        """Unir la portada y las secciones [(ruta, páginas)] y numerar las páginas de productos"""
+        writer = PdfWriter()
+        writer.append(portada)
+        paginas_productos = []
+        for ruta, paginas in partes:
+            inicio = len(writer.pages)
+            writer.append(ruta)
+            # La primera página de cada sección es la portada de la categoría
+            paginas_productos.extend(range(inicio + 1, inicio + paginas))
+
+        numeros = PdfReader(self.page_number_overlay([indice + 1 for indice in paginas_productos]))
+        for indice, pagina_numero in zip(paginas_productos, numeros.pages):
+            writer.pages[indice].merge_page(pagina_numero)
+            # merge_page deja el contenido de la página sin comprimir
+            writer.pages[indice].compress_content_streams()
+
+        writer.write(destino)
+        return len(writer.pages)
+
+    def page_number_overlay(self, numeros: list) -> BytesIO:
+        """PDF con una página por número, que solo contiene el 'Página N' del encabezado"""
+        buffer = BytesIO()
+        lienzo = canvas.Canvas(buffer, pagesize=A4)
+        for numero in numeros:
+            self.draw_page_number(lienzo, numero)
+            lienzo.showPage()
+        lienzo.save()
+        buffer.seek(0)
+        return buffer
+
+    def catalog_flowables(self, productos_por_categoria: dict, miniaturas: dict = None):
+        """Generador de flowables: portada y luego cada categoría"""
+        # Página de portada
+        yield Spacer(1, 10)
+        for categoria_nombre, productos_categoria in productos_por_categoria.items():
+            yield from self.category_flowables(categoria_nombre, productos_categoria, miniaturas)
+
+    def category_flowables(self, categoria_nombre: str, productos_categoria: list, miniaturas: dict = None,
+                           nueva_pagina: bool = True):
+        """
+        Generador de flowables de una categoría: su portada y el grid de productos.
+        Con nueva_pagina=False la portada de la categoría es la página en curso
+        (una sección renderizada como documento propio).
+        """
+        # 1. Página de categoría (portada de la categoría)
+        if nueva_pagina:
+            yield _CategoriaActual(categoria_nombre)
+            yield NextPageTemplate('categoria')
+            yield PageBreak()
+        yield Spacer(1, 10)
+
+        # 2. Páginas de productos de la categoría
+        yield NextPageTemplate('productos')
+        yield PageBreak()
+        yield Spacer(1, 50)  # Espacio para header
+
+        # Grid de productos - 4 columnas; las celdas se crean recién al pedir la fila
+        for inicio in range(0, len(productos_categoria), PRODUCTOS_POR_FILA):
+            fila = productos_categoria[inicio:inicio + PRODUCTOS_POR_FILA]
+            yield self.create_product_row(fila, miniaturas)
+            yield Spacer(1, 10)
+
+    def create_product_row(self, productos_fila: list, miniaturas: dict = None):
+        """Crear la tabla de una fila del grid de productos"""
+        current_row = [self.create_professional_product_cell(producto, miniaturas) for producto in productos_fila]
+        col_width = (self.content_width - 0.5*inch) / PRODUCTOS_POR_FILA
+
+        row_table = Table(
+            [current_row],
+            colWidths=[col_width] * len(current_row),
+            rowHeights=[2.5*inch]
+        )
+
+        row_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 4),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]))
+
+        return KeepTogether(row_table)
 
     def create_cover_page(self, canvas, doc):
         """Crear página de portada completa - SIN cuadrados blancos"""
@@ -302,15 +533,22 @@ class ProfessionalCatalogoPDF:
             "CATÁLOGO DE PRODUCTOS"
         )
         
-        # Número de página
+        canvas.restoreState()
+
+        # Número de página (en las secciones en paralelo se estampa al unir)
+        if doc.numerar_paginas:
+            self.draw_page_number(canvas, doc.page)
+
+    def draw_page_number(self, canvas, numero):
+        """Número de página en la esquina superior derecha del encabezado"""
+        canvas.saveState()
         canvas.setFont('Helvetica', 9)
         canvas.setFillColor(self.colors['medium_gray'])
         canvas.drawRightString(
-            doc.width + doc.leftMargin, 
-            doc.height + doc.topMargin - 30, 
-            f"Página {doc.page}"
+            self.page_width - self.right_margin,
+            self.page_height - self.bottom_margin - 30,
+            f"Página {numero}"
         )
-        
         canvas.restoreState()
 
     def download_and_process_image(self, image_url, max_size=(80, 80)):
@@ -344,8 +582,11 @@ class ProfessionalCatalogoPDF:
             else:
                 image_path = os.path.join(project_root, image_url.lstrip('/'))
 
-            # Abrir imagen local
+            # Abrir imagen local (la variante miniatura si la imagen tiene variantes)
             if 'image_path' in locals():
+                miniatura = ruta_variante(image_path, 'thumb')
+                if miniatura and os.path.exists(miniatura):
+                    image_path = miniatura
                 if os.path.exists(image_path):
                     img = PILImage.open(image_path)
                 else:
@@ -355,87 +596,31 @@ class ProfessionalCatalogoPDF:
             img = img.convert('RGB')
             img.thumbnail(max_size, PILImage.Resampling.LANCZOS)
 
-            # Crear archivo temporal
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            img.save(temp_file.name, 'JPEG', quality=90)
-            temp_file.close()
+            # Miniatura en memoria: se libera al dibujarse la página
+            buffer = BytesIO()
+            img.save(buffer, 'JPEG', quality=90)
+            buffer.seek(0)
 
-            return temp_file.name
+            return buffer
 
         except Exception as e:
             logger.error(f"Error al procesar imagen {image_url}: {str(e)}")
             return None
 
     def create_professional_catalog(self, db: Session, filters: dict = None):
-        """Crear catálogo profesional organizado por categorías - CON páginas de productos"""
-        productos = get_productos(db)
-        
-        if filters:
-            productos = self.apply_filters(productos, filters)
-            
-        elements = []
-        
-        # Página de portada
-        elements.append(Spacer(1, 10))
-        elements.append(PageBreak())
-        
-        # Agrupar productos por categoría
+        """Obtener los productos del catálogo agrupados por categoría"""
+        # Los filtros se aplican en SQL: solo llegan los productos que coinciden
+        productos = get_productos(db, filters)
         productos_por_categoria = self.group_products_by_category(productos)
-        
-        # Crear secciones por categoría
-        for i, (categoria_nombre, productos_categoria) in enumerate(productos_por_categoria.items()):
-            # 1. Página de categoría (portada de la categoría)
-            elements.append(Spacer(1, 10))
-            elements.append(PageBreak())
-            
-            # 2. Página de productos de la categoría
-            elements.append(Spacer(1, 50))  # Espacio para header
-            
-            # Grid de productos - 4 columnas
-            products_per_row = 4
-            current_row = []
-            
-            for j, producto in enumerate(productos_categoria):
-                product_cell = self.create_professional_product_cell(producto)
-                current_row.append(product_cell)
-                
-                # Completar fila o último producto de la categoría
-                if len(current_row) == products_per_row or j == len(productos_categoria) - 1:
-                    actual_cols = len(current_row)
-                    col_width = (self.content_width - 0.5*inch) / products_per_row
-                    
-                    # Crear tabla para la fila
-                    row_table = Table(
-                        [current_row], 
-                        colWidths=[col_width] * actual_cols,
-                        rowHeights=[2.5*inch]
-                    )
-                    
-                    row_table.setStyle(TableStyle([
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                        ('TOPPADDING', (0, 0), (-1, -1), 8),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                    ]))
-                    
-                    elements.append(KeepTogether(row_table))
-                    elements.append(Spacer(1, 10))
-                    current_row = []
-            
-            # Agregar página break después de los productos (excepto la última categoría)
-            if i < len(productos_por_categoria) - 1:
-                elements.append(PageBreak())
-                
-        return elements
+        self.category_names = list(productos_por_categoria.keys())
+        return productos_por_categoria
 
-    def create_professional_product_cell(self, producto):
+    def create_professional_product_cell(self, producto, miniaturas: dict = None):
         """Crear celda de producto estilo profesional sin stock"""
         cell_data = []
         
         # Imagen del producto centrada
-        image_cell = self.create_product_image(producto)
+        image_cell = self.create_product_image(producto, miniaturas)
         cell_data.append([image_cell])
         
         # Nombre del producto - permitir más líneas si es necesario
@@ -529,13 +714,25 @@ class ProfessionalCatalogoPDF:
         
         return cell_table
 
-    def create_product_image(self, producto):
-        """Crear imagen del producto con estilo profesional"""
+    def create_product_image(self, producto, miniaturas: dict = None):
+        """
+        Crear imagen del producto con estilo profesional.
+        `miniaturas` (url -> bytes JPEG) evita procesar otra vez la misma
+        imagen; también recuerda las que fallaron (b"").
+        """
         if producto.imagen:
-            image_path = self.download_and_process_image(producto.imagen, (70, 70))
-            if image_path:
+            datos = miniaturas.get(producto.imagen) if miniaturas is not None else None
+            if datos is not None:
+                cache_aciertos.inc("miniaturas_pdf")
+            else:
+                cache_fallos.inc("miniaturas_pdf")
+                image_buffer = self.download_and_process_image(producto.imagen, (70, 70))
+                datos = image_buffer.getvalue() if image_buffer else b""
+                if miniaturas is not None and len(miniaturas) < MAX_MINIATURAS_EN_CACHE:
+                    miniaturas[producto.imagen] = datos
+            if datos:
                 try:
-                    return ReportLabImage(image_path, width=70, height=70)
+                    return _ImagenProducto(BytesIO(datos), width=70, height=70)
                 except Exception as e:
                     logger.warning(f"Error al crear imagen: {e}")
         
@@ -576,53 +773,24 @@ class ProfessionalCatalogoPDF:
         
         return sorted_categories
 
-    def apply_filters(self, productos, filters):
-        """Aplicar filtros a los productos"""
-        filtered_products = productos
-        
-        if filters.get('search'):
-            search_text = filters['search'].lower()
-            filtered_products = [
-                p for p in filtered_products 
-                if search_text in p.nombre.lower() or 
-                   (p.marca and search_text in p.marca.descripcion.lower()) or
-                   (p.categoria and search_text in p.categoria.descripcion.lower())
-            ]
-        
-        if filters.get('marca_id'):
-            filtered_products = [p for p in filtered_products if p.id_marca == filters['marca_id']]
-        
-        if filters.get('categoria_id'):
-            filtered_products = [p for p in filtered_products if p.id_categoria == filters['categoria_id']]
-        
-        if filters.get('price_range') and filters['price_range'] != 'all':
-            price_range = filters['price_range']
-            if price_range == 'low':
-                filtered_products = [p for p in filtered_products if p.precio_minorista < 50]
-            elif price_range == 'medium':
-                filtered_products = [p for p in filtered_products if 50 <= p.precio_minorista < 200]
-            elif price_range == 'high':
-                filtered_products = [p for p in filtered_products if p.precio_minorista >= 200]
-        
-        return filtered_products
-
-    def cleanup_temp_files(self):
-        """Limpiar archivos temporales"""
-        temp_dir = tempfile.gettempdir()
-        try:
-            for filename in os.listdir(temp_dir):
-                if filename.endswith('.jpg') and filename.startswith('tmp'):
-                    file_path = os.path.join(temp_dir, filename)
-                    try:
-                        os.unlink(file_path)
-                    except:
-                        pass
-        except:
-            pass
-
 # Instancia global
 professional_pdf_generator = ProfessionalCatalogoPDF()
 
+
+def _producto_para_seccion(producto):
+    """Copia liviana y serializable de lo que dibuja la celda de un producto"""
+    return SimpleNamespace(
+        nombre=producto.nombre,
+        imagen=producto.imagen,
+        marca=SimpleNamespace(descripcion=producto.marca.descripcion) if producto.marca else None,
+    )
+
+
+def _renderizar_seccion(destino, categoria_nombre, productos):
+    """Proceso hijo del modo paralelo: renderiza una categoría y devuelve sus páginas"""
+    return professional_pdf_generator.build_section(destino, categoria_nombre, productos)
+
+@medir_render("catalogo_pdf")
 def generate_catalog_pdf(db: Session, filters: dict = None):
     """Función principal para generar PDF profesional del catálogo"""
     return professional_pdf_generator.generate_catalog_pdf(db, filters)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from utils.busqueda_productos import indice_productos
 from models.models import Categoria
 
 def get_categorias(db: Session):
@@ -25,6 +26,8 @@ def update_categoria(db: Session, id_categoria: int, descripcion: str):
     categoria.descripcion = descripcion
     db.commit()
     db.refresh(categoria)
+    # Los productos indexados guardan la descripción: reconstruir en la próxima búsqueda
+    indice_productos.invalidar()
     return categoria
 
 def delete_categoria(db: Session, id_categoria: int):
@@ -33,4 +36,5 @@ def delete_categoria(db: Session, id_categoria: int):
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
     db.delete(categoria)
     db.commit()
+    indice_productos.invalidar()
     return {"mensaje": "Categoría eliminada"}
\ No newline at end of file
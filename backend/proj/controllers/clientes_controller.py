@@ -1,11 +1,12 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
 from models.models import Cliente, UbicacionCliente
-import pandas as pd
+from models.response_models import (
+    ClienteItem, UbicacionClienteItem, ClienteConUbicacionesItem, UbicacionDetalleItem
+)
+from utils.respuestas import columnas
+from utils.metricas import medir_render
 import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
 
 
@@ -14,7 +15,8 @@ def get_clientes(db: Session):
     Obtiene todos los clientes con información de su ubicación principal
     """
     return db.query(Cliente).options(
-        joinedload(Cliente.ubicaciones)
+        load_only(*columnas(Cliente, ClienteItem)),
+        selectinload(Cliente.ubicaciones).load_only(*columnas(UbicacionCliente, UbicacionClienteItem))
     ).all()
 
 def get_cliente(db: Session, cod_cliente: str):
@@ -144,49 +146,26 @@ def get_clientes_con_ubicaciones(db: Session):
     """
     Obtiene todos los clientes con información detallada de sus ubicaciones
     """
-    clientes = db.query(Cliente).options(
-        joinedload(Cliente.ubicaciones)
+    # La FK cod_cliente se carga para agrupar las ubicaciones aunque no se devuelva
+    return db.query(Cliente).options(
+        load_only(*columnas(Cliente, ClienteConUbicacionesItem)),
+        selectinload(Cliente.ubicaciones).load_only(
+            UbicacionCliente.cod_cliente,
+            *columnas(UbicacionCliente, UbicacionDetalleItem)
+        )
     ).all()
-    
-    result = []
-    for cliente in clientes:
-        cliente_dict = {
-            "cod_cliente": cliente.cod_cliente,
-            "identificacion": cliente.identificacion,
-            "nombre": cliente.nombre,
-            "direccion": cliente.direccion,
-            "celular": cliente.celular,
-            "correo": cliente.correo,
-            "tipo_cliente": cliente.tipo_cliente,
-            "razon_social": cliente.razon_social,
-            "sector": cliente.sector,
-            "fecha_registro": cliente.fecha_registro,
-            "id_ubicacion_principal": cliente.id_ubicacion_principal,
-            "ubicaciones": []
-        }
-        
-        # Agregar información de ubicaciones
-        for ubicacion in cliente.ubicaciones:
-            ubicacion_dict = {
-                "id_ubicacion": ubicacion.id_ubicacion,
-                "latitud": float(ubicacion.latitud),
-                "longitud": float(ubicacion.longitud),
-                "direccion": ubicacion.direccion,
-                "sector": ubicacion.sector,
-                "referencia": ubicacion.referencia,
-                "fecha_registro": ubicacion.fecha_registro
-            }
-            cliente_dict["ubicaciones"].append(ubicacion_dict)
-        
-        result.append(cliente_dict)
-    
-    return result
 
+@medir_render("excel_clientes")
 def export_clientes_to_excel(db: Session):
     """
     Exporta los clientes a un archivo Excel con información de ubicación principal
     """
     try:
+        # pandas y openpyxl se cargan recién al exportar (no en cada worker)
+        import pandas as pd
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
         clientes = db.query(Cliente).options(
             joinedload(Cliente.ubicaciones)
         ).all()
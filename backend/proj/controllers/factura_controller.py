@@ -1,15 +1,13 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from models.models import Factura, DetalleFactura, Cliente, Producto
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from models.response_models import FacturaItem
+from utils.respuestas import columnas
+from utils.metricas import medir_render
 import tempfile
 
 def get_facturas(db: Session):
-    return db.query(Factura).all()
+    return db.query(Factura).options(load_only(*columnas(Factura, FacturaItem))).all()
 
 def get_factura(db: Session, id_factura: int):
     factura = db.query(Factura).filter(Factura.id_factura == id_factura).first()
@@ -42,11 +40,19 @@ def delete_factura(db: Session, id_factura: int):
     db.commit()
     return {"mensaje": "Factura eliminada"}
 
+@medir_render("factura_pdf")
 def generate_factura_pdf(db: Session, id_factura: int):
     factura = db.query(Factura).filter(Factura.id_factura == id_factura).first()
     if not factura:
         raise HTTPException(status_code=404, detail="Factura no encontrada")
 
+    # reportlab se carga recién al generar la primera factura
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+
     cliente = factura.cliente if hasattr(factura, 'cliente') else None
     detalles = factura.detalles if hasattr(factura, 'detalles') else []
 
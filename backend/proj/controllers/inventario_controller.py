@@ -0,0 +1,110 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, insert, select, update
+from models.models import Producto, DetallePedido, MovimientoInventario
+from typing import Dict, Iterable, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Motivos de movimiento_inventario
+MOTIVO_SALDO_INICIAL = "saldo_inicial"
+MOTIVO_PEDIDO = "pedido"
+MOTIVO_AJUSTE_PEDIDO = "ajuste_pedido"
+MOTIVO_ANULACION_PEDIDO = "anulacion_pedido"
+MOTIVO_AJUSTE_MANUAL = "ajuste_manual"
+
+
+def cantidades_por_producto(detalles: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+    """Suma las cantidades de las líneas por producto (un producto puede repetirse)"""
+    cantidades = {}
+    for detalle in detalles:
+        id_producto = detalle.get("id_producto")
+        cantidad = detalle.get("cantidad", 1)
+        try:
+            id_producto, cantidad = int(id_producto), int(cantidad)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cada línea necesita id_producto y cantidad enteros")
+        if cantidad <= 0:
+            raise HTTPException(status_code=400, detail=f"Cantidad inválida para el producto {id_producto}: {cantidad}")
+        cantidades[id_producto] = cantidades.get(id_producto, 0) + cantidad
+    return cantidades
+
+
+def cantidades_de_pedido(db: Session, id_pedido: int) -> Dict[int, int]:
+    """Cantidades por producto que tiene hoy reservadas un pedido"""
+    filas = db.query(DetallePedido.id_producto, func.sum(DetallePedido.cantidad)).filter(
+        DetallePedido.id_pedido == id_pedido
+    ).group_by(DetallePedido.id_producto).all()
+    return {id_producto: int(cantidad or 0) for id_producto, cantidad in filas if id_producto is not None}
+
+
+def mover_stock(db: Session, salidas: Dict[int, int], motivo: str, id_pedido: int = None):
+    """Mueve el stock de un pedido: ver mover_stock_lote"""
+    mover_stock_lote(db, {id_pedido: salidas}, motivo)
+
+
+def mover_stock_lote(db: Session, salidas_por_pedido: Dict[Any, Dict[int, int]], motivo: str):
+    """
+    Descuenta (cantidad positiva) o devuelve (negativa) stock de uno o más
+    pedidos ({id_pedido: {id_producto: cantidad}}) con un solo UPDATE
+    condicional sobre las cantidades sumadas por producto:
+
+        UPDATE productos SET stock = stock - CASE id_producto WHEN ... END
+        WHERE id_producto IN (...) AND stock >= CASE id_producto WHEN ... END
+
+    La condición y el descuento se evalúan sobre la fila bloqueada, así que
+    dos pedidos concurrentes nunca venden la misma unidad (en PostgreSQL el
+    segundo espera el bloqueo de fila y revalúa el WHERE con el stock nuevo).
+    Si alguna línea no alcanza, el número de filas actualizadas no coincide:
+    se revierte la transacción (no queda ningún descuento parcial) y se lanza
+    409. Cada pedido deja sus propios movimientos de inventario. No hace
+    commit; conviene llamarla al final de la transacción para retener los
+    bloqueos de fila el menor tiempo posible.
+    """
+    salidas = {}
+    for por_producto in salidas_por_pedido.values():
+        for id_producto, cantidad in por_producto.items():
+            salidas[id_producto] = salidas.get(id_producto, 0) + cantidad
+    salidas = {id_producto: cantidad for id_producto, cantidad in salidas.items() if cantidad}
+    if not salidas:
+        return
+
+    # Los ids ordenados hacen que todas las transacciones bloqueen las filas
+    # en el mismo orden (recorrido del índice de la PK): sin deadlocks
+    ids = sorted(salidas)
+    delta = case(salidas, value=Producto.id_producto)
+    resultado = db.execute(
+        update(Producto)
+        .where(Producto.id_producto.in_(ids), Producto.stock >= delta)
+        .values(stock=Producto.stock - delta)
+        .execution_options(synchronize_session=False)
+    )
+
+    if resultado.rowcount != len(ids):
+        # Sin el rollback se leería el stock ya descontado de las otras líneas
+        db.rollback()
+        disponibles = dict(db.execute(
+            select(Producto.id_producto, Producto.stock).where(Producto.id_producto.in_(ids))
+        ).all())
+        inexistentes = [id_producto for id_producto in ids if id_producto not in disponibles]
+        if inexistentes:
+            raise HTTPException(status_code=404, detail=f"Productos no encontrados: {inexistentes}")
+        faltantes = [
+            f"producto {id_producto} (solicitado {salidas[id_producto]}, disponible {disponibles[id_producto]})"
+            for id_producto in ids if disponibles[id_producto] < salidas[id_producto]
+        ]
+        logger.info(f"Stock insuficiente para pedidos {list(salidas_por_pedido)}: {'; '.join(faltantes)}")
+        raise HTTPException(status_code=409, detail=f"Stock insuficiente: {'; '.join(faltantes)}")
+
+    db.execute(insert(MovimientoInventario), [
+        {"id_producto": id_producto, "id_pedido": id_pedido, "cantidad": -cantidad, "motivo": motivo}
+        for id_pedido, por_producto in salidas_por_pedido.items()
+        for id_producto, cantidad in sorted(por_producto.items()) if cantidad
+    ])
+
+
+def registrar_ajuste(db: Session, id_producto: int, cantidad: int, motivo: str = MOTIVO_AJUSTE_MANUAL):
+    """Movimiento de un cambio de stock hecho fuera de los pedidos (alta o edición del producto)"""
+    if cantidad:
+        db.add(MovimientoInventario(id_producto=id_producto, cantidad=cantidad, motivo=motivo))
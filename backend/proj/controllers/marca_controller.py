@@ -1,5 +1,6 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from utils.busqueda_productos import indice_productos
 from models.models import Marca
 
 def get_marcas(db: Session):
@@ -25,6 +26,8 @@ def update_marca(db: Session, id_marca: int, descripcion: str):
     marca.descripcion = descripcion
     db.commit()
     db.refresh(marca)
+    # Los productos indexados guardan la descripción: reconstruir en la próxima búsqueda
+    indice_productos.invalidar()
     return marca
 
 def delete_marca(db: Session, id_marca: int):
@@ -33,4 +36,5 @@ def delete_marca(db: Session, id_marca: int):
         raise HTTPException(status_code=404, detail="Marca no encontrada")
     db.delete(marca)
     db.commit()
+    indice_productos.invalidar()
     return {"mensaje": "Marca eliminada"}
\ No newline at end of file
@@ -1,42 +1,90 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from models.models import Pedido, DetallePedido
+from sqlalchemy.orm import Session, selectinload, load_only
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from models.models import Pedido, DetallePedido, EstadoPedido, Producto, Cliente
+from models.response_models import PedidoItem, DetallePedidoItem
+from controllers.inventario_controller import (
+    cantidades_por_producto, cantidades_de_pedido, mover_stock, mover_stock_lote,
+    MOTIVO_PEDIDO, MOTIVO_AJUSTE_PEDIDO, MOTIVO_ANULACION_PEDIDO,
+)
+from utils.respuestas import columnas
+from utils.cambios import monitor_versiones
+from utils.precios import cache_precios, cotizar, es_mayorista, TablaPrecios, LineaInvalida, ProductosNoEncontrados, ProductosSinPrecio
 from typing import Dict, Any
-from datetime import datetime
+from datetime import datetime, date
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pedidos por request en /pedidos/lote
+MAXIMO_LOTE = 200
+LARGO_CLAVE_IDEMPOTENCIA = 64
+ESTADO_INICIAL = "Pendiente"
+
+def _filas_precios(db: Session, ids=None):
+    consulta = db.query(
+        Producto.id_producto, Producto.nombre, Producto.precio_minorista, Producto.precio_mayorista, Producto.iva
+    )
+    if ids is not None:
+        consulta = consulta.filter(Producto.id_producto.in_(ids))
+    return consulta.all()
+
+def precargar_precios(db: Session):
+    """Carga la tabla de precios en memoria (arranque del servidor)"""
+    cache_precios.invalidar()
+    cache_precios.obtener(lambda: _filas_precios(db))
+
+# Cualquier cambio de productos que no sea solo de stock, de este worker o de otro
+monitor_versiones.suscribir({"productos"}, lambda _: cache_precios.invalidar())
+
+def cotizar_pedido(db: Session, datos: Dict[str, Any], fresco: bool = False):
+    """
+    Precios, descuentos, IVA y totales de las líneas de un pedido.
+    El tipo de precio sale del cliente (cod_cliente) o de tipo_cliente.
+    Con fresco=False usa la tabla de precios en memoria (cotizaciones del
+    carrito); con fresco=True lee de la base solo los productos de las
+    líneas, en una consulta (precio definitivo al guardar el pedido).
+    """
+    lineas = datos.get("detalle_pedido") or datos.get("detalles") or []
+    tipo_cliente = datos.get("tipo_cliente")
+    if datos.get("cod_cliente"):
+        cliente = db.query(Cliente.tipo_cliente).filter(Cliente.cod_cliente == datos["cod_cliente"]).first()
+        if not cliente:
+            raise HTTPException(status_code=404, detail="Cliente no encontrado")
+        tipo_cliente = cliente.tipo_cliente
+
+    try:
+        if fresco:
+            ids = {int(linea["id_producto"]) for linea in lineas}
+            tabla = TablaPrecios(_filas_precios(db, ids))
+        else:
+            tabla = cache_precios.obtener(lambda: _filas_precios(db))
+        return cotizar(tabla, lineas, es_mayorista(tipo_cliente))
+    except ProductosNoEncontrados as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ProductosSinPrecio as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (LineaInvalida, KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e) if isinstance(e, LineaInvalida) else "Línea de pedido inválida")
+
+def _avisar_si_difiere(id_pedido, enviado: Dict[str, Any], cotizacion: Dict[str, Any]):
+    if enviado.get("total") is None:
+        return
+    try:
+        diferencia = abs(float(enviado["total"]) - cotizacion["total"])
+    except (TypeError, ValueError):
+        return
+    if diferencia >= 0.01:
+        logger.info(f"Pedido {id_pedido}: total enviado {enviado['total']} reemplazado por el calculado {cotizacion['total']}")
 
 def get_pedidos(db: Session):
     """Obtiene todos los pedidos con sus detalles"""
-    pedidos = db.query(Pedido).all()
-    result = []
-    for pedido in pedidos:
-        pedido_dict = {
-            "id_pedido": pedido.id_pedido,
-            "numero_pedido": pedido.numero_pedido,
-            "fecha_pedido": pedido.fecha_pedido,
-            "subtotal": pedido.subtotal,
-            "iva": pedido.iva,
-            "total": pedido.total,
-            "cod_cliente": pedido.cod_cliente,
-            "detalles": []
-        }
-        
-        # Cargar detalles del pedido
-        for detalle in pedido.detalles:
-            detalle_dict = {
-                "id_detalle_pedido": detalle.id_detalle_pedido,
-                "id_pedido": detalle.id_pedido,
-                "id_producto": detalle.id_producto,
-                "cantidad": detalle.cantidad,
-                "precio_unitario": detalle.precio_unitario,
-                "descuento": detalle.descuento,
-                "subtotal_lineal": detalle.subtotal_lineal,
-                "subtotal": detalle.subtotal
-            }
-            pedido_dict["detalles"].append(detalle_dict)
-        
-        result.append(pedido_dict)
-    
-    return result
+    return db.query(Pedido).options(
+        load_only(*columnas(Pedido, PedidoItem)),
+        selectinload(Pedido.detalles).load_only(*columnas(DetallePedido, DetallePedidoItem))
+    ).all()
 
 def get_pedido(db: Session, id_pedido: int):
     """Obtiene un pedido específico con sus detalles"""
@@ -71,23 +119,51 @@ def get_pedido(db: Session, id_pedido: int):
     
     return pedido_dict
 
+def _fecha_pedido(valor, prefijo: str = ""):
+    """fecha_pedido de un pedido nuevo: hoy si no viene, 400 si no es AAAA-MM-DD"""
+    if not valor:
+        return date.today()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{prefijo}fecha_pedido debe tener el formato AAAA-MM-DD")
+
+def _validar_clave_idempotencia(clave, prefijo: str = ""):
+    if not clave:
+        raise HTTPException(status_code=400, detail=f"{prefijo}clave_idempotencia es requerida")
+    if not isinstance(clave, str) or len(clave) > LARGO_CLAVE_IDEMPOTENCIA:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{prefijo}clave_idempotencia debe ser un texto de hasta {LARGO_CLAVE_IDEMPOTENCIA} caracteres"
+        )
+
 def create_pedido(db: Session, pedido_data: Dict[str, Any]):
     """Crea un nuevo pedido con sus detalles"""
     try:
         data_copy = pedido_data.copy()
-        detalles_data = data_copy.get('detalle_pedido', [])
-        
-        fecha_pedido = data_copy.get("fecha_pedido")
-        if isinstance(fecha_pedido, str):
-            fecha_pedido = datetime.strptime(fecha_pedido, "%Y-%m-%d").date()
+        clave = data_copy.get("clave_idempotencia")
+        if clave:
+            # Opcional en un pedido suelto, pero con las mismas reglas que en el lote
+            _validar_clave_idempotencia(clave)
+            existente = db.query(Pedido.id_pedido).filter(Pedido.clave_idempotencia == clave).first()
+            if existente:
+                return get_pedido(db, existente.id_pedido)
+        fecha_pedido = _fecha_pedido(data_copy.get("fecha_pedido"))
+        salidas = cantidades_por_producto(data_copy.get('detalle_pedido', []))
+        # Los importes los calcula el servidor; los que envía el cliente se ignoran
+        cotizacion = cotizar_pedido(db, data_copy, fresco=True)
+        detalles_data = cotizacion["detalle_pedido"]
         
         pedido_fields = {
             "numero_pedido": data_copy.get("numero_pedido"),
             "fecha_pedido": fecha_pedido,
-            "subtotal": float(data_copy.get("subtotal", 0)),
-            "iva": float(data_copy.get("iva", 0)),
-            "total": float(data_copy.get("total", 0)),
-            "cod_cliente": data_copy.get("cod_cliente")
+            "subtotal": cotizacion["subtotal"],
+            "iva": cotizacion["iva"],
+            "total": cotizacion["total"],
+            "cod_cliente": data_copy.get("cod_cliente"),
+            "clave_idempotencia": clave or None
         }
         
         # Filtrar campos None
@@ -97,6 +173,7 @@ def create_pedido(db: Session, pedido_data: Dict[str, Any]):
         nuevo_pedido = Pedido(**pedido_fields)
         db.add(nuevo_pedido)
         db.flush()  # Para obtener el ID del pedido sin hacer commit
+        _avisar_si_difiere(nuevo_pedido.id_pedido, data_copy, cotizacion)
         
         # Crear los detalles del pedido
         detalles_creados = []
@@ -114,6 +191,12 @@ def create_pedido(db: Session, pedido_data: Dict[str, Any]):
             nuevo_detalle = DetallePedido(**detalle_fields)
             db.add(nuevo_detalle)
             detalles_creados.append(nuevo_detalle)
+
+        # Mismo estado inicial que los pedidos creados por lote
+        db.add(EstadoPedido(id_pedido=nuevo_pedido.id_pedido, fecha_actualizada=date.today(), descripcion=ESTADO_INICIAL))
+        
+        # Reservar stock al final, así los bloqueos de fila duran solo hasta el commit
+        mover_stock(db, salidas, MOTIVO_PEDIDO, nuevo_pedido.id_pedido)
         
         # Hacer commit de todo
         db.commit()
@@ -146,6 +229,16 @@ def create_pedido(db: Session, pedido_data: Dict[str, Any]):
         
         return response
         
+    except HTTPException:
+        db.rollback()
+        raise
+    except IntegrityError:
+        db.rollback()
+        # Un reintento simultáneo con la misma clave ya guardó el pedido
+        existente = db.query(Pedido.id_pedido).filter(Pedido.clave_idempotencia == clave).first() if clave else None
+        if existente:
+            return get_pedido(db, existente.id_pedido)
+        raise HTTPException(status_code=409, detail="El pedido viola una restricción de la base de datos")
     except Exception as e:
         db.rollback()
         print(f"Error detallado al crear pedido: {str(e)}")
@@ -157,17 +250,36 @@ def create_pedido(db: Session, pedido_data: Dict[str, Any]):
 def update_pedido(db: Session, id_pedido: int, pedido_data: Dict[str, Any]):
     """Actualiza un pedido existente con sus detalles"""
     try:
-        pedido = db.query(Pedido).filter(Pedido.id_pedido == id_pedido).first()
+        # FOR UPDATE: dos ediciones simultáneas del mismo pedido no calculan
+        # la diferencia de stock sobre los mismos detalles anteriores
+        pedido = db.query(Pedido).filter(Pedido.id_pedido == id_pedido).with_for_update().first()
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
         
         # Extraer detalles del pedido_data
         detalles_data = pedido_data.pop('detalles', [])
+        nuevas = cantidades_por_producto(detalles_data)
+        anteriores = cantidades_de_pedido(db, id_pedido)
+        
+        # Importes recalculados por el servidor con el cliente final del pedido
+        enviado = {campo: pedido_data.pop(campo, None) for campo in ("subtotal", "iva", "total")}
+        if detalles_data:
+            cotizacion = cotizar_pedido(db, {
+                "cod_cliente": pedido_data.get("cod_cliente") or pedido.cod_cliente,
+                "detalles": detalles_data,
+            }, fresco=True)
+            detalles_data = cotizacion["detalle_pedido"]
+            _avisar_si_difiere(id_pedido, enviado, cotizacion)
+        else:
+            cotizacion = {"subtotal": 0.0, "iva": 0.0, "total": 0.0}
         
         # Actualizar campos del pedido
         for key, value in pedido_data.items():
             if hasattr(pedido, key) and value is not None:
                 setattr(pedido, key, value)
+        pedido.subtotal = cotizacion["subtotal"]
+        pedido.iva = cotizacion["iva"]
+        pedido.total = cotizacion["total"]
         
         # Eliminar detalles existentes
         db.query(DetallePedido).filter(DetallePedido.id_pedido == id_pedido).delete()
@@ -189,6 +301,13 @@ def update_pedido(db: Session, id_pedido: int, pedido_data: Dict[str, Any]):
             db.add(nuevo_detalle)
             detalles_actualizados.append(nuevo_detalle)
         
+        # Solo se mueve la diferencia: más unidades se reservan, menos se devuelven
+        diferencias = {
+            id_producto: nuevas.get(id_producto, 0) - anteriores.get(id_producto, 0)
+            for id_producto in nuevas.keys() | anteriores.keys()
+        }
+        mover_stock(db, diferencias, MOTIVO_AJUSTE_PEDIDO, id_pedido)
+        
         db.commit()
         db.refresh(pedido)
         
@@ -220,19 +339,26 @@ def update_pedido(db: Session, id_pedido: int, pedido_data: Dict[str, Any]):
         
         return response
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al actualizar pedido: {str(e)}")
 
 def delete_pedido(db: Session, id_pedido: int):
-    """Elimina un pedido y sus detalles"""
+    """Elimina un pedido y sus detalles, devolviendo su stock"""
     try:
-        pedido = db.query(Pedido).filter(Pedido.id_pedido == id_pedido).first()
+        pedido = db.query(Pedido).filter(Pedido.id_pedido == id_pedido).with_for_update().first()
         if not pedido:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
         
-        # Eliminar detalles primero (por integridad referencial)
+        devoluciones = {id_producto: -cantidad for id_producto, cantidad in cantidades_de_pedido(db, id_pedido).items()}
+        mover_stock(db, devoluciones, MOTIVO_ANULACION_PEDIDO, id_pedido)
+        
+        # Eliminar detalles y estados primero (por integridad referencial)
         db.query(DetallePedido).filter(DetallePedido.id_pedido == id_pedido).delete()
+        db.query(EstadoPedido).filter(EstadoPedido.id_pedido == id_pedido).delete()
         
         # Eliminar el pedido
         db.delete(pedido)
@@ -240,6 +366,157 @@ def delete_pedido(db: Session, id_pedido: int):
         
         return {"mensaje": "Pedido eliminado correctamente"}
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error al eliminar pedido: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al eliminar pedido: {str(e)}")
+def _insert_pedidos_idempotente(dialecto: str):
+    """INSERT de pedidos que ignora las claves que ya existen (reintentos concurrentes)"""
+    if dialecto == "postgresql":
+        return postgresql.insert(Pedido.__table__).on_conflict_do_nothing(index_elements=["clave_idempotencia"])
+    if dialecto == "sqlite":
+        return sqlite.insert(Pedido.__table__).on_conflict_do_nothing(index_elements=["clave_idempotencia"])
+    return insert(Pedido.__table__)
+
+def _validar_lote(pedidos) -> dict:
+    """Valida el lote antes de tocar la base; devuelve clave_idempotencia -> fecha_pedido"""
+    if not isinstance(pedidos, list) or not pedidos:
+        raise HTTPException(status_code=400, detail="pedidos debe ser una lista no vacía")
+    if len(pedidos) > MAXIMO_LOTE:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAXIMO_LOTE} pedidos por lote")
+    fechas = {}
+    for n, pedido in enumerate(pedidos):
+        if not isinstance(pedido, dict):
+            raise HTTPException(status_code=400, detail=f"Pedido {n}: debe ser un objeto")
+        clave = pedido.get("clave_idempotencia")
+        _validar_clave_idempotencia(clave, f"Pedido {n}: ")
+        if clave in fechas:
+            raise HTTPException(status_code=400, detail=f"Pedido {n}: clave_idempotencia repetida en el lote")
+        fechas[clave] = _fecha_pedido(pedido.get("fecha_pedido"), f"Pedido {n}: ")
+        if not pedido.get("cod_cliente"):
+            raise HTTPException(status_code=400, detail=f"Pedido {n}: cod_cliente es requerido")
+        detalle = pedido.get("detalle_pedido")
+        if not detalle:
+            raise HTTPException(status_code=400, detail=f"Pedido {n}: detalle_pedido es requerido")
+        if not isinstance(detalle, list) or not all(isinstance(linea, dict) for linea in detalle):
+            raise HTTPException(status_code=400, detail=f"Pedido {n}: detalle_pedido debe ser una lista de líneas")
+    return fechas
+
+def create_pedidos_lote(db: Session, pedidos: list):
+    """
+    Crea varios pedidos (con sus detalles y el estado inicial) en una sola
+    transacción: un INSERT de varias filas con RETURNING por tabla, una
+    consulta de precios y un solo UPDATE de stock para todo el lote.
+    Cada pedido trae su clave_idempotencia: los que ya se guardaron en un
+    envío anterior se devuelven como "existente" sin volver a crearse, así
+    que reintentar el lote completo tras un corte de conexión no duplica
+    nada. Si un pedido es inválido o no hay stock, no se guarda ninguno.
+    """
+    try:
+        fechas = _validar_lote(pedidos)
+        claves = [pedido["clave_idempotencia"] for pedido in pedidos]
+        existentes = {
+            fila.clave_idempotencia: (fila.id_pedido, fila.total)
+            for fila in db.query(Pedido.clave_idempotencia, Pedido.id_pedido, Pedido.total).filter(
+                Pedido.clave_idempotencia.in_(claves)
+            )
+        }
+        nuevos = [pedido for pedido in pedidos if pedido["clave_idempotencia"] not in existentes]
+
+        if nuevos:
+            salidas = {}
+            for pedido in nuevos:
+                salidas[pedido["clave_idempotencia"]] = cantidades_por_producto(pedido["detalle_pedido"])
+
+            # Precios: una consulta de clientes y una de productos para todo el lote
+            tipos = dict(db.query(Cliente.cod_cliente, Cliente.tipo_cliente).filter(
+                Cliente.cod_cliente.in_({pedido["cod_cliente"] for pedido in nuevos})
+            ).all())
+            sin_cliente = sorted({pedido["cod_cliente"] for pedido in nuevos} - tipos.keys())
+            if sin_cliente:
+                raise HTTPException(status_code=404, detail=f"Clientes no encontrados: {sin_cliente}")
+            tabla = TablaPrecios(_filas_precios(db, {p for por_producto in salidas.values() for p in por_producto}))
+            cotizaciones = {}
+            for pedido in nuevos:
+                try:
+                    cotizaciones[pedido["clave_idempotencia"]] = cotizar(
+                        tabla, pedido["detalle_pedido"], es_mayorista(tipos[pedido["cod_cliente"]])
+                    )
+                except ProductosNoEncontrados as e:
+                    raise HTTPException(status_code=404, detail=f"Pedido {pedido['clave_idempotencia']}: {e}")
+                except ProductosSinPrecio as e:
+                    raise HTTPException(status_code=409, detail=f"Pedido {pedido['clave_idempotencia']}: {e}")
+                except LineaInvalida as e:
+                    raise HTTPException(status_code=400, detail=f"Pedido {pedido['clave_idempotencia']}: {e}")
+
+            filas = [
+                {
+                    "numero_pedido": pedido.get("numero_pedido"),
+                    "fecha_pedido": fechas[pedido["clave_idempotencia"]],
+                    "subtotal": cotizaciones[pedido["clave_idempotencia"]]["subtotal"],
+                    "iva": cotizaciones[pedido["clave_idempotencia"]]["iva"],
+                    "total": cotizaciones[pedido["clave_idempotencia"]]["total"],
+                    "cod_cliente": pedido["cod_cliente"],
+                    "clave_idempotencia": pedido["clave_idempotencia"],
+                }
+                for pedido in nuevos
+            ]
+            insertar = _insert_pedidos_idempotente(db.get_bind().dialect.name)
+            creados = dict(db.execute(
+                insertar.returning(Pedido.__table__.c.clave_idempotencia, Pedido.__table__.c.id_pedido), filas
+            ).all())
+
+            # Otro envío simultáneo del mismo lote ganó algunas claves
+            perdidas = [pedido["clave_idempotencia"] for pedido in nuevos if pedido["clave_idempotencia"] not in creados]
+            if perdidas:
+                for fila in db.query(Pedido.clave_idempotencia, Pedido.id_pedido, Pedido.total).filter(
+                    Pedido.clave_idempotencia.in_(perdidas)
+                ):
+                    existentes[fila.clave_idempotencia] = (fila.id_pedido, fila.total)
+
+            if creados:
+                db.execute(insert(DetallePedido.__table__), [
+                    {
+                        "id_pedido": id_pedido,
+                        "id_producto": linea["id_producto"],
+                        "cantidad": linea["cantidad"],
+                        "precio_unitario": linea["precio_unitario"],
+                        "descuento": linea["descuento"],
+                        "subtotal_lineal": linea["subtotal_lineal"],
+                        "subtotal": linea["subtotal"],
+                    }
+                    for clave, id_pedido in creados.items()
+                    for linea in cotizaciones[clave]["detalle_pedido"]
+                ])
+                db.execute(insert(EstadoPedido.__table__), [
+                    {"id_pedido": id_pedido, "fecha_actualizada": date.today(), "descripcion": ESTADO_INICIAL}
+                    for id_pedido in creados.values()
+                ])
+                # Stock al final: los bloqueos de fila duran solo hasta el commit
+                mover_stock_lote(db, {id_pedido: salidas[clave] for clave, id_pedido in creados.items()}, MOTIVO_PEDIDO)
+        else:
+            creados = {}
+
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al crear lote de pedidos: {e}")
+        raise HTTPException(status_code=500, detail=f"Error al crear lote de pedidos: {str(e)}")
+
+    resultado = []
+    for clave in claves:
+        if clave in creados:
+            resultado.append({
+                "clave_idempotencia": clave, "id_pedido": creados[clave],
+                "estado": "creado", "total": cotizaciones[clave]["total"],
+            })
+        else:
+            id_pedido, total = existentes[clave]
+            resultado.append({"clave_idempotencia": clave, "id_pedido": id_pedido, "estado": "existente", "total": total})
+    logger.info(f"Lote de {len(claves)} pedidos: {len(creados)} creados, {len(claves) - len(creados)} ya existían")
+    return {"creados": len(creados), "existentes": len(claves) - len(creados), "pedidos": resultado}
@@ -1,28 +1,186 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session, joinedload
-from models.models import Producto
-import pandas as pd
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from models.models import Producto, Marca, Categoria
+from utils.busqueda_productos import indice_productos
+from utils.cambios import monitor_versiones
+from utils.imagenes import eliminar_imagen_producto, ruta_local, clave_imagen, DIRECTORIO_PRODUCTOS
+from utils.metricas import medir_render
+from controllers.inventario_controller import registrar_ajuste, MOTIVO_SALDO_INICIAL
 import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
+import os
+import shutil
+import time
+import logging
 from datetime import datetime
 
-def get_productos(db: Session):
+logger = logging.getLogger(__name__)
+
+# Rangos de precio (precio_minorista) del catálogo: [mínimo, máximo)
+RANGOS_PRECIO = {
+    'low': (None, 50),
+    'medium': (50, 200),
+    'high': (200, None),
+}
+
+def preparar_filtros(search: str = None, marca_id: int = None, categoria_id: int = None, price_range: str = None) -> dict:
+    """Arma el diccionario de filtros a partir de los parámetros de la petición"""
+    filters = {}
+    if search and search.strip():
+        filters['search'] = search.strip()
+    if marca_id:
+        filters['marca_id'] = marca_id
+    if categoria_id:
+        filters['categoria_id'] = categoria_id
+    if price_range and price_range != 'all':
+        filters['price_range'] = price_range
+    return filters
+
+def _patron_like(texto: str) -> str:
+    """Patrón '%texto%' escapando los comodines de LIKE"""
+    texto = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{texto}%"
+
+def query_productos_filtrados(db: Session, filters: dict = None):
+    """
+    Consulta de productos con los filtros del catálogo traducidos a SQL:
+    - search: nombre, marca o categoría contienen el texto (sin distinguir mayúsculas)
+    - marca_id / categoria_id: igualdad sobre columnas indexadas
+    - price_range: low (< 50), medium (50 a 200), high (>= 200) sobre precio_minorista
+    Así solo salen de la base de datos las filas que coinciden.
+    """
+    query = db.query(Producto)
+    filters = filters or {}
+    
+    if filters.get('search'):
+        patron = _patron_like(filters['search'])
+        query = query.filter(or_(
+            Producto.nombre.ilike(patron, escape='\\'),
+            Producto.marca.has(Marca.descripcion.ilike(patron, escape='\\')),
+            Producto.categoria.has(Categoria.descripcion.ilike(patron, escape='\\'))
+        ))
+    
+    if filters.get('marca_id'):
+        query = query.filter(Producto.id_marca == filters['marca_id'])
+    
+    if filters.get('categoria_id'):
+        query = query.filter(Producto.id_categoria == filters['categoria_id'])
+    
+    rango = RANGOS_PRECIO.get(filters.get('price_range'))
+    if rango:
+        minimo, maximo = rango
+        if minimo is not None:
+            query = query.filter(Producto.precio_minorista >= minimo)
+        if maximo is not None:
+            query = query.filter(Producto.precio_minorista < maximo)
+    
+    return query
+
+def get_estadisticas_catalogo(db: Session):
+    """Conteos del catálogo calculados con agregaciones en SQL"""
+    total, activos = db.query(
+        func.count(Producto.id_producto),
+        func.count(Producto.id_producto).filter(Producto.estado == 'activo')
+    ).one()
+    
+    marcas_stats = dict(
+        db.query(Marca.descripcion, func.count(Producto.id_producto))
+        .join(Producto, Producto.id_marca == Marca.id_marca)
+        .filter(Producto.estado == 'activo')
+        .group_by(Marca.descripcion)
+        .all()
+    )
+    
+    categorias_stats = dict(
+        db.query(Categoria.descripcion, func.count(Producto.id_producto))
+        .join(Producto, Producto.id_categoria == Categoria.id_categoria)
+        .filter(Producto.estado == 'activo')
+        .group_by(Categoria.descripcion)
+        .all()
+    )
+    
+    return {
+        "total_productos": total,
+        "productos_activos": activos,
+        "productos_inactivos": total - activos,
+        "estadisticas_marcas": marcas_stats,
+        "estadisticas_categorias": categorias_stats,
+    }
+
+def url_imagen(imagen: str):
+    """Construye la URL completa de la imagen de un producto"""
+    if imagen and not imagen.startswith('http'):
+        # Si la imagen no empieza con http, construir la URL completa
+        if imagen.startswith('/uploads/'):
+            return f"http://127.0.0.1:8000{imagen}"
+        elif not imagen.startswith('/'):
+            return f"http://127.0.0.1:8000/uploads/productos/{imagen}"
+    return imagen
+
+def _datos_busqueda(id_producto, nombre, marca, categoria, precio_minorista, precio_mayorista, estado, imagen) -> dict:
+    """Datos de un producto que guarda el índice de búsqueda"""
+    return {
+        "id_producto": id_producto,
+        "nombre": nombre,
+        "marca": marca,
+        "categoria": categoria,
+        "precio_minorista": precio_minorista,
+        "precio_mayorista": precio_mayorista,
+        "estado": estado,
+        "imagen": url_imagen(imagen),
+    }
+
+def _indexar_producto(producto: Producto):
+    """Actualiza el producto en el índice de búsqueda (marca y categoría ya cargadas)"""
+    indice_productos.actualizar(_datos_busqueda(
+        producto.id_producto,
+        producto.nombre,
+        producto.marca.descripcion if producto.marca else None,
+        producto.categoria.descripcion if producto.categoria else None,
+        producto.precio_minorista,
+        producto.precio_mayorista,
+        producto.estado,
+        producto.imagen,
+    ))
+
+def _filas_busqueda(db: Session):
+    filas = db.query(
+        Producto.id_producto, Producto.nombre, Marca.descripcion, Categoria.descripcion,
+        Producto.precio_minorista, Producto.precio_mayorista, Producto.estado, Producto.imagen
+    ).outerjoin(
+        Marca, Producto.id_marca == Marca.id_marca
+    ).outerjoin(
+        Categoria, Producto.id_categoria == Categoria.id_categoria
+    ).all()
+    return [_datos_busqueda(*fila) for fila in filas]
+
+def construir_indice_busqueda(db: Session):
+    """Carga todos los productos en el índice de búsqueda con una sola consulta"""
+    indice_productos.reconstruir(_filas_busqueda(db))
+
+# Este worker mantiene el índice al crear/editar/eliminar; los cambios que
+# confirman otros workers lo marcan para reconstruir (utils/cambios.py)
+monitor_versiones.suscribir({"productos", "marca", "categoria"}, lambda _: indice_productos.invalidar(), locales=False)
+
+def buscar_productos(db: Session, consulta: str, limite: int = 10, solo_activos: bool = True):
+    """
+    Búsqueda difusa de productos por nombre y marca, ordenada por relevancia.
+    El índice se construye en la primera búsqueda y luego se mantiene al día
+    con las altas, cambios y bajas de productos.
+    """
+    return indice_productos.buscar(consulta, limite, solo_activos, cargar_filas=lambda: _filas_busqueda(db))
+
+def get_productos(db: Session, filters: dict = None):
     # Incluir las relaciones marca y categoria al hacer la consulta
-    productos = db.query(Producto).options(
+    productos = query_productos_filtrados(db, filters).options(
         joinedload(Producto.marca),
         joinedload(Producto.categoria)
     ).all()
     
     # Procesar las imágenes para tener URLs completas
     for producto in productos:
-        if producto.imagen and not producto.imagen.startswith('http'):
-            # Si la imagen no empieza con http, construir la URL completa
-            if producto.imagen.startswith('/uploads/'):
-                producto.imagen = f"http://127.0.0.1:8000{producto.imagen}"
-            elif not producto.imagen.startswith('/'):
-                producto.imagen = f"http://127.0.0.1:8000/uploads/productos/{producto.imagen}"
+        producto.imagen = url_imagen(producto.imagen)
     
     return productos
 
@@ -36,26 +194,33 @@ def get_producto(db: Session, id_producto: int):
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
     # Procesar la imagen para tener URL completa
-    if producto.imagen and not producto.imagen.startswith('http'):
-        if producto.imagen.startswith('/uploads/'):
-            producto.imagen = f"http://127.0.0.1:8000{producto.imagen}"
-        elif not producto.imagen.startswith('/'):
-            producto.imagen = f"http://127.0.0.1:8000/uploads/productos/{producto.imagen}"
+    producto.imagen = url_imagen(producto.imagen)
     
     return producto
 
+def _stock_valido(valor) -> int:
+    """Stock entero y no negativo (los formularios lo envían como texto)"""
+    try:
+        stock = int(valor)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="El stock debe ser un número entero")
+    if stock < 0:
+        raise HTTPException(status_code=422, detail="El stock no puede ser negativo")
+    return stock
+
 def create_producto(db: Session, producto_data: dict):
     # Validar campos requeridos
     required_fields = ['nombre', 'id_marca', 'stock', 'precio_mayorista', 'precio_minorista', 'id_categoria']
     for field in required_fields:
         if field not in producto_data:
             raise HTTPException(status_code=422, detail=f"Campo requerido faltante: {field}")
+    stock = _stock_valido(producto_data['stock'])
     
     try:
         nuevo_producto = Producto(
             nombre=producto_data['nombre'],
             id_marca=producto_data['id_marca'],
-            stock=producto_data['stock'],
+            stock=stock,
             precio_mayorista=producto_data['precio_mayorista'],
             precio_minorista=producto_data['precio_minorista'],
             id_categoria=producto_data['id_categoria'],
@@ -65,6 +230,8 @@ def create_producto(db: Session, producto_data: dict):
         )
         
         db.add(nuevo_producto)
+        db.flush()
+        registrar_ajuste(db, nuevo_producto.id_producto, nuevo_producto.stock, MOTIVO_SALDO_INICIAL)
         db.commit()
         db.refresh(nuevo_producto)
         
@@ -75,16 +242,27 @@ def create_producto(db: Session, producto_data: dict):
             joinedload(Producto.categoria)
         ).filter(Producto.id_producto == nuevo_producto.id_producto).first()
         
+        _indexar_producto(nuevo_producto)
         return nuevo_producto
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=422, detail=str(e))
 
 def update_producto(db: Session, id_producto: int, producto_data: dict):
-    producto = db.query(Producto).filter(Producto.id_producto == id_producto).first()
+    if "stock" in producto_data:
+        producto_data["stock"] = _stock_valido(producto_data["stock"])
+    consulta = db.query(Producto).filter(Producto.id_producto == id_producto)
+    if "stock" in producto_data:
+        # Bloquea la fila: un pedido concurrente no puede descontar entre la
+        # lectura del stock anterior y la escritura del nuevo
+        consulta = consulta.with_for_update()
+    producto = consulta.first()
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
+    if "stock" in producto_data:
+        registrar_ajuste(db, id_producto, producto_data["stock"] - producto.stock)
+    
     for key, value in producto_data.items():
         setattr(producto, key, value)
     
@@ -97,6 +275,7 @@ def update_producto(db: Session, id_producto: int, producto_data: dict):
         joinedload(Producto.categoria)
     ).filter(Producto.id_producto == id_producto).first()
     
+    _indexar_producto(producto)
     return producto
 
 def delete_producto(db: Session, id_producto: int):
@@ -104,30 +283,32 @@ def delete_producto(db: Session, id_producto: int):
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
-    # Eliminar archivo de imagen si existe
-    if producto.imagen:
-        import os
-        try:
-            # Construir la ruta del archivo
-            if producto.imagen.startswith('/uploads/'):
-                file_path = producto.imagen[1:]  # Remover el primer '/'
-            else:
-                file_path = f"uploads/productos/{producto.imagen}"
-            
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except Exception as e:
-            print(f"Error al eliminar imagen: {e}")
-    
+    imagen = producto.imagen
     db.delete(producto)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Pedidos o facturas que lo referencian (los movimientos de inventario quedan con NULL)
+        raise HTTPException(status_code=409, detail="El producto tiene pedidos o facturas asociados y no se puede eliminar")
+    indice_productos.eliminar(id_producto)
+
+    # La imagen (y sus variantes) se borra solo si la baja se confirmó
+    if imagen:
+        eliminar_imagen_producto(imagen)
     return {"mensaje": "Producto eliminado"}
 
+@medir_render("excel_productos")
 def export_productos_to_excel(db: Session):
     """
     Exporta los productos a un archivo Excel con diseño de tabla
     """
     try:
+        # pandas y openpyxl se cargan recién al exportar (no en cada worker)
+        import pandas as pd
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
         productos = db.query(Producto).options(
             joinedload(Producto.marca),
             joinedload(Producto.categoria)
@@ -217,7 +398,7 @@ def export_productos_to_excel(db: Session):
                 # Aplicar color especial para stock bajo
                 if col_num == 5:  # Columna de stock
                     try:
-                        stock_value = int(str(value))
+                        stock_value = int(value)
                         if stock_value <= 10:
                             cell.fill = PatternFill(start_color="FFCDD2", end_color="FFCDD2", fill_type="solid")  # Rojo claro
                         elif stock_value <= 20:
@@ -266,13 +447,13 @@ def export_productos_to_excel(db: Session):
         ws.cell(row=last_row + 1, column=2, value=productos_activos).font = Font(bold=True)
         
         # Productos con stock bajo (<=10)
-        productos_stock_bajo = len([p for p in productos if p.stock and int(str(p.stock)) <= 10])
+        productos_stock_bajo = len([p for p in productos if p.stock <= 10])
         ws.cell(row=last_row + 2, column=1, value="Productos con stock bajo (≤10):").font = Font(bold=True)
         ws.cell(row=last_row + 2, column=2, value=productos_stock_bajo).font = Font(bold=True, color="FF0000")
         
         # Valor total del inventario (precio minorista * stock)
         valor_total = sum([
-            (p.precio_minorista or 0) * (int(str(p.stock)) if p.stock and str(p.stock).isdigit() else 0)
+            (p.precio_minorista or 0) * p.stock
             for p in productos
         ])
         ws.cell(row=last_row + 3, column=1, value="Valor total inventario (minorista):").font = Font(bold=True)
@@ -290,4 +471,120 @@ def export_productos_to_excel(db: Session):
         print(f"Error detallado al exportar productos a Excel: {e}")
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error al generar archivo Excel: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al generar archivo Excel: {str(e)}")
+
+
+# Limpieza de imágenes huérfanas en uploads/productos
+MODOS_LIMPIEZA = ("reportar", "cuarentena", "eliminar")
+GRACIA_MINUTOS_DEFECTO = 60
+TAMANO_LOTE_HUERFANAS = 500
+DIRECTORIO_CUARENTENA = "cuarentena_uploads/productos"  # fuera de /uploads: no se sirve
+_MAX_EJEMPLOS_HUERFANAS = 20
+
+def _claves_imagenes_referenciadas(db: Session) -> set:
+    """Claves (ver clave_imagen) de todas las imágenes que usa algún producto"""
+    claves = set()
+    consulta = db.query(Producto.imagen).filter(Producto.imagen != None).distinct()
+    for (imagen,) in consulta.yield_per(5000):
+        ruta = ruta_local(imagen)
+        if ruta:
+            claves.add(clave_imagen(os.path.basename(ruta)))
+    return claves
+
+def _lotes_archivos(directorio: str, tamano_lote: int):
+    """Recorre el directorio sin cargar el listado completo, en lotes de DirEntry"""
+    lote = []
+    with os.scandir(directorio) as entradas:
+        for entrada in entradas:
+            if entrada.is_file(follow_symlinks=False):
+                lote.append(entrada)
+                if len(lote) >= tamano_lote:
+                    yield lote
+                    lote = []
+    if lote:
+        yield lote
+
+def reconciliar_imagenes_huerfanas(
+    db: Session,
+    modo: str = "reportar",
+    gracia_minutos: int = GRACIA_MINUTOS_DEFECTO,
+    directorio: str = DIRECTORIO_PRODUCTOS,
+):
+    """
+    Busca archivos de uploads/productos que ningún producto referencia y,
+    según `modo`, solo los reporta, los mueve a cuarentena o los elimina.
+    Los archivos modificados hace menos de `gracia_minutos` no se tocan
+    (subidas en curso o productos todavía sin guardar).
+    """
+    if modo not in MODOS_LIMPIEZA:
+        raise HTTPException(status_code=400, detail=f"Modo inválido: use {', '.join(MODOS_LIMPIEZA)}")
+
+    inicio = time.perf_counter()
+    reporte = {
+        "modo": modo,
+        "archivos_revisados": 0,
+        "huerfanos": 0,
+        "bytes_huerfanos": 0,
+        "bytes_recuperados": 0,
+        "omitidos_por_gracia": 0,
+        "errores": 0,
+        "ejemplos": [],
+    }
+    if not os.path.isdir(directorio):
+        reporte["tiempo_ms"] = 0.0
+        return reporte
+
+    referenciadas = _claves_imagenes_referenciadas(db)
+    limite = time.time() - gracia_minutos * 60
+    cuarentena = os.path.join(DIRECTORIO_CUARENTENA, datetime.now().strftime("%Y%m%d_%H%M%S"))
+
+    for lote in _lotes_archivos(directorio, TAMANO_LOTE_HUERFANAS):
+        reporte["archivos_revisados"] += len(lote)
+        huerfanos = []
+        for entrada in lote:
+            if clave_imagen(entrada.name) in referenciadas:
+                continue
+            stat_result = entrada.stat(follow_symlinks=False)
+            if stat_result.st_mtime > limite:
+                reporte["omitidos_por_gracia"] += 1
+                continue
+            huerfanos.append((entrada, stat_result.st_size))
+
+        reporte["huerfanos"] += len(huerfanos)
+        reporte["bytes_huerfanos"] += sum(tamano for _, tamano in huerfanos)
+        for entrada, _ in huerfanos[:_MAX_EJEMPLOS_HUERFANAS - len(reporte["ejemplos"])]:
+            reporte["ejemplos"].append(entrada.name)
+
+        if modo == "reportar" or not huerfanos:
+            continue
+        if modo == "cuarentena":
+            os.makedirs(cuarentena, exist_ok=True)
+        for entrada, tamano in huerfanos:
+            try:
+                if modo == "cuarentena":
+                    shutil.move(entrada.path, os.path.join(cuarentena, entrada.name))
+                else:
+                    os.remove(entrada.path)
+                reporte["bytes_recuperados"] += tamano
+            except OSError as e:
+                reporte["errores"] += 1
+                logger.warning(f"No se pudo limpiar {entrada.path}: {e}")
+        logger.info(f"Limpieza de imágenes ({modo}): lote de {len(huerfanos)} huérfanos procesado")
+
+    reporte["tiempo_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    logger.info(
+        f"Limpieza de imágenes ({modo}): {reporte['huerfanos']} huérfanos de "
+        f"{reporte['archivos_revisados']} archivos, {reporte['bytes_recuperados']} bytes recuperados"
+    )
+    return reporte
+
+def reconciliar_imagenes_huerfanas_en_segundo_plano(modo: str, gracia_minutos: int):
+    """Variante para BackgroundTasks: abre y cierra su propia sesión"""
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        reconciliar_imagenes_huerfanas(db, modo, gracia_minutos)
+    except Exception as e:
+        logger.error(f"Error en la limpieza de imágenes huérfanas: {e}")
+    finally:
+        db.close()
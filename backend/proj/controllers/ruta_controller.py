@@ -1,7 +1,9 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from models.models import Ruta, AsignacionRuta, UbicacionCliente, Usuario, Rol, Pedido, EstadoPedido, Cliente  # Agregar Cliente aquí  
-from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, selectinload, load_only
+from models.models import Ruta, AsignacionRuta, UbicacionCliente, Usuario, Rol, Pedido, EstadoPedido, Cliente, RegistroEliminado
+from sqlalchemy import and_, func, or_, update
+from controllers.ubicacion_cliente_controller import get_ubicaciones_en_poligono
+from utils.optimizador_rutas import optimizar_orden, TIEMPO_MAXIMO_DEFECTO_MS, MAXIMO_PARADAS
 from datetime import datetime
 
 # En ruta_controller.py - Corregir validate_user_role (línea ~8)
@@ -137,6 +139,18 @@ def update_ruta(db: Session, id_ruta: int, ruta_data: dict):
                     required_role = 'vendedor' if ruta.tipo_ruta == 'venta' else 'transportista'
                     validate_user_role(db, asignacion_data['identificacion_usuario'], required_role)
             
+            # Los usuarios que pierden la ruta la ven como eliminada en /sync;
+            # los que la mantienen o la reciben, como modificada
+            anteriores = {
+                usuario for (usuario,) in db.query(AsignacionRuta.identificacion_usuario).filter(
+                    AsignacionRuta.id_ruta == id_ruta, AsignacionRuta.identificacion_usuario.isnot(None)
+                )
+            }
+            nuevos = {a.get('identificacion_usuario') for a in asignaciones_data}
+            for usuario in anteriores - nuevos:
+                db.add(RegistroEliminado(tabla="asignacion_ruta", clave=str(id_ruta), ambito=usuario))
+            ruta.updated_at = func.now()
+            
             db.query(AsignacionRuta).filter(AsignacionRuta.id_ruta == id_ruta).delete()
             
             for asignacion_data in asignaciones_data:
@@ -181,9 +195,37 @@ def delete_ruta(db: Session, id_ruta: int):
 # REEMPLAZAR la función get_rutas_con_asignaciones:
 def get_rutas_con_asignaciones(db: Session):
     """Obtener rutas con sus asignaciones incluidas"""
-    rutas = db.query(Ruta).all()
-    resultado = []
+    # Cargar solo las columnas que se devuelven; relaciones en lote (sin N+1)
+    rutas = db.query(Ruta).options(
+        load_only(
+            Ruta.id_ruta, Ruta.nombre, Ruta.tipo_ruta, Ruta.sector, Ruta.direccion,
+            Ruta.estado, Ruta.fecha_creacion, Ruta.fecha_ejecucion, Ruta.id_pedido
+        ),
+        selectinload(Ruta.pedido).load_only(
+            Pedido.id_pedido, Pedido.numero_pedido, Pedido.fecha_pedido, Pedido.total,
+            Pedido.subtotal, Pedido.iva, Pedido.cod_cliente
+        ).selectinload(Pedido.cliente).load_only(
+            Cliente.cod_cliente, Cliente.nombre, Cliente.direccion, Cliente.sector
+        ),
+        selectinload(Ruta.asignaciones).load_only(
+            AsignacionRuta.id_asignacion, AsignacionRuta.id_ruta, AsignacionRuta.identificacion_usuario,
+            AsignacionRuta.tipo_usuario, AsignacionRuta.cod_cliente, AsignacionRuta.id_ubicacion,
+            AsignacionRuta.orden_visita
+        ).options(
+            selectinload(AsignacionRuta.usuario).load_only(
+                Usuario.identificacion, Usuario.nombre, Usuario.correo
+            ),
+            selectinload(AsignacionRuta.ubicacion).load_only(
+                UbicacionCliente.id_ubicacion, UbicacionCliente.direccion, UbicacionCliente.sector,
+                UbicacionCliente.latitud, UbicacionCliente.longitud, UbicacionCliente.referencia
+            )
+        )
+    ).all()
+    
+    # Último estado de todos los pedidos asignados en una sola consulta
+    estados = get_ultimos_estados_pedidos(db, [ruta.id_pedido for ruta in rutas if ruta.id_pedido])
     
+    resultado = []
     for ruta in rutas:
         ruta_dict = {
             "id_ruta": ruta.id_ruta,
@@ -209,7 +251,7 @@ def get_rutas_con_asignaciones(db: Session):
                 "subtotal": float(ruta.pedido.subtotal) if ruta.pedido.subtotal else 0,
                 "iva": float(ruta.pedido.iva) if ruta.pedido.iva else 0,
                 "cod_cliente": ruta.pedido.cod_cliente,
-                "estado": get_ultimo_estado_pedido(db, ruta.pedido.id_pedido),
+                "estado": estados.get(ruta.pedido.id_pedido, 'Sin estado'),
                 "cliente_info": {
                     "nombre": ruta.pedido.cliente.nombre if ruta.pedido.cliente else None,
                     "direccion": ruta.pedido.cliente.direccion if ruta.pedido.cliente else None,
@@ -382,6 +424,115 @@ def get_ubicaciones_por_sector(db: Session, sector: str):
         for ub in ubicaciones
     ]
 
+def get_ubicaciones_en_ruta(db: Session, id_ruta: int):
+    """Obtener las ubicaciones de clientes dentro del polígono de una ruta"""
+    ruta = db.query(Ruta).filter(Ruta.id_ruta == id_ruta).first()
+    if not ruta:
+        raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    if not ruta.poligono_geojson:
+        raise HTTPException(status_code=400, detail="La ruta no tiene un polígono definido")
+    
+    return get_ubicaciones_en_poligono(db, ruta.poligono_geojson)
+
+def optimizar_orden_visita(db: Session, id_ruta: int, inicio=None, tiempo_maximo_ms: int = TIEMPO_MAXIMO_DEFECTO_MS):
+    """
+    Calcula un orden de visita corto para las asignaciones de la ruta y lo
+    guarda en orden_visita con una sola actualización masiva.
+    Las asignaciones sin coordenadas quedan al final, en su orden actual.
+    """
+    try:
+        ruta = db.query(Ruta).filter(Ruta.id_ruta == id_ruta).first()
+        if not ruta:
+            raise HTTPException(status_code=404, detail="Ruta no encontrada")
+        
+        asignaciones = db.query(AsignacionRuta).options(
+            load_only(
+                AsignacionRuta.id_asignacion, AsignacionRuta.cod_cliente,
+                AsignacionRuta.id_ubicacion, AsignacionRuta.orden_visita
+            ),
+            selectinload(AsignacionRuta.ubicacion).load_only(
+                UbicacionCliente.id_ubicacion, UbicacionCliente.latitud, UbicacionCliente.longitud
+            )
+        ).filter(
+            AsignacionRuta.id_ruta == id_ruta
+        ).order_by(
+            AsignacionRuta.orden_visita.is_(None), AsignacionRuta.orden_visita, AsignacionRuta.id_asignacion
+        ).all()
+        
+        # Si la asignación no tiene ubicación, usar la ubicación principal del cliente
+        sin_ubicacion = {a.cod_cliente for a in asignaciones if not a.ubicacion and a.cod_cliente}
+        principales = {}
+        if sin_ubicacion:
+            principales = {
+                cod_cliente: (float(lat), float(lng))
+                for cod_cliente, lat, lng in db.query(
+                    Cliente.cod_cliente, UbicacionCliente.latitud, UbicacionCliente.longitud
+                ).join(
+                    UbicacionCliente, UbicacionCliente.id_ubicacion == Cliente.id_ubicacion_principal
+                ).filter(Cliente.cod_cliente.in_(sin_ubicacion))
+            }
+        
+        paradas = []
+        sin_coordenadas = []
+        for asignacion in asignaciones:
+            if asignacion.ubicacion:
+                paradas.append((asignacion, float(asignacion.ubicacion.latitud), float(asignacion.ubicacion.longitud)))
+            elif asignacion.cod_cliente in principales:
+                paradas.append((asignacion, *principales[asignacion.cod_cliente]))
+            else:
+                sin_coordenadas.append(asignacion)
+        
+        if len(paradas) > MAXIMO_PARADAS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"La ruta tiene {len(paradas)} paradas; el máximo para optimizar es {MAXIMO_PARADAS}"
+            )
+        
+        resultado = optimizar_orden(
+            [lat for _, lat, _ in paradas],
+            [lng for _, _, lng in paradas],
+            inicio=inicio,
+            tiempo_maximo_ms=tiempo_maximo_ms
+        )
+        
+        ordenadas = [paradas[i][0] for i in resultado["orden"]] + sin_coordenadas
+        # UPDATE por clave primaria con executemany; a diferencia de
+        # bulk_update_mappings pasa por do_orm_execute (registro de cambios)
+        db.execute(update(AsignacionRuta), [
+            {"id_asignacion": asignacion.id_asignacion, "orden_visita": posicion}
+            for posicion, asignacion in enumerate(ordenadas, start=1)
+        ])
+        # /sync entrega las rutas por updated_at: sin esto los dispositivos
+        # sin conexión no reciben el nuevo orden
+        ruta.updated_at = func.now()
+        db.commit()
+        
+        return {
+            "id_ruta": id_ruta,
+            "paradas": len(paradas),
+            "sin_coordenadas": len(sin_coordenadas),
+            "distancia_inicial_km": resultado["distancia_inicial_km"],
+            "distancia_optimizada_km": resultado["distancia_km"],
+            "tiempo_ms": resultado["tiempo_ms"],
+            "optimizacion_completa": resultado["completo"],
+            "orden": [
+                {
+                    "id_asignacion": asignacion.id_asignacion,
+                    "cod_cliente": asignacion.cod_cliente,
+                    "id_ubicacion": asignacion.id_ubicacion,
+                    "orden_visita": posicion
+                }
+                for posicion, asignacion in enumerate(ordenadas, start=1)
+            ]
+        }
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Error al optimizar orden de visita: {str(e)}")
+
 def get_pedidos_cliente_para_ruta(db: Session, cod_cliente: str, tipo_ruta: str = 'entrega'):
     """Obtener pedidos pendientes de un cliente para asignar a ruta de entrega"""
     from models.models import Pedido, EstadoPedido
@@ -420,6 +571,26 @@ def get_pedidos_cliente_para_ruta(db: Session, cod_cliente: str, tipo_ruta: str
         for p in pedidos
     ]
 
+def get_ultimos_estados_pedidos(db: Session, ids_pedido: list) -> dict:
+    """Obtener el último estado de varios pedidos en una sola consulta"""
+    if not ids_pedido:
+        return {}
+    
+    filas = db.query(
+        EstadoPedido.id_pedido, EstadoPedido.descripcion
+    ).filter(
+        EstadoPedido.id_pedido.in_(set(ids_pedido))
+    ).order_by(
+        EstadoPedido.id_pedido,
+        EstadoPedido.fecha_actualizada.desc(),
+        EstadoPedido.id_estado_pedido.desc()
+    ).all()
+    
+    estados = {}
+    for id_pedido, descripcion in filas:
+        estados.setdefault(id_pedido, descripcion)
+    return estados
+
 def get_ultimo_estado_pedido(db: Session, id_pedido: int):
     """Obtener el último estado de un pedido"""
     from models.models import EstadoPedido
@@ -0,0 +1,144 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from models.models import Producto, Cliente, UbicacionCliente, Ruta, AsignacionRuta, RegistroEliminado, RegistroCambio
+from models.response_models import ProductoSync, ClienteSync, UbicacionClienteSync, RutaSync
+from controllers.producto_controller import url_imagen
+from utils.respuestas import columnas
+from utils.cambios import leer_versiones
+from datetime import datetime, timedelta
+import base64
+import binascii
+import os
+
+# Solapamiento hacia atrás de cada token. updated_at se fija al escribir,
+# pero la fila recién es visible al hacer commit: una transacción que
+# tarda en confirmar puede quedar con updated_at anterior al token que ya
+# se entregó. Las filas de ese margen se reenvían (el dispositivo las
+# aplica como upsert), a cambio de no perder ninguna.
+MARGEN_S = int(os.getenv("SYNC_MARGEN_S", "120"))
+PREFIJO_TOKEN = "v1:"
+
+# Contadores de registro_cambio que se pueden consultar
+# con /sync/cambios (no usuarios ni roles)
+CONTADORES_PUBLICOS = {
+    "productos", "productos.stock", "marca", "categoria",
+    "cliente", "ubicacion_cliente", "ruta", "asignacion_ruta",
+}
+MAXIMO_CAMBIOS = 1000
+
+
+def codificar_token(momento: datetime) -> str:
+    return base64.urlsafe_b64encode(f"{PREFIJO_TOKEN}{momento.isoformat()}".encode()).decode().rstrip("=")
+
+
+def decodificar_token(token: str) -> datetime:
+    try:
+        texto = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        if not texto.startswith(PREFIJO_TOKEN):
+            raise ValueError(texto)
+        return datetime.fromisoformat(texto[len(PREFIJO_TOKEN):])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Token de sincronización inválido: haga una sincronización completa")
+
+
+def _filas(consulta, modelo, desde):
+    if desde is not None:
+        consulta = consulta.filter(modelo.updated_at > desde)
+    return [fila._asdict() for fila in consulta]
+
+
+def _eliminados(db: Session, tabla: str, desde, ambito: str = None) -> set:
+    if desde is None:
+        return set()
+    consulta = db.query(RegistroEliminado.clave).filter(
+        RegistroEliminado.tabla == tabla, RegistroEliminado.eliminado_en > desde
+    )
+    if ambito is not None:
+        consulta = consulta.filter(RegistroEliminado.ambito == ambito)
+    return {clave for (clave,) in consulta}
+
+
+def _seccion(db: Session, modelo, schema, desde) -> dict:
+    cambios = _filas(db.query(*columnas(modelo, schema)), modelo, desde)
+    return {"cambios": cambios, "eliminados": sorted(_eliminados(db, modelo.__tablename__, desde))}
+
+
+def _seccion_rutas(db: Session, identificacion: str, desde) -> dict:
+    asignadas = select(AsignacionRuta.id_ruta).where(AsignacionRuta.identificacion_usuario == identificacion)
+    cambios = _filas(db.query(*columnas(Ruta, RutaSync)).filter(Ruta.id_ruta.in_(asignadas)), Ruta, desde)
+
+    # Rutas eliminadas más las que le quitaron al usuario, salvo que siga
+    # asignado (las asignaciones se reemplazan completas al editar la ruta)
+    eliminadas = _eliminados(db, Ruta.__tablename__, desde) | _eliminados(db, "asignacion_ruta", desde, identificacion)
+    if eliminadas:
+        vigentes = {
+            str(id_ruta) for (id_ruta,) in db.execute(
+                asignadas.where(AsignacionRuta.id_ruta.in_([int(clave) for clave in eliminadas]))
+            )
+        }
+        eliminadas -= vigentes
+    return {"cambios": cambios, "eliminados": sorted(eliminadas)}
+
+
+def sincronizar(db: Session, identificacion: str, token: str = None) -> dict:
+    """
+    Cambios desde el token para el dispositivo de un usuario: filas creadas o
+    modificadas (updated_at) y claves eliminadas (registro_eliminado) de
+    productos, clientes, ubicaciones y las rutas asignadas al usuario.
+    Sin token devuelve todo (sincronización completa). El token nuevo
+    marca el momento de esta consulta según el reloj de la base de datos.
+    """
+    desde = decodificar_token(token) - timedelta(seconds=MARGEN_S) if token else None
+    ahora = db.execute(select(func.current_timestamp())).scalar()
+
+    productos = _seccion(db, Producto, ProductoSync, desde)
+    for producto in productos["cambios"]:
+        producto["imagen"] = url_imagen(producto["imagen"])
+
+    return {
+        "token": codificar_token(ahora),
+        "completo": desde is None,
+        "productos": productos,
+        "clientes": _seccion(db, Cliente, ClienteSync, desde),
+        "ubicaciones_cliente": _seccion(db, UbicacionCliente, UbicacionClienteSync, desde),
+        "rutas": _seccion_rutas(db, identificacion, desde),
+    }
+
+
+def cambios_desde(db: Session, contador: str, desde: int = 0, limite: int = MAXIMO_CAMBIOS) -> dict:
+    """
+    Filas de registro_cambio de un contador con versión mayor a `desde`, en
+    orden de versión. Solo se entregan versiones confiables (hasta `version`,
+    ver utils/cambios.py): una versión menor ya no puede aparecer después, así
+    que el cliente guarda la última versión recibida y la manda en la
+    próxima consulta sin perder cambios. Una clave NULL es un cambio masivo.
+    """
+    if contador not in CONTADORES_PUBLICOS:
+        raise HTTPException(status_code=400, detail=f"Contador desconocido: {contador}")
+    version = leer_versiones(db, [contador])[contador]
+    filas = db.execute(
+        select(RegistroCambio.clave, RegistroCambio.operacion, RegistroCambio.version)
+        .where(RegistroCambio.contador == contador, RegistroCambio.version > desde, RegistroCambio.version <= version)
+        .order_by(RegistroCambio.version, RegistroCambio.id_cambio)
+        .limit(limite + 1)
+    ).all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    # No cortar una versión por la mitad: sus filas llegan todas en la misma respuesta
+    if hay_mas and filas[-1].version > filas[0].version:
+        ultima = filas[-1].version
+        filas = [fila for fila in filas if fila.version < ultima]
+    elif hay_mas:
+        # Una sola transacción con más de `limite` filas
+        filas = db.execute(
+            select(RegistroCambio.clave, RegistroCambio.operacion, RegistroCambio.version)
+            .where(RegistroCambio.contador == contador, RegistroCambio.version == filas[0].version)
+            .order_by(RegistroCambio.id_cambio)
+        ).all()
+    return {
+        "contador": contador,
+        "version": version,
+        "cambios": [fila._asdict() for fila in filas],
+        "hay_mas": hay_mas,
+    }
@@ -1,6 +1,16 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload, load_only
+from sqlalchemy import and_, or_
 from models.models import UbicacionCliente, Cliente
+from utils.geo import (
+    celdas_para_radio, celdas_para_bbox, rangos_geohash, haversine_km,
+    parse_poligono_geojson, bbox_poligonos, punto_en_poligonos
+)
+
+# Radio inicial y límite para la búsqueda de los k más cercanos
+RADIO_INICIAL_KNN_KM = 1.0
+RADIO_MAXIMO_KM = 20038.0
+TAMANO_LOTE_IDS = 1000
 
 def get_ubicaciones(db: Session):
     return db.query(UbicacionCliente).all()
@@ -146,4 +156,109 @@ def get_ubicaciones_by_cliente(db: Session, cod_cliente: str):
     """
     Obtiene todas las ubicaciones de un cliente específico
     """
-    return db.query(UbicacionCliente).filter(UbicacionCliente.cod_cliente == cod_cliente).all()
\ No newline at end of file
+    return db.query(UbicacionCliente).filter(UbicacionCliente.cod_cliente == cod_cliente).all()
+
+def _filtro_celdas(celdas):
+    """Condición SQL por rangos de geohash (usa el índice B-tree de la columna)"""
+    condiciones = []
+    for inicio, fin in rangos_geohash(celdas):
+        if fin is None:
+            condiciones.append(UbicacionCliente.geohash >= inicio)
+        else:
+            condiciones.append(and_(UbicacionCliente.geohash >= inicio, UbicacionCliente.geohash < fin))
+    return or_(*condiciones)
+
+def _candidatos(db: Session, celdas):
+    """Coordenadas de las ubicaciones dentro de las celdas (None = todas)"""
+    query = db.query(UbicacionCliente.id_ubicacion, UbicacionCliente.latitud, UbicacionCliente.longitud)
+    if celdas is not None:
+        query = query.filter(_filtro_celdas(celdas))
+    return [(id_ubicacion, float(lat), float(lng)) for id_ubicacion, lat, lng in query]
+
+def _ubicaciones_con_distancia(db: Session, distancias: dict):
+    """Carga las ubicaciones encontradas y las devuelve ordenadas por distancia"""
+    if not distancias:
+        return []
+    
+    ids = list(distancias.keys())
+    ubicaciones = []
+    # Por lotes para no superar el límite de parámetros del motor
+    for i in range(0, len(ids), TAMANO_LOTE_IDS):
+        ubicaciones.extend(db.query(UbicacionCliente).options(
+            load_only(
+                UbicacionCliente.id_ubicacion, UbicacionCliente.cod_cliente, UbicacionCliente.latitud,
+                UbicacionCliente.longitud, UbicacionCliente.direccion, UbicacionCliente.sector,
+                UbicacionCliente.referencia
+            ),
+            selectinload(UbicacionCliente.cliente).load_only(Cliente.cod_cliente, Cliente.nombre, Cliente.celular)
+        ).filter(UbicacionCliente.id_ubicacion.in_(ids[i:i + TAMANO_LOTE_IDS])).all())
+    
+    resultado = [
+        {
+            "id_ubicacion": ub.id_ubicacion,
+            "cod_cliente": ub.cod_cliente,
+            "direccion": ub.direccion,
+            "sector": ub.sector,
+            "latitud": float(ub.latitud),
+            "longitud": float(ub.longitud),
+            "referencia": ub.referencia,
+            "distancia_km": distancias[ub.id_ubicacion],
+            "cliente_info": {
+                "nombre": ub.cliente.nombre if ub.cliente else None,
+                "celular": ub.cliente.celular if ub.cliente else None
+            }
+        }
+        for ub in ubicaciones
+    ]
+    resultado.sort(key=lambda ub: (ub["distancia_km"] is None, ub["distancia_km"] or 0, ub["id_ubicacion"]))
+    return resultado
+
+def get_ubicaciones_en_radio(db: Session, lat: float, lng: float, radio_km: float, limite: int = None):
+    """
+    Ubicaciones a `radio_km` o menos del punto, ordenadas por distancia.
+    El índice de geohash reduce los candidatos; la distancia exacta se filtra aquí.
+    """
+    distancias = {}
+    for id_ubicacion, u_lat, u_lng in _candidatos(db, celdas_para_radio(lat, lng, radio_km)):
+        distancia = haversine_km(lat, lng, u_lat, u_lng)
+        if distancia <= radio_km:
+            distancias[id_ubicacion] = round(distancia, 4)
+    
+    if limite is not None and len(distancias) > limite:
+        distancias = dict(sorted(distancias.items(), key=lambda item: (item[1], item[0]))[:limite])
+    return _ubicaciones_con_distancia(db, distancias)
+
+def get_ubicaciones_mas_cercanas(db: Session, lat: float, lng: float, k: int):
+    """
+    Las k ubicaciones más cercanas al punto.
+    Amplía el radio de búsqueda hasta tener k resultados dentro de él, de modo
+    que ninguna ubicación fuera del radio puede estar más cerca.
+    """
+    radio_km = RADIO_INICIAL_KNN_KM
+    while True:
+        celdas = celdas_para_radio(lat, lng, radio_km)
+        cercanas = []
+        for id_ubicacion, u_lat, u_lng in _candidatos(db, celdas):
+            distancia = haversine_km(lat, lng, u_lat, u_lng)
+            if distancia <= radio_km or celdas is None:
+                cercanas.append((distancia, id_ubicacion))
+        
+        if len(cercanas) >= k or celdas is None or radio_km >= RADIO_MAXIMO_KM:
+            cercanas.sort()
+            return _ubicaciones_con_distancia(
+                db, {id_ubicacion: round(distancia, 4) for distancia, id_ubicacion in cercanas[:k]}
+            )
+        radio_km = min(radio_km * 4, RADIO_MAXIMO_KM)
+
+def get_ubicaciones_en_poligono(db: Session, poligono_geojson: str):
+    """Ubicaciones dentro de un polígono GeoJSON (coordenadas [lng, lat])"""
+    try:
+        poligonos = parse_poligono_geojson(poligono_geojson)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    encontradas = {}
+    for id_ubicacion, u_lat, u_lng in _candidatos(db, celdas_para_bbox(*bbox_poligonos(poligonos))):
+        if punto_en_poligonos(u_lat, u_lng, poligonos):
+            encontradas[id_ubicacion] = None
+    return _ubicaciones_con_distancia(db, encontradas)
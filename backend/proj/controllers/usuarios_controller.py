@@ -1,13 +1,9 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from models.models import Usuario, Rol
-from utils.security import hash_password_with_salt, generate_salt
-# ← Nuevas importaciones para Excel
-import pandas as pd
+from utils.security import hash_password_with_salt, generate_salt, revoke_user_tokens
+from utils.metricas import medir_render
 import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
 
 def get_usuarios(db: Session):
@@ -90,12 +86,22 @@ def update_usuario(db: Session, identificacion: str, usuario_data: dict):
                 if 'salt' in usuario_data:
                     del usuario_data['salt']
         
+        # Los claims de rol y estado viajan firmados en el token: si cambian, se revocan
+        claims_cambiados = any(
+            key in usuario_data and usuario_data[key] != getattr(usuario, key)
+            for key in ('id_rol', 'estado')
+        )
+        
         # CAMBIO 4: Actualizar solo los campos que realmente cambiaron
         for key, value in usuario_data.items():
             if hasattr(usuario, key):  # Verificar que el atributo existe
                 setattr(usuario, key, value)
                 print(f"Actualizando campo {key}")
         
+        # En la misma transacción que el cambio: vale para todos los workers
+        if claims_cambiados or 'contrasena' in usuario_data:
+            revoke_user_tokens(usuario)
+        
         db.commit()
         db.refresh(usuario)
         
@@ -119,6 +125,7 @@ def delete_usuario(db: Session, identificacion: str):
         if not usuario:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
         
+        # Sus tokens dejan de valer solos: verify_token no encuentra al usuario
         db.delete(usuario)
         db.commit()
         return {"mensaje": "Usuario eliminado correctamente"}
@@ -130,11 +137,17 @@ def delete_usuario(db: Session, identificacion: str):
         raise HTTPException(status_code=500, detail="Error al eliminar usuario")
 
 # ← Nueva función para exportar a Excel
+@medir_render("excel_usuarios")
 def export_usuarios_to_excel(db: Session):
     """
     Exporta los usuarios a un archivo Excel con diseño de tabla
     """
     try:
+        # pandas y openpyxl se cargan recién al exportar (no en cada worker)
+        import pandas as pd
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
         # Obtener usuarios con sus roles
         from sqlalchemy.orm import joinedload
         usuarios = db.query(Usuario).options(joinedload(Usuario.rol)).all()
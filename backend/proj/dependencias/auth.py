@@ -1,9 +1,13 @@
+from dataclasses import dataclass
+from typing import Optional
+import threading
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from database import SessionLocal
-from models.models import Usuario
-from utils.security import verify_token
+from models.models import Rol, Usuario
+from utils.security import verify_token, build_user_claims
+from utils.cambios import monitor_versiones
 
 # Configuración del esquema de autenticación Bearer
 security = HTTPBearer()
@@ -16,18 +20,30 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(
+@dataclass
+class UsuarioToken:
+    """Usuario autenticado reconstruido solo con los claims firmados del token"""
+    identificacion: str
+    id_rol: Optional[int]
+    rol_descripcion: str
+    estado: Optional[str]
+
+def get_token_payload(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
+) -> dict:
+    """
+    Dependencia que verifica el token de acceso (firma, expiración y revocación)
+    """
+    return verify_token(credentials.credentials, db)
+
+def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db)
 ) -> Usuario:
     """
     Dependencia para obtener el usuario actual desde el token JWT
     """
-    token = credentials.credentials
-    
-    # Verificar y decodificar el token
-    payload = verify_token(token)
-    
     # Extraer la identificación del usuario del token
     user_id: str = payload.get("sub")
     if user_id is None:
@@ -48,11 +64,83 @@ def get_current_user(
     
     return user
 
+def get_current_user_claims(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db)
+) -> UsuarioToken:
+    """
+    Dependencia para obtener el usuario actual sin consultar la base de datos,
+    usando los claims de rol y estado firmados dentro del token
+    """
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if "rol" not in payload:
+        # Token emitido antes de incluir claims: se resuelve contra la BD con la sesión del request
+        user = db.query(Usuario).options(joinedload(Usuario.rol)).filter(
+            Usuario.identificacion == user_id
+        ).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario no encontrado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        payload = build_user_claims(user)
+    
+    usuario = UsuarioToken(
+        identificacion=user_id,
+        id_rol=payload.get("rol"),
+        rol_descripcion=payload.get("rol_desc") or "",
+        estado=payload.get("estado"),
+    )
+    if usuario.estado != 'activo':
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario inactivo",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return usuario
+
+class CacheRoles:
+    """
+    descripción -> id_rol de todos los roles, compartido por el worker. Se
+    carga con una consulta la primera vez que hace falta y se descarta
+    cuando cambia la tabla roles (ver utils/cambios.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = None
+
+    def id_rol(self, db: Session, descripcion: str) -> Optional[int]:
+        ids = self._ids
+        if ids is None:
+            with self._lock:
+                if self._ids is None:
+                    self._ids = dict(db.query(Rol.descripcion, Rol.id_rol).all())
+                ids = self._ids
+        return ids.get(descripcion)
+
+    def invalidar(self):
+        with self._lock:
+            self._ids = None
+
+
+cache_roles = CacheRoles()
+
+monitor_versiones.suscribir({"roles"}, lambda _: cache_roles.invalidar())
+
 def require_role(required_role_id: int):
     """
     Dependencia para verificar que el usuario tenga un rol específico por ID
     """
-    def role_checker(current_user: Usuario = Depends(get_current_user)):
+    def role_checker(current_user: UsuarioToken = Depends(get_current_user_claims)):
         if current_user.id_rol != required_role_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -63,10 +151,16 @@ def require_role(required_role_id: int):
 
 def require_role_by_name(required_role_name: str):
     """
-    Dependencia para verificar que el usuario tenga un rol específico por nombre
+    Dependencia para verificar que el usuario tenga un rol específico por nombre.
+    Compara id_rol: la descripción del token queda vieja si se renombra el rol.
+    El id del nombre sale de cache_roles (la sesión solo se usa al cargarla)
     """
-    def role_checker(current_user: Usuario = Depends(get_current_user)):
-        if current_user.rol.descripcion != required_role_name:
+    def role_checker(
+        current_user: UsuarioToken = Depends(get_current_user_claims),
+        db: Session = Depends(get_db)
+    ):
+        id_rol = cache_roles.id_rol(db, required_role_name)
+        if id_rol is None or current_user.id_rol != id_rol:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Permisos insuficientes"
@@ -78,7 +172,7 @@ def require_admin():
     """
     Dependencia específica para verificar que el usuario sea Admin
     """
-    def admin_checker(current_user: Usuario = Depends(get_current_user)):
+    def admin_checker(current_user: UsuarioToken = Depends(get_current_user_claims)):
         if current_user.id_rol != 1:  # Admin = id_rol 1
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
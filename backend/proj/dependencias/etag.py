@@ -0,0 +1,43 @@
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+from models.models import Usuario
+from dependencias.auth import get_db, get_current_user
+from utils.cambios import leer_versiones
+from utils.etag import calcular_etag, coincide_etag, CACHE_CONTROL
+from utils.migraciones import VERSION_ESQUEMA
+
+
+def etag_por_version(*contadores: str):
+    """
+    Dependencia para GET de listados que dependen de las tablas `contadores`
+    (ver utils/cambios.py). Calcula el ETag con una consulta a
+    registro_cambio antes de que corra el endpoint y, si coincide con
+    If-None-Match, responde 304 sin consultar ni serializar los datos:
+
+        @router.get("/marcas", dependencies=[Depends(etag_por_version("marca"))])
+
+    Depende de get_current_user (el mismo que resuelve el endpoint, FastAPI
+    lo evalúa una vez por request): un token revocado o de un usuario
+    eliminado recibe 401 y no un 304.
+    La respuesta no debe depender del usuario ni de nada fuera de esas
+    tablas, salvo los parámetros de la URL (el navegador guarda una entrada
+    por URL).
+    """
+    contadores = tuple(sorted(contadores))
+
+    def verificar_etag(
+        request: Request,
+        current_user: Usuario = Depends(get_current_user),
+        db: Session = Depends(get_db)
+    ):
+        versiones = leer_versiones(db, contadores)
+        etag = calcular_etag(VERSION_ESQUEMA, *(f"{contador}={versiones[contador]}" for contador in contadores))
+        if coincide_etag(request.headers.get("if-none-match"), etag):
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+            )
+        # ETagMiddleware lo agrega a la respuesta 200
+        request.state.etag = etag
+
+    return verificar_etag
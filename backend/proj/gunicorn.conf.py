@@ -0,0 +1,109 @@
+"""
+Configuración de producción: gunicorn como gestor de procesos con workers
+de uvicorn.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+- Un worker por núcleo disponible (WEB_WORKERS para fijarlo a mano)
+- preload_app: app.py, los módulos importados y las cachés de solo lectura se
+  cargan una vez en el proceso maestro y los workers los comparten
+  copy-on-write después del fork
+- Las migraciones pendientes se aplican una sola vez en el maestro, antes de
+  lanzar los workers (MIGRAR_AL_INICIAR=verificar para que solo verifique,
+  ver utils/migraciones.py)
+- max_requests con jitter recicla los workers de a poco (fugas de memoria,
+  fragmentación) y graceful_timeout deja terminar los requests en curso
+  al reiniciar (SIGHUP) o apagar (SIGTERM)
+- Salud por worker en /salud (liveness) y /salud/lista (readiness)
+"""
+
+import gc
+import os
+
+
+def _nucleos_disponibles() -> int:
+    # Respeta la afinidad de CPU del contenedor/cgroup si la hay
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+try:
+    import uvicorn_worker  # noqa: F401
+    worker_class = "uvicorn_worker.UvicornWorker"
+except ImportError:
+    # Paquete uvicorn-worker no instalado: worker incluido en uvicorn
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+bind = os.getenv("VENDLY_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_WORKERS", "0")) or _nucleos_disponibles()
+preload_app = True
+
+# Reciclado y apagado ordenado
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+# El catálogo PDF grande puede tardar: el heartbeat del worker tolera 2 minutos
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+keepalive = 5
+
+# El heartbeat de los workers en memoria y no en disco (evita bloqueos por I/O)
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = os.getenv("WEB_ACCESS_LOG")  # sin valor: sin access log (ya hay log por request)
+errorlog = "-"
+proc_name = "vendly"
+
+
+def on_starting(server):
+    """En el maestro, una sola vez: esquema al día antes de lanzar los workers"""
+    from database import engine
+    from utils.migraciones import verificar_esquema
+
+    # Aquí sí se migra por defecto: corre en un solo proceso
+    version = verificar_esquema(engine, os.getenv("MIGRAR_AL_INICIAR", "auto"))
+    server.log.info(f"Esquema de base de datos en la versión {version}")
+    # Los workers heredan el entorno: su lifespan no vuelve a consultar
+    os.environ["MIGRAR_AL_INICIAR"] = "no"
+
+
+def when_ready(server):
+    """Precarga de cachés de solo lectura en el maestro, antes del primer fork"""
+    from database import SessionLocal, engine
+    from controllers.producto_controller import construir_indice_busqueda
+    from controllers.pedido_controller import precargar_precios
+    from utils.cambios import monitor_versiones
+
+    db = SessionLocal()
+    try:
+        # Versiones base de las cachés precargadas: cada worker, al arrancar
+        # su monitor, invalida solo lo que cambió después del fork
+        monitor_versiones.revisar(engine)
+        construir_indice_busqueda(db)
+        precargar_precios(db)
+    except Exception as e:
+        server.log.warning(f"No se pudo precargar el índice de búsqueda y los precios: {e}")
+    finally:
+        db.close()
+    # Las conexiones abiertas en el maestro no se deben compartir con los hijos
+    engine.dispose()
+
+    # Mueve los objetos existentes a la generación permanente: el GC de los
+    # workers no los recorre y no ensucia sus páginas compartidas
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from database import engine
+
+    # Descarta el pool heredado sin cerrar las conexiones del maestro
+    engine.dispose(close=False)
+
+
+def worker_int(worker):
+    worker.log.info(f"Worker {worker.pid} interrumpido, terminando requests en curso")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} terminado")
@@ -0,0 +1,14 @@
+"""
+Crea las tablas que falten a partir de models.py (lo que antes hacía el
+lifespan de app.py en cada arranque). En una base existente no modifica las
+tablas que ya están.
+"""
+
+from database import Base
+import models.models  # noqa: F401  registra los modelos en Base.metadata
+
+DESCRIPCION = "Tablas iniciales desde models.py"
+
+
+def aplicar(engine):
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,53 @@
+"""
+Agrega la columna geohash a ubicacion_cliente con su índice y la calcula
+para las ubicaciones existentes, por lotes (antes scripts/migrate_geohash.py).
+"""
+
+import logging
+from sqlalchemy import bindparam, inspect, text
+from utils.geo import encode_geohash
+
+logger = logging.getLogger(__name__)
+
+DESCRIPCION = "Columna geohash en ubicacion_cliente"
+
+TAMANO_LOTE = 5000
+
+
+def agregar_columna_e_indice(engine):
+    inspector = inspect(engine)
+    columnas = {c["name"] for c in inspector.get_columns("ubicacion_cliente")}
+    indices = {i["name"] for i in inspector.get_indexes("ubicacion_cliente")}
+
+    with engine.begin() as conn:
+        if "geohash" not in columnas:
+            conn.execute(text("ALTER TABLE ubicacion_cliente ADD COLUMN geohash VARCHAR(12)"))
+        if "ix_ubicacion_cliente_geohash" not in indices:
+            conn.execute(text("CREATE INDEX ix_ubicacion_cliente_geohash ON ubicacion_cliente (geohash)"))
+
+
+def completar_geohash(engine):
+    actualizar = text(
+        "UPDATE ubicacion_cliente SET geohash = :geohash WHERE id_ubicacion = :id_ubicacion"
+    ).bindparams(bindparam("geohash"), bindparam("id_ubicacion"))
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            filas = conn.execute(text(
+                "SELECT id_ubicacion, latitud, longitud FROM ubicacion_cliente "
+                "WHERE geohash IS NULL ORDER BY id_ubicacion LIMIT :limite"
+            ), {"limite": TAMANO_LOTE}).all()
+            if not filas:
+                break
+            conn.execute(actualizar, [
+                {"id_ubicacion": id_ubicacion, "geohash": encode_geohash(float(latitud), float(longitud))}
+                for id_ubicacion, latitud, longitud in filas
+            ])
+        total += len(filas)
+    if total:
+        logger.info(f"Geohash completado para {total} ubicaciones")
+
+
+def aplicar(engine):
+    agregar_columna_e_indice(engine)
+    completar_geohash(engine)
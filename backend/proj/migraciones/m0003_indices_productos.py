@@ -0,0 +1,39 @@
+"""
+Índices de los filtros del catálogo de productos (antes
+scripts/migrate_indices_productos.py):
+- B-tree sobre id_marca, id_categoria y precio_minorista
+- En PostgreSQL: extensión pg_trgm e índices GIN de trigramas sobre
+  productos.nombre, marca.descripcion y categoria.descripcion, para que las
+  búsquedas ILIKE '%texto%' no recorran toda la tabla
+"""
+
+from sqlalchemy import text
+
+DESCRIPCION = "Índices de filtros y búsqueda de productos"
+
+INDICES_BTREE = [
+    ("ix_productos_id_marca", "productos", "id_marca"),
+    ("ix_productos_id_categoria", "productos", "id_categoria"),
+    ("ix_productos_precio_minorista", "productos", "precio_minorista"),
+]
+
+INDICES_TRIGRAMA = [
+    ("ix_productos_nombre_trgm", "productos", "nombre"),
+    ("ix_marca_descripcion_trgm", "marca", "descripcion"),
+    ("ix_categoria_descripcion_trgm", "categoria", "descripcion"),
+]
+
+
+def aplicar(engine):
+    with engine.begin() as conn:
+        for nombre, tabla, columna in INDICES_BTREE:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columna})"))
+
+        if engine.dialect.name != "postgresql":
+            return
+
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for nombre, tabla, columna in INDICES_TRIGRAMA:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} USING gin ({columna} gin_trgm_ops)"
+            ))
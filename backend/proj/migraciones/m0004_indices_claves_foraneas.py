@@ -0,0 +1,54 @@
+"""
+Índices de las claves foráneas y columnas de búsqueda más consultadas
+(antes scripts/migrate_indices_claves_foraneas.py). Los nombres coinciden con
+los que genera create_all a partir de models.py. En PostgreSQL se crean con
+CONCURRENTLY para no bloquear las escrituras.
+"""
+
+import logging
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+DESCRIPCION = "Índices de claves foráneas y login"
+
+INDICES = [
+    ("ix_detalle_pedido_id_pedido", "detalle_pedido", "id_pedido"),
+    ("ix_estado_pedido_id_pedido", "estado_pedido", "id_pedido"),
+    ("ix_asignacion_ruta_id_ruta", "asignacion_ruta", "id_ruta"),
+    ("ix_asignacion_ruta_identificacion_usuario", "asignacion_ruta", "identificacion_usuario"),
+    ("ix_ubicacion_cliente_cod_cliente", "ubicacion_cliente", "cod_cliente"),
+    ("ix_ubicacion_cliente_sector", "ubicacion_cliente", "sector"),
+    ("ix_ruta_id_pedido", "ruta", "id_pedido"),
+    ("ix_usuarios_rucempresarial_correo", "usuarios", "rucempresarial, correo"),
+]
+
+
+def _eliminar_si_invalido(conn, nombre: str):
+    """Un CREATE INDEX CONCURRENTLY interrumpido deja el índice marcado como inválido"""
+    invalido = conn.execute(text(
+        "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+        "WHERE c.relname = :nombre AND NOT i.indisvalid"
+    ), {"nombre": nombre}).first()
+    if invalido:
+        logger.warning(f"{nombre} quedó inválido en una ejecución anterior, se vuelve a crear")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}"))
+
+
+def aplicar(engine):
+    postgres = engine.dialect.name == "postgresql"
+    # CONCURRENTLY no puede correr dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for nombre, tabla, columnas in INDICES:
+            if postgres:
+                _eliminar_si_invalido(conn, nombre)
+                conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla} ({columnas})"))
+            else:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})"))
+
+        # Estadísticas al día para que el planificador use los índices nuevos
+        if postgres:
+            for tabla in sorted({tabla for _, tabla, _ in INDICES}):
+                conn.execute(text(f"ANALYZE {tabla}"))
+        else:
+            conn.execute(text("ANALYZE"))
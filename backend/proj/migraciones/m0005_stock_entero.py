@@ -0,0 +1,70 @@
+"""
+Convierte productos.stock de texto a entero (valores no numéricos quedan en
+0), le agrega la restricción stock >= 0 y crea movimiento_inventario con un
+saldo inicial por producto, para que la suma de movimientos dé el stock.
+SQLite no permite cambiar el tipo de una columna: se agrega una columna
+entera, se copia y se reemplaza la original.
+"""
+
+import logging
+from sqlalchemy import Integer, inspect, text
+from models.models import MovimientoInventario
+
+logger = logging.getLogger(__name__)
+
+DESCRIPCION = "Stock entero y movimiento_inventario"
+
+RESTRICCION = "ck_productos_stock_no_negativo"
+
+
+def _stock_es_entero(engine) -> bool:
+    columna = next(c for c in inspect(engine).get_columns("productos") if c["name"] == "stock")
+    return isinstance(columna["type"], Integer)
+
+
+def convertir_postgres(engine):
+    with engine.begin() as conn:
+        if not _stock_es_entero(engine):
+            conn.execute(text(
+                "ALTER TABLE productos ALTER COLUMN stock TYPE INTEGER USING "
+                "CASE WHEN trim(stock) ~ '^[0-9]+$' THEN trim(stock)::integer ELSE 0 END"
+            ))
+        conn.execute(text("UPDATE productos SET stock = 0 WHERE stock IS NULL OR stock < 0"))
+        conn.execute(text("ALTER TABLE productos ALTER COLUMN stock SET DEFAULT 0"))
+        conn.execute(text("ALTER TABLE productos ALTER COLUMN stock SET NOT NULL"))
+        existe = conn.execute(text("SELECT 1 FROM pg_constraint WHERE conname = :nombre"), {"nombre": RESTRICCION}).first()
+        if not existe:
+            conn.execute(text(f"ALTER TABLE productos ADD CONSTRAINT {RESTRICCION} CHECK (stock >= 0)"))
+
+
+def convertir_sqlite(engine):
+    if _stock_es_entero(engine):
+        return
+    # La columna con afinidad TEXT guardaría los enteros otra vez como texto
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE productos ADD COLUMN stock_entero INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text(
+            "UPDATE productos SET stock_entero = CASE "
+            "WHEN trim(stock) <> '' AND trim(stock) NOT GLOB '*[^0-9]*' THEN CAST(trim(stock) AS INTEGER) "
+            "ELSE 0 END"
+        ))
+        conn.execute(text("ALTER TABLE productos DROP COLUMN stock"))
+        conn.execute(text("ALTER TABLE productos RENAME COLUMN stock_entero TO stock"))
+
+
+def aplicar(engine):
+    if engine.dialect.name == "postgresql":
+        convertir_postgres(engine)
+    else:
+        convertir_sqlite(engine)
+
+    MovimientoInventario.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        # Solo la primera vez: los productos existentes arrancan su historial
+        # con el stock que tienen
+        if conn.execute(text("SELECT 1 FROM movimiento_inventario LIMIT 1")).first() is None:
+            insertados = conn.execute(text(
+                "INSERT INTO movimiento_inventario (id_producto, cantidad, motivo) "
+                "SELECT id_producto, stock, 'saldo_inicial' FROM productos WHERE stock > 0"
+            )).rowcount
+            logger.info(f"Saldo inicial registrado para {insertados} productos")
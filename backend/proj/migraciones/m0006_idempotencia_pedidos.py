@@ -0,0 +1,25 @@
+"""
+Columna clave_idempotencia en pedido con índice único (los pedidos sin
+clave quedan en NULL, que no choca con el índice). Permite reenviar un lote
+de pedidos sin duplicarlos.
+"""
+
+from sqlalchemy import inspect, text
+
+DESCRIPCION = "Clave de idempotencia de pedidos"
+
+INDICE = "ux_pedido_clave_idempotencia"
+
+
+def aplicar(engine):
+    columnas = {c["name"] for c in inspect(engine).get_columns("pedido")}
+    if "clave_idempotencia" not in columnas:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE pedido ADD COLUMN clave_idempotencia VARCHAR(64)"))
+
+    concurrente = "CONCURRENTLY " if engine.dialect.name == "postgresql" else ""
+    # CONCURRENTLY no puede correr dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            f"CREATE UNIQUE INDEX {concurrente}IF NOT EXISTS {INDICE} ON pedido (clave_idempotencia)"
+        ))
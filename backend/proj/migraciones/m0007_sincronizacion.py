@@ -0,0 +1,29 @@
+"""
+Columna updated_at (con índice) en las tablas que descargan los
+dispositivos y tabla registro_eliminado con las lápidas de las bajas, para
+la sincronización incremental de /sync. Las filas existentes quedan con la
+fecha de la migración: el primer /sync con token las trae una vez.
+"""
+
+from sqlalchemy import inspect, text
+from models.models import RegistroEliminado
+
+DESCRIPCION = "updated_at y lápidas para /sync"
+
+TABLAS = ["productos", "cliente", "ubicacion_cliente", "ruta"]
+
+
+def aplicar(engine):
+    inspector = inspect(engine)
+    for tabla in TABLAS:
+        columnas = {c["name"] for c in inspector.get_columns(tabla)}
+        indices = {i["name"] for i in inspector.get_indexes(tabla)}
+        with engine.begin() as conn:
+            if "updated_at" not in columnas:
+                # SQLite no acepta un DEFAULT no constante en ADD COLUMN: se completa aparte
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN updated_at TIMESTAMP"))
+            conn.execute(text(f"UPDATE {tabla} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+            if f"ix_{tabla}_updated_at" not in indices:
+                conn.execute(text(f"CREATE INDEX ix_{tabla}_updated_at ON {tabla} (updated_at)"))
+
+    RegistroEliminado.__table__.create(engine, checkfirst=True)
@@ -0,0 +1,31 @@
+"""
+Tablas registro_cambio (historial de cambios, solo inserción) y
+version_tabla (un contador por tabla) que escriben los eventos de sesión de
+utils/cambios.py. Se siembra un contador en 0 por tabla para que las
+transacciones solo hagan UPDATE.
+"""
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+from database import Base
+from models.models import RegistroCambio
+from utils.cambios import contadores
+
+# Definida aquí y no en models.py: la migración 11 la reemplaza y la elimina
+_metadata = MetaData()
+version_tabla = Table(
+    "version_tabla", _metadata,
+    Column("tabla", String(60), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+)
+
+DESCRIPCION = "registro de cambios y versiones por tabla"
+
+
+def aplicar(engine):
+    RegistroCambio.__table__.create(engine, checkfirst=True)
+    version_tabla.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        existentes = set(conn.execute(select(version_tabla.c.tabla)).scalars())
+        nuevos = [c for c in contadores(sorted(Base.metadata.tables)) if c not in existentes]
+        if nuevos:
+            conn.execute(version_tabla.insert(), [{"tabla": c, "version": 0} for c in nuevos])
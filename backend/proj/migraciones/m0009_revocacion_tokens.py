@@ -0,0 +1,19 @@
+"""
+Revocación de tokens en la base en lugar de en memoria de cada worker:
+tabla token_revocado (jti hasta su expiración) y columna
+usuarios.tokens_validos_desde. Las revocaciones en memoria anteriores se
+pierden al desplegar, como ya pasaba al reiniciar un worker.
+"""
+
+from sqlalchemy import inspect, text
+from models.models import TokenRevocado
+
+DESCRIPCION = "revocación de tokens compartida entre workers"
+
+
+def aplicar(engine):
+    columnas = {c["name"] for c in inspect(engine).get_columns("usuarios")}
+    if "tokens_validos_desde" not in columnas:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE usuarios ADD COLUMN tokens_validos_desde TIMESTAMP"))
+    TokenRevocado.__table__.create(engine, checkfirst=True)
@@ -0,0 +1,62 @@
+"""
+movimiento_inventario.id_producto pasa a admitir NULL con ON DELETE SET NULL:
+eliminar un producto con movimientos ya no falla por la clave foránea y el
+historial se conserva. SQLite no permite cambiar una columna ni su clave
+foránea: se recrea la tabla y se copian las filas.
+"""
+
+from sqlalchemy import inspect, text
+from models.models import MovimientoInventario
+
+DESCRIPCION = "movimiento_inventario.id_producto opcional (ON DELETE SET NULL)"
+
+TABLA = "movimiento_inventario"
+
+
+def _clave_producto(engine):
+    return next(
+        (fk for fk in inspect(engine).get_foreign_keys(TABLA) if fk["referred_table"] == "productos"),
+        None,
+    )
+
+
+def _ya_aplicada(engine) -> bool:
+    columna = next(c for c in inspect(engine).get_columns(TABLA) if c["name"] == "id_producto")
+    clave = _clave_producto(engine)
+    ondelete = ((clave or {}).get("options") or {}).get("ondelete") or ""
+    return columna["nullable"] and ondelete.upper() == "SET NULL"
+
+
+def convertir_postgres(engine):
+    clave = _clave_producto(engine)
+    nombre = (clave or {}).get("name") or "movimiento_inventario_id_producto_fkey"
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {TABLA} ALTER COLUMN id_producto DROP NOT NULL"))
+        if clave:
+            conn.execute(text(f"ALTER TABLE {TABLA} DROP CONSTRAINT {nombre}"))
+        conn.execute(text(
+            f"ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} FOREIGN KEY (id_producto) "
+            f"REFERENCES productos (id_producto) ON DELETE SET NULL"
+        ))
+
+
+def convertir_sqlite(engine):
+    indices = [indice["name"] for indice in inspect(engine).get_indexes(TABLA)]
+    columnas = ", ".join(c.name for c in MovimientoInventario.__table__.columns)
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {TABLA} RENAME TO {TABLA}_anterior"))
+        # Los índices se mueven con la tabla renombrada y sus nombres chocarían
+        for indice in indices:
+            conn.execute(text(f"DROP INDEX IF EXISTS {indice}"))
+        MovimientoInventario.__table__.create(conn)
+        conn.execute(text(f"INSERT INTO {TABLA} ({columnas}) SELECT {columnas} FROM {TABLA}_anterior"))
+        conn.execute(text(f"DROP TABLE {TABLA}_anterior"))
+
+
+def aplicar(engine):
+    if _ya_aplicada(engine):
+        return
+    if engine.dialect.name == "postgresql":
+        convertir_postgres(engine)
+    else:
+        convertir_sqlite(engine)
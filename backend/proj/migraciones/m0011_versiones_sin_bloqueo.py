@@ -0,0 +1,23 @@
+"""
+Versiones del registro de cambios sin contador bloqueante: cada transacción
+registra sus cambios con su propio id (PostgreSQL) en lugar de tomar la fila
+de version_tabla hasta el commit, así que se elimina esa tabla.
+registro_cambio.version pasa a BIGINT (los ids de transacción llevan época)
+y se indexa sola para la lectura periódica de los workers. Las versiones ya
+registradas son menores que cualquier id de transacción nuevo: los clientes
+de /sync/cambios conservan su última versión.
+"""
+
+from sqlalchemy import BigInteger, inspect, text
+
+DESCRIPCION = "versiones de registro_cambio sin version_tabla"
+
+
+def aplicar(engine):
+    columna = next(c for c in inspect(engine).get_columns("registro_cambio") if c["name"] == "version")
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql" and not isinstance(columna["type"], BigInteger):
+            conn.execute(text("ALTER TABLE registro_cambio ALTER COLUMN version TYPE BIGINT"))
+        # En SQLite INTEGER ya es de 64 bits
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_registro_cambio_version ON registro_cambio (version)"))
+        conn.execute(text("DROP TABLE IF EXISTS version_tabla"))
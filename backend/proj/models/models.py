@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Float, Text, DECIMAL, TIMESTAMP, Enum
+from sqlalchemy import Column, BigInteger, Integer, String, Date, ForeignKey, Float, Text, DECIMAL, TIMESTAMP, Enum, Index, CheckConstraint
 from sqlalchemy.orm import relationship, Session
 from database import Base  
 from pydantic import BaseModel, validator
 from datetime import datetime
 from typing import Optional
 from sqlalchemy import func  # Añade este import al inicio del archivo models.py
+from sqlalchemy import event, inspect, Insert, Update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm.attributes import flag_modified
 
 
 # Modelo Pydantic para login con validaciones mejoradas
@@ -60,9 +63,24 @@ class Usuario(Base):
     estado = Column(String(50))
     fecha_actualizacion = Column(Date)
     id_rol = Column(Integer, ForeignKey('roles.id_rol'))
+    # Los tokens emitidos antes de este momento (UTC) son inválidos: cambio
+    # de rol, estado o contraseña
+    tokens_validos_desde = Column(TIMESTAMP)
 
     rol = relationship("Rol", back_populates="usuarios")
 
+    # El login busca por RUC y correo
+    __table_args__ = (
+        Index("ix_usuarios_rucempresarial_correo", "rucempresarial", "correo"),
+    )
+
+class TokenRevocado(Base):
+    """jti de un token revocado (logout, rotación del refresh) hasta su expiración"""
+    __tablename__ = 'token_revocado'
+
+    jti = Column(String(64), primary_key=True)
+    exp = Column(TIMESTAMP, nullable=False, index=True)
+
 class Categoria(Base):
     __tablename__ = 'categoria'
 
@@ -80,29 +98,55 @@ class Producto(Base):
 
     id_producto = Column(Integer, primary_key=True, autoincrement=True, index=True)
     nombre = Column(String(255))
-    id_marca = Column(Integer, ForeignKey('marca.id_marca'))
-    stock = Column(String)
+    id_marca = Column(Integer, ForeignKey('marca.id_marca'), index=True)
+    # Unidades disponibles; los pedidos la mueven con inventario_controller (UPDATE condicional)
+    stock = Column(Integer, nullable=False, default=0, server_default="0")
     precio_mayorista = Column(Float)
-    precio_minorista = Column(Float)
-    id_categoria = Column(Integer, ForeignKey('categoria.id_categoria'))
+    precio_minorista = Column(Float, index=True)
+    id_categoria = Column(Integer, ForeignKey('categoria.id_categoria'), index=True)
     iva = Column(Float)
     estado = Column(String(50))
     imagen = Column(String(255))
+    # Última modificación, para /sync (también la actualizan los UPDATE de Core)
+    updated_at = Column(TIMESTAMP, default=func.now(), onupdate=func.now(), index=True)
 
     marca = relationship("Marca")
     categoria = relationship("Categoria")
 
+    __table_args__ = (
+        CheckConstraint("stock >= 0", name="ck_productos_stock_no_negativo"),
+    )
+
+class MovimientoInventario(Base):
+    """Historial de entradas y salidas de stock: la suma por producto da su stock"""
+    __tablename__ = 'movimiento_inventario'
+
+    id_movimiento = Column(Integer, primary_key=True, autoincrement=True)
+    # NULL si se eliminó el producto: el historial se conserva y no impide la baja
+    id_producto = Column(Integer, ForeignKey('productos.id_producto', ondelete="SET NULL"), index=True)
+    # Sin clave foránea: el historial se conserva aunque se elimine el pedido
+    id_pedido = Column(Integer, index=True)
+    cantidad = Column(Integer, nullable=False)  # negativa: salida, positiva: entrada
+    motivo = Column(String(50), nullable=False)
+    fecha = Column(TIMESTAMP, server_default=func.now())
+
 class UbicacionCliente(Base):
     __tablename__ = 'ubicacion_cliente'
 
     id_ubicacion = Column(Integer, primary_key=True, autoincrement=True, index=True)
-    cod_cliente = Column(String(50), ForeignKey('cliente.cod_cliente'), nullable=False)
+    cod_cliente = Column(String(50), ForeignKey('cliente.cod_cliente'), nullable=False, index=True)
     latitud = Column(DECIMAL(10, 8), nullable=False)
     longitud = Column(DECIMAL(11, 8), nullable=False)
     direccion = Column(Text, nullable=False)
-    sector = Column(String(100), nullable=False)
+    sector = Column(String(100), nullable=False, index=True)
     referencia = Column(Text)
     fecha_registro = Column(TIMESTAMP, server_default=func.now())  # Cambiado aquí
+    # Índice espacial: geohash de (latitud, longitud). Lo calcula el ORM al
+    # guardar la instancia; un INSERT/UPDATE masivo o de Core que cambie las
+    # coordenadas debe enviar también el geohash (ver _exigir_geohash)
+    geohash = Column(String(12), index=True)
+    # Última modificación, para /sync (también la actualizan los UPDATE de Core)
+    updated_at = Column(TIMESTAMP, default=func.now(), onupdate=func.now(), index=True)
 
     cliente = relationship(
         "Cliente",
@@ -110,6 +154,44 @@ class UbicacionCliente(Base):
         foreign_keys=[cod_cliente]  # <--- Especificar aquí
     )
 
+@event.listens_for(UbicacionCliente, "before_insert")
+@event.listens_for(UbicacionCliente, "before_update")
+def _actualizar_geohash(mapper, connection, ubicacion):
+    """Mantiene el geohash sincronizado con las coordenadas"""
+    from utils.geo import encode_geohash
+
+    if ubicacion.latitud is not None and ubicacion.longitud is not None:
+        ubicacion.geohash = encode_geohash(float(ubicacion.latitud), float(ubicacion.longitud))
+        # Aunque quede en la misma celda, el UPDATE lleva el geohash junto a
+        # las coordenadas (así lo exige _exigir_geohash)
+        estado = inspect(ubicacion)
+        if estado.attrs.latitud.history.has_changes() or estado.attrs.longitud.history.has_changes():
+            flag_modified(ubicacion, "geohash")
+
+_COORDENADAS = {"latitud", "longitud"}
+
+@event.listens_for(Engine, "before_execute")
+def _exigir_geohash(conn, sentencia, multiparams, params, execution_options):
+    """
+    Rechaza los INSERT/UPDATE de ubicacion_cliente que escriben coordenadas
+    sin el geohash (executemany y UPDATE masivos de Core o de la Session no
+    pasan por _actualizar_geohash): un geohash viejo hace que las búsquedas
+    por cercanía devuelvan vecinos equivocados. Los scripts que escriben por
+    Core calculan el geohash con utils.geo.encode_geohash; el SQL de texto
+    no se revisa.
+    """
+    if not isinstance(sentencia, (Insert, Update)) or sentencia.table.name != UbicacionCliente.__tablename__:
+        return
+    # Columnas de .values(...) más las de cada fila de parámetros (executemany)
+    valores = {getattr(columna, "key", columna) for columna in (sentencia._values or {})}
+    for fila in (multiparams or [params]):
+        columnas = valores.union(fila or {})
+        if columnas & _COORDENADAS and "geohash" not in columnas:
+            break
+    else:
+        return
+    raise ValueError("Las coordenadas de ubicacion_cliente se guardan por el ORM o junto con su geohash")
+
 class Cliente(Base):
     __tablename__ = 'cliente'
 
@@ -124,6 +206,8 @@ class Cliente(Base):
     sector = Column(String(100))
     fecha_registro = Column(Date)
     id_ubicacion_principal = Column(Integer, ForeignKey('ubicacion_cliente.id_ubicacion'))
+    # Última modificación, para /sync (también la actualizan los UPDATE de Core)
+    updated_at = Column(TIMESTAMP, default=func.now(), onupdate=func.now(), index=True)
 
     usuario = relationship("Usuario", backref="clientes")
     ubicaciones = relationship(
@@ -147,7 +231,9 @@ class Ruta(Base):
     fecha_ejecucion = Column(Date)
     poligono_geojson = Column(Text)
     # CAMPO PARA PEDIDO ESPECÍFICO EN RUTAS DE ENTREGA:
-    id_pedido = Column(Integer, ForeignKey('pedido.id_pedido'), nullable=True)
+    id_pedido = Column(Integer, ForeignKey('pedido.id_pedido'), nullable=True, index=True)
+    # También se actualiza al cambiar sus asignaciones (ver ruta_controller)
+    updated_at = Column(TIMESTAMP, default=func.now(), onupdate=func.now(), index=True)
     
     # Relaciones
     asignaciones = relationship("AsignacionRuta", back_populates="ruta", cascade="all, delete-orphan")
@@ -171,10 +257,10 @@ class AsignacionRuta(Base):
     __tablename__ = 'asignacion_ruta'
     
     id_asignacion = Column(Integer, primary_key=True, autoincrement=True)
-    id_ruta = Column(Integer, ForeignKey('ruta.id_ruta'), nullable=False)
+    id_ruta = Column(Integer, ForeignKey('ruta.id_ruta'), nullable=False, index=True)
     
     # Campos para usuario (vendedor/transportista)
-    identificacion_usuario = Column(String(50), ForeignKey('usuarios.identificacion'), nullable=True)
+    identificacion_usuario = Column(String(50), ForeignKey('usuarios.identificacion'), nullable=True, index=True)
     tipo_usuario = Column(Enum('vendedor', 'transportista', name='tipo_usuario_enum'), nullable=True)
     
     # Campos para cliente (solo en rutas de venta)
@@ -198,17 +284,23 @@ class Pedido(Base):
     iva = Column(Float)
     total = Column(Float)
     cod_cliente = Column(String(50), ForeignKey('cliente.cod_cliente'))
+    # La genera el dispositivo que envía el pedido: reenviarlo no lo duplica
+    clave_idempotencia = Column(String(64))
         
     # Relaciones
     cliente = relationship("Cliente", back_populates="pedidos")
     estados = relationship("EstadoPedido", back_populates="pedido")
     detalles = relationship("DetallePedido", back_populates="pedido")
 
+    __table_args__ = (
+        Index("ux_pedido_clave_idempotencia", "clave_idempotencia", unique=True),
+    )
+
 class EstadoPedido(Base):
     __tablename__ = 'estado_pedido'
 
     id_estado_pedido = Column(Integer, primary_key=True, autoincrement=True, index=True)
-    id_pedido = Column(Integer, ForeignKey('pedido.id_pedido'))
+    id_pedido = Column(Integer, ForeignKey('pedido.id_pedido'), index=True)
     fecha_actualizada = Column(Date)
     descripcion = Column(String(200))
 
@@ -218,7 +310,7 @@ class DetallePedido(Base):
     __tablename__ = 'detalle_pedido'
 
     id_detalle_pedido = Column(Integer, primary_key=True, autoincrement=True, index=True)
-    id_pedido = Column(Integer, ForeignKey('pedido.id_pedido'))
+    id_pedido = Column(Integer, ForeignKey('pedido.id_pedido'), index=True)
     id_producto = Column(Integer, ForeignKey('productos.id_producto'))
     cantidad = Column(Integer)
     precio_unitario = Column(Float)
@@ -257,4 +349,54 @@ class DetalleFactura(Base):
     subtotal_lineal = Column(Float)
 
     factura = relationship("Factura", back_populates="detalles")
-    producto = relationship("Producto")
\ No newline at end of file
+    producto = relationship("Producto")
+
+
+class RegistroEliminado(Base):
+    """Lápida de una fila eliminada: /sync informa las bajas a los dispositivos"""
+    __tablename__ = 'registro_eliminado'
+
+    id_registro = Column(Integer, primary_key=True, autoincrement=True)
+    tabla = Column(String(50), nullable=False)
+    clave = Column(String(100), nullable=False)
+    # Usuario al que afecta la baja (asignaciones de ruta); NULL: a todos
+    ambito = Column(String(50))
+    eliminado_en = Column(TIMESTAMP, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_registro_eliminado_tabla_eliminado_en", "tabla", "eliminado_en"),
+    )
+
+
+class RegistroCambio(Base):
+    """
+    Registro de cambios, solo se agregan filas. Lo escriben los eventos de
+    sesión de utils/cambios.py al confirmar cada transacción, todas con la
+    versión de la transacción (su id en PostgreSQL). Solo las versiones
+    menores que la transacción en curso más antigua son definitivas.
+    """
+    __tablename__ = 'registro_cambio'
+
+    id_cambio = Column(Integer, primary_key=True, autoincrement=True)
+    tabla = Column(String(60), nullable=False)
+    # NULL: INSERT/UPDATE/DELETE masivo (no se conocen las filas afectadas)
+    clave = Column(String(100))
+    operacion = Column(String(10), nullable=False)  # insert, update, delete
+    contador = Column(String(60), nullable=False)
+    version = Column(BigInteger, nullable=False)
+    fecha = Column(TIMESTAMP, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_registro_cambio_contador_version", "contador", "version"),
+        # Lectura periódica de cada worker: filas nuevas de todos los contadores
+        Index("ix_registro_cambio_version", "version"),
+    )
+
+def _registrar_eliminado(mapper, connection, objeto):
+    """Deja la lápida en la misma transacción que el DELETE"""
+    clave = mapper.primary_key_from_instance(objeto)[0]
+    connection.execute(RegistroEliminado.__table__.insert().values(tabla=mapper.local_table.name, clave=str(clave)))
+
+# Tablas que descargan los dispositivos con /sync
+for _modelo in (Producto, Cliente, UbicacionCliente, Ruta):
+    event.listen(_modelo, "after_delete", _registrar_eliminado)
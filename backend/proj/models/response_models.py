@@ -0,0 +1,265 @@
+from pydantic import BaseModel
+from typing import Optional, List, Generic, TypeVar
+from datetime import date, datetime
+
+# Esquemas de respuesta para los endpoints de listas.
+# Cada esquema declara solo los campos que el endpoint devuelve; los
+# controladores cargan exactamente esas columnas con load_only.
+
+
+class UbicacionClienteItem(BaseModel):
+    """Ubicación anidada en GET /clientes"""
+    id_ubicacion: int
+    cod_cliente: str
+    latitud: float
+    longitud: float
+    direccion: str
+    sector: str
+    referencia: Optional[str] = None
+    fecha_registro: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ClienteItem(BaseModel):
+    """Elemento de GET /clientes"""
+    cod_cliente: str
+    identificacion: Optional[str] = None
+    nombre: Optional[str] = None
+    direccion: Optional[str] = None
+    celular: Optional[str] = None
+    correo: Optional[str] = None
+    tipo_cliente: Optional[str] = None
+    razon_social: Optional[str] = None
+    sector: Optional[str] = None
+    fecha_registro: Optional[date] = None
+    id_ubicacion_principal: Optional[int] = None
+    ubicaciones: List[UbicacionClienteItem] = []
+
+    class Config:
+        from_attributes = True
+
+
+class UbicacionDetalleItem(BaseModel):
+    """Ubicación anidada en GET /clientes/con-ubicaciones"""
+    id_ubicacion: int
+    latitud: float
+    longitud: float
+    direccion: str
+    sector: str
+    referencia: Optional[str] = None
+    fecha_registro: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ClienteConUbicacionesItem(BaseModel):
+    """Elemento de GET /clientes/con-ubicaciones"""
+    cod_cliente: str
+    identificacion: Optional[str] = None
+    nombre: Optional[str] = None
+    direccion: Optional[str] = None
+    celular: Optional[str] = None
+    correo: Optional[str] = None
+    tipo_cliente: Optional[str] = None
+    razon_social: Optional[str] = None
+    sector: Optional[str] = None
+    fecha_registro: Optional[date] = None
+    id_ubicacion_principal: Optional[int] = None
+    ubicaciones: List[UbicacionDetalleItem] = []
+
+    class Config:
+        from_attributes = True
+
+
+class DetallePedidoItem(BaseModel):
+    """Detalle anidado en GET /pedidos"""
+    id_detalle_pedido: int
+    id_pedido: Optional[int] = None
+    id_producto: Optional[int] = None
+    cantidad: Optional[int] = None
+    precio_unitario: Optional[float] = None
+    descuento: Optional[float] = None
+    subtotal_lineal: Optional[float] = None
+    subtotal: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PedidoItem(BaseModel):
+    """Elemento de GET /pedidos"""
+    id_pedido: int
+    numero_pedido: Optional[str] = None
+    fecha_pedido: date
+    subtotal: Optional[float] = None
+    iva: Optional[float] = None
+    total: Optional[float] = None
+    cod_cliente: Optional[str] = None
+    detalles: List[DetallePedidoItem] = []
+
+    class Config:
+        from_attributes = True
+
+
+class FacturaItem(BaseModel):
+    """Elemento de GET /facturas"""
+    id_factura: int
+    cod_cliente: Optional[str] = None
+    numero_factura: Optional[int] = None
+    fecha_emision: Optional[date] = None
+    estado: Optional[str] = None
+    subtotal: Optional[float] = None
+    iva: Optional[float] = None
+    total: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class UsuarioAsignacionInfo(BaseModel):
+    nombre: Optional[str] = None
+    correo: Optional[str] = None
+
+
+class UbicacionAsignacionInfo(BaseModel):
+    direccion: str
+    sector: str
+    latitud: float
+    longitud: float
+    referencia: Optional[str] = None
+
+
+class AsignacionRutaItem(BaseModel):
+    """Asignación anidada en GET /rutas"""
+    id_asignacion: int
+    identificacion_usuario: Optional[str] = None
+    tipo_usuario: Optional[str] = None
+    cod_cliente: Optional[str] = None
+    id_ubicacion: Optional[int] = None
+    orden_visita: Optional[int] = None
+    usuario: Optional[UsuarioAsignacionInfo] = None
+    ubicacion_info: Optional[UbicacionAsignacionInfo] = None
+
+
+class ClientePedidoRutaInfo(BaseModel):
+    nombre: Optional[str] = None
+    direccion: Optional[str] = None
+    sector: Optional[str] = None
+
+
+class PedidoRutaInfo(BaseModel):
+    id_pedido: int
+    numero_pedido: Optional[str] = None
+    fecha_pedido: Optional[str] = None
+    total: float
+    subtotal: float
+    iva: float
+    cod_cliente: Optional[str] = None
+    estado: str
+    cliente_info: ClientePedidoRutaInfo
+
+
+class RutaItem(BaseModel):
+    """Elemento de GET /rutas"""
+    id_ruta: int
+    nombre: str
+    tipo_ruta: str
+    sector: Optional[str] = None
+    direccion: Optional[str] = None
+    estado: Optional[str] = None
+    fecha_creacion: Optional[datetime] = None
+    fecha_ejecucion: Optional[date] = None
+    id_pedido: Optional[int] = None
+    pedido_info: Optional[PedidoRutaInfo] = None
+    asignaciones: List[AsignacionRutaItem] = []
+
+
+# Esquemas de GET /sync: filas planas (sin relaciones anidadas) con su
+# updated_at; el dispositivo arma las relaciones con las claves foráneas.
+
+
+class ProductoSync(BaseModel):
+    id_producto: int
+    nombre: Optional[str] = None
+    id_marca: Optional[int] = None
+    id_categoria: Optional[int] = None
+    stock: int = 0
+    precio_mayorista: Optional[float] = None
+    precio_minorista: Optional[float] = None
+    iva: Optional[float] = None
+    estado: Optional[str] = None
+    imagen: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class ClienteSync(BaseModel):
+    cod_cliente: str
+    identificacion: Optional[str] = None
+    nombre: Optional[str] = None
+    direccion: Optional[str] = None
+    celular: Optional[str] = None
+    correo: Optional[str] = None
+    tipo_cliente: Optional[str] = None
+    razon_social: Optional[str] = None
+    sector: Optional[str] = None
+    fecha_registro: Optional[date] = None
+    id_ubicacion_principal: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+
+class UbicacionClienteSync(BaseModel):
+    id_ubicacion: int
+    cod_cliente: str
+    latitud: float
+    longitud: float
+    direccion: str
+    sector: str
+    referencia: Optional[str] = None
+    fecha_registro: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class RutaSync(BaseModel):
+    """Rutas asignadas al usuario que sincroniza (como GET /rutas/usuario/{user_id})"""
+    id_ruta: int
+    nombre: str
+    tipo_ruta: str
+    sector: Optional[str] = None
+    direccion: Optional[str] = None
+    estado: Optional[str] = None
+    fecha_creacion: Optional[datetime] = None
+    fecha_ejecucion: Optional[date] = None
+    updated_at: Optional[datetime] = None
+
+
+T = TypeVar("T")
+
+
+class SeccionSync(BaseModel, Generic[T]):
+    cambios: List[T] = []
+    eliminados: List[str] = []
+
+
+class SyncRespuesta(BaseModel):
+    token: str
+    completo: bool
+    productos: SeccionSync[ProductoSync]
+    clientes: SeccionSync[ClienteSync]
+    ubicaciones_cliente: SeccionSync[UbicacionClienteSync]
+    rutas: SeccionSync[RutaSync]
+
+
+class CambioItem(BaseModel):
+    clave: Optional[str] = None  # None: cambio masivo, volver a descargar la tabla
+    operacion: str
+    version: int
+
+
+class CambiosRespuesta(BaseModel):
+    contador: str
+    version: int
+    cambios: List[CambioItem] = []
+    hay_mas: bool = False
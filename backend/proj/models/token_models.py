@@ -6,6 +6,16 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class RefreshResponse(BaseModel):
+    """Modelo para la respuesta del endpoint de refresco"""
+    access_token: str
+    refresh_token: str
+    token_type: str
+
+class LogoutRequest(BaseModel):
+    """Token de refresco opcional a revocar al cerrar sesión"""
+    refresh_token: Optional[str] = None
+
 class TokenData(BaseModel):
     """Modelo para los datos del token"""
     identificacion: Optional[str] = None
@@ -36,5 +46,6 @@ class UserLoginInfo(BaseModel):
 
 class LoginResponse(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
     user: UserLoginInfo
\ No newline at end of file
@@ -1,12 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user
+from typing import Optional
+from dependencias.auth import get_db, get_current_user, security
 from controllers import auth_controller
 from models.models import LoginRequest, Usuario
-from models.token_models import Token, UserResponse, LoginResponse
+from models.token_models import Token, UserResponse, LoginResponse, RefreshResponse, LogoutRequest
+from utils.security import verify_token
 
 router = APIRouter()
 
+# Esquema Bearer opcional para el logout (el token puede estar ya expirado)
+optional_security = HTTPBearer(auto_error=False)
+
 @router.post("/login", response_model=LoginResponse)
 def login(
     datos: LoginRequest,
@@ -26,6 +32,17 @@ def login(
             detail="Error interno del servidor"
         )
 
+@router.post("/refresh", response_model=RefreshResponse)
+def refresh(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint para renovar el token de acceso usando el token de refresco
+    enviado como Bearer (evita volver a hacer login con contraseña)
+    """
+    return auth_controller.refresh(db, credentials.credentials)
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(
     current_user: Usuario = Depends(get_current_user)
@@ -48,9 +65,20 @@ def protected_route(
     }
 
 @router.post("/logout")
-def logout():
+def logout(
+    datos: Optional[LogoutRequest] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
     """
-    Endpoint para logout (principalmente para documentación)
-    El logout se maneja en el frontend eliminando el token
+    Endpoint para logout
+    Revoca el token de acceso enviado y, opcionalmente, el token de refresco
     """
-    return {"mensaje": "Logout exitoso"}
\ No newline at end of file
+    access_payload = None
+    if credentials:
+        try:
+            access_payload = verify_token(credentials.credentials, db)
+        except HTTPException:
+            access_payload = None
+    
+    return auth_controller.logout(db, access_payload, datos.refresh_token if datos else None)
\ No newline at end of file
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from dependencias.auth import get_db, get_current_user
-from controllers.catalogo_pdf_controller import generate_catalog_pdf
+from controllers.producto_controller import preparar_filtros, get_estadisticas_catalogo
 from models.models import Usuario
 import logging
 import os
@@ -12,7 +12,7 @@ from typing import Optional
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(prefix="/api", tags=["Catálogo PDF"])
 
 @router.get("/catalogo/export/pdf")
 async def exportar_catalogo_pdf(
@@ -37,19 +37,12 @@ async def exportar_catalogo_pdf(
         logger.info(f"Usuario {current_user.identificacion} solicita exportación de catálogo PDF")
         
         # Preparar filtros
-        filters = {}
-        if search:
-            filters['search'] = search.strip()
-        if marca_id:
-            filters['marca_id'] = marca_id
-        if categoria_id:
-            filters['categoria_id'] = categoria_id
-        if price_range and price_range != 'all':
-            filters['price_range'] = price_range
+        filters = preparar_filtros(search, marca_id, categoria_id, price_range)
             
         logger.info(f"Filtros aplicados: {filters}")
         
-        # Generar PDF
+        # Generar PDF (reportlab, PIL y pypdf se cargan con el primer catálogo)
+        from controllers.catalogo_pdf_controller import generate_catalog_pdf
         pdf_file_path = generate_catalog_pdf(db, filters)
         
         if not os.path.exists(pdf_file_path):
@@ -98,17 +91,10 @@ async def preview_catalogo_pdf(
         logger.info(f"Usuario {current_user.identificacion} solicita vista previa de catálogo PDF")
         
         # Preparar filtros (mismo código que el endpoint principal)
-        filters = {}
-        if search:
-            filters['search'] = search.strip()
-        if marca_id:
-            filters['marca_id'] = marca_id
-        if categoria_id:
-            filters['categoria_id'] = categoria_id
-        if price_range and price_range != 'all':
-            filters['price_range'] = price_range
+        filters = preparar_filtros(search, marca_id, categoria_id, price_range)
         
-        # Generar PDF
+        # Generar PDF (reportlab, PIL y pypdf se cargan con el primer catálogo)
+        from controllers.catalogo_pdf_controller import generate_catalog_pdf
         pdf_file_path = generate_catalog_pdf(db, filters)
         
         if not os.path.exists(pdf_file_path):
@@ -140,31 +126,11 @@ async def obtener_info_exportacion(
     Obtener información sobre la exportación disponible
     """
     try:
-        from controllers.producto_controller import get_productos
-        
-        productos = get_productos(db)
-        productos_activos = [p for p in productos if p.estado == 'activo']
-        
-        # Estadísticas por marca
-        marcas_stats = {}
-        for producto in productos_activos:
-            if producto.marca:
-                marca = producto.marca.descripcion
-                marcas_stats[marca] = marcas_stats.get(marca, 0) + 1
-        
-        # Estadísticas por categoría
-        categorias_stats = {}
-        for producto in productos_activos:
-            if producto.categoria:
-                categoria = producto.categoria.descripcion
-                categorias_stats[categoria] = categorias_stats.get(categoria, 0) + 1
+        # Conteos agregados en SQL (sin cargar los productos)
+        estadisticas = get_estadisticas_catalogo(db)
         
         return {
-            "total_productos": len(productos),
-            "productos_activos": len(productos_activos),
-            "productos_inactivos": len(productos) - len(productos_activos),
-            "estadisticas_marcas": marcas_stats,
-            "estadisticas_categorias": categorias_stats,
+            **estadisticas,
             "formatos_disponibles": ["PDF"],
             "filtros_disponibles": {
                 "search": "Búsqueda por texto",
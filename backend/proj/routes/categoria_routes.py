@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
+from dependencias.etag import etag_por_version
 from controllers import categoria_controller
 from models.models import Usuario
 import logging
@@ -11,7 +12,7 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/categorias")
+@router.get("/categorias", dependencies=[Depends(etag_por_version("categoria"))])
 def listar_categorias(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -48,7 +49,7 @@ def obtener_categoria(
 def crear_categoria(
     categoria: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Crea una nueva categoría (requiere rol admin)
@@ -65,7 +66,7 @@ def editar_categoria(
     id_categoria: int,
     categoria: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Edita una categoría (requiere rol admin)
@@ -81,7 +82,7 @@ def editar_categoria(
 def eliminar_categoria(
     id_categoria: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina una categoría (requiere rol admin)
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
+from dependencias.etag import etag_por_version
 from controllers import clientes_controller
 from models.models import Usuario
 import logging
 from fastapi.responses import StreamingResponse
+from utils.respuestas import RespuestaJSONRapida, respuesta_lista
+from models.response_models import ClienteItem, ClienteConUbicacionesItem
+from typing import List
 import io
 from datetime import datetime
 
@@ -50,7 +54,10 @@ def exportar_clientes_excel(
         logger.error(f"Error al exportar clientes a Excel: {e}")
         raise HTTPException(status_code=500, detail=f"Error al generar archivo Excel: {str(e)}")
 
-@router.get("/clientes/con-ubicaciones")
+@router.get(
+    "/clientes/con-ubicaciones", response_model=List[ClienteConUbicacionesItem], response_class=RespuestaJSONRapida,
+    dependencies=[Depends(etag_por_version("cliente", "ubicacion_cliente"))]
+)
 def listar_clientes_con_ubicaciones(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -62,12 +69,15 @@ def listar_clientes_con_ubicaciones(
         logger.info(f"Usuario {current_user.identificacion} solicita lista de clientes con ubicaciones")
         clientes = clientes_controller.get_clientes_con_ubicaciones(db)
         logger.info(f"Se encontraron {len(clientes)} clientes con información de ubicaciones")
-        return clientes
+        return respuesta_lista(ClienteConUbicacionesItem, clientes)
     except Exception as e:
         logger.error(f"Error al listar clientes con ubicaciones: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
-@router.get("/clientes")
+@router.get(
+    "/clientes", response_model=List[ClienteItem], response_class=RespuestaJSONRapida,
+    dependencies=[Depends(etag_por_version("cliente", "ubicacion_cliente"))]
+)
 def listar_clientes(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -79,7 +89,7 @@ def listar_clientes(
         logger.info(f"Usuario {current_user.identificacion} solicita lista de clientes")
         clientes = clientes_controller.get_clientes(db)
         logger.info(f"Se encontraron {len(clientes)} clientes")
-        return clientes
+        return respuesta_lista(ClienteItem, clientes)
     except Exception as e:
         logger.error(f"Error al listar clientes: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -104,7 +114,7 @@ def obtener_cliente(
 def crear_cliente(
     cliente: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Crea un nuevo cliente (requiere rol admin)
@@ -130,7 +140,7 @@ def editar_cliente(
     cod_cliente: str,
     cliente: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Edita un cliente (requiere rol admin)
@@ -153,7 +163,7 @@ def editar_cliente(
 def eliminar_cliente(
     cod_cliente: str,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina un cliente (requiere rol admin)
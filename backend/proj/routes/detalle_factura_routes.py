@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
 from controllers import detalle_factura_controller
 from models.models import Usuario
 import logging
@@ -81,7 +81,7 @@ def editar_detalle_factura(
 def eliminar_detalle_factura(
     id_detalle_factura: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina un detalle de factura (requiere rol admin)
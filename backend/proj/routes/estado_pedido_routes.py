@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
 from controllers import estado_pedido_controller
 from models.models import Usuario
 import logging
@@ -48,7 +48,7 @@ def obtener_estado_pedido(
 def crear_estado_pedido(
     estado: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Crea un nuevo estado de pedido (requiere rol admin)
@@ -65,7 +65,7 @@ def editar_estado_pedido(
     id_estado_pedido: int,
     estado: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Edita un estado de pedido (requiere rol admin)
@@ -81,7 +81,7 @@ def editar_estado_pedido(
 def eliminar_estado_pedido(
     id_estado_pedido: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina un estado de pedido (requiere rol admin)
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
 from controllers import factura_controller
 from models.models import Usuario
 import logging
 from fastapi.responses import FileResponse
+from utils.respuestas import RespuestaJSONRapida, respuesta_lista
+from models.response_models import FacturaItem
+from typing import List
 
 
 # Configurar logging
@@ -13,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/facturas")
+@router.get("/facturas", response_model=List[FacturaItem], response_class=RespuestaJSONRapida)
 def listar_facturas(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -25,7 +28,7 @@ def listar_facturas(
         logger.info(f"Usuario {current_user.identificacion} solicita lista de facturas")
         facturas = factura_controller.get_facturas(db)
         logger.info(f"Se encontraron {len(facturas)} facturas")
-        return facturas
+        return respuesta_lista(FacturaItem, facturas)
     except Exception as e:
         logger.error(f"Error al listar facturas: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -67,7 +70,7 @@ def editar_factura(
     id_factura: int,
     factura: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Edita una factura (requiere rol admin)
@@ -83,7 +86,7 @@ def editar_factura(
 def eliminar_factura(
     id_factura: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina una factura (requiere rol admin)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
+from dependencias.etag import etag_por_version
 from controllers import marca_controller
 from models.models import Usuario
 import logging
@@ -11,7 +12,7 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/marcas")
+@router.get("/marcas", dependencies=[Depends(etag_por_version("marca"))])
 def listar_marcas(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -48,7 +49,7 @@ def obtener_marca(
 def crear_marca(
     marca: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Crea una nueva marca (requiere rol admin)
@@ -65,7 +66,7 @@ def editar_marca(
     id_marca: int,
     marca: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Edita una marca (requiere rol admin)
@@ -81,7 +82,7 @@ def editar_marca(
 def eliminar_marca(
     id_marca: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina una marca (requiere rol admin)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from utils.metricas import registro
+import hmac
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Si se define, Prometheus debe enviar "Authorization: Bearer <METRICAS_TOKEN>"
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")
+
+TIPO_CONTENIDO_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", include_in_schema=False)
+async def exponer_metricas(request: Request):
+    """
+    Métricas del proceso en formato de texto de Prometheus.
+    Es async a propósito: el estado del threadpool solo se lee desde el event loop.
+    """
+    if METRICAS_TOKEN:
+        esperado = f"Bearer {METRICAS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("authorization", ""), esperado):
+            raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return PlainTextResponse(registro.exponer(), media_type=TIPO_CONTENIDO_PROMETHEUS)
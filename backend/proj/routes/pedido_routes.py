@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_admin
+from dependencias.auth import get_db, get_current_user, require_admin, UsuarioToken
 from controllers import pedido_controller
 from models.models import Usuario
-from typing import Dict, Any
+from typing import Dict, Any, List
+from utils.respuestas import RespuestaJSONRapida, respuesta_lista
+from models.response_models import PedidoItem
 import logging
 
 # Configurar logging
@@ -12,7 +14,7 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/pedidos")
+@router.get("/pedidos", response_model=List[PedidoItem], response_class=RespuestaJSONRapida)
 def listar_pedidos(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -22,7 +24,7 @@ def listar_pedidos(
         logger.info(f"Usuario {current_user.identificacion} solicita lista de pedidos")
         pedidos = pedido_controller.get_pedidos(db)
         logger.info(f"Se encontraron {len(pedidos)} pedidos")
-        return pedidos
+        return respuesta_lista(PedidoItem, pedidos)
     except Exception as e:
         logger.error(f"Error al listar pedidos: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -94,6 +96,23 @@ def obtener_pedido(
         logger.error(f"Error al obtener pedido {id_pedido}: {e}")
         raise
 
+@router.post("/pedidos/cotizar", response_class=RespuestaJSONRapida)
+def cotizar_pedido(
+    carrito: Dict[str, Any] = Body(...),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Cotiza un carrito sin guardarlo: precio unitario según el tipo de cliente,
+    descuento, IVA por línea y totales. Son los mismos cálculos que se aplican
+    al crear el pedido.
+    {
+        "cod_cliente": "CLI001",          (o "tipo_cliente": "juridico")
+        "detalle_pedido": [{"id_producto": 1, "cantidad": 2, "descuento": 0}]
+    }
+    """
+    return pedido_controller.cotizar_pedido(db, carrito)
+
 @router.post("/pedidos")
 def crear_pedido(
     pedido: Dict[str, Any] = Body(...),
@@ -101,7 +120,9 @@ def crear_pedido(
     current_user: Usuario = Depends(get_current_user)
 ):
     """
-    Crea un nuevo pedido con sus detalles (requiere autenticación)
+    Crea un nuevo pedido con sus detalles (requiere autenticación).
+    Precios, subtotales, IVA y total los calcula el servidor (ver
+    /pedidos/cotizar); los importes enviados se ignoran.
     Estructura esperada:
     {
         "numero_pedido": "PED-123",
@@ -145,6 +166,28 @@ def crear_pedido(
         logger.error(f"Error al crear pedido: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
+@router.post("/pedidos/lote", response_class=RespuestaJSONRapida)
+def crear_pedidos_lote(
+    lote: Dict[str, Any] = Body(...),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Crea varios pedidos en una sola transacción (vendedores que sincronizan
+    los pedidos tomados sin conexión). Cada pedido tiene la estructura de
+    POST /pedidos más una clave_idempotencia única generada en el dispositivo;
+    reenviar el lote devuelve los pedidos ya guardados como "existente".
+    {
+        "pedidos": [
+            {"clave_idempotencia": "f3b1...", "cod_cliente": "CLI001", "fecha_pedido": "2025-01-01",
+             "detalle_pedido": [{"id_producto": 1, "cantidad": 2}]}
+        ]
+    }
+    """
+    pedidos = lote.get("pedidos")
+    logger.info(f"Usuario {current_user.identificacion} envía lote de {len(pedidos) if isinstance(pedidos, list) else 0} pedidos")
+    return pedido_controller.create_pedidos_lote(db, pedidos)
+
 @router.put("/pedidos/{id_pedido}")
 def editar_pedido(
     id_pedido: int,
@@ -181,7 +224,7 @@ def editar_pedido(
 def eliminar_pedido(
     id_pedido: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """Elimina un pedido y todos sus detalles (requiere rol admin)"""
     try:
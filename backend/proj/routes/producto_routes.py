@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, BackgroundTasks
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_admin
+from dependencias.auth import get_db, get_current_user, require_admin, UsuarioToken
+from dependencias.etag import etag_por_version
 from controllers import producto_controller
 from models.models import Usuario
+from utils.imagenes import guardar_imagen_producto, eliminar_imagen_producto
 import logging
 from typing import Optional
-import os
-import uuid
 from datetime import datetime
 from fastapi.responses import StreamingResponse
 import io
@@ -51,20 +51,66 @@ def exportar_productos_excel(
         logger.error(f"Error al exportar productos a Excel: {e}")
         raise HTTPException(status_code=500, detail=f"Error al generar archivo Excel: {str(e)}")
 
-@router.get("/productos")
+@router.get("/productos", dependencies=[Depends(etag_por_version("productos", "productos.stock", "marca", "categoria"))])
 def listar_productos(
+    search: Optional[str] = Query(None, description="Buscar en nombre, marca o categoría"),
+    marca_id: Optional[int] = Query(None, description="ID de la marca a filtrar"),
+    categoria_id: Optional[int] = Query(None, description="ID de la categoría a filtrar"),
+    price_range: Optional[str] = Query(None, description="Rango de precio: all, low, medium, high"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     try:
         logger.info(f"Usuario {current_user.identificacion} solicita lista de productos")
-        productos = producto_controller.get_productos(db)
+        filters = producto_controller.preparar_filtros(search, marca_id, categoria_id, price_range)
+        productos = producto_controller.get_productos(db, filters)
         logger.info(f"Se encontraron {len(productos)} productos")
         return productos
     except Exception as e:
         logger.error(f"Error al listar productos: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+@router.get("/productos/buscar")
+def buscar_productos(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto a buscar en nombre o marca"),
+    limite: int = Query(10, ge=1, le=100, description="Máximo de resultados"),
+    solo_activos: bool = Query(True, description="Excluir productos inactivos"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Búsqueda difusa de productos (tolera tildes y errores de tipeo), ordenada por relevancia
+    """
+    try:
+        logger.info(f"Usuario {current_user.identificacion} busca productos: '{q}'")
+        return producto_controller.buscar_productos(db, q, limite, solo_activos)
+    except Exception as e:
+        logger.error(f"Error al buscar productos: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.post("/productos/imagenes/limpiar-huerfanas")
+def limpiar_imagenes_huerfanas(
+    background_tasks: BackgroundTasks,
+    modo: str = Query("reportar", description="reportar, cuarentena o eliminar"),
+    gracia_minutos: int = Query(producto_controller.GRACIA_MINUTOS_DEFECTO, ge=0, description="No tocar archivos más recientes"),
+    segundo_plano: bool = Query(False, description="Ejecutar después de responder"),
+    db: Session = Depends(get_db),
+    current_user: UsuarioToken = Depends(require_admin())
+):
+    """
+    Reconciliar uploads/productos con las imágenes de la base: reporta, mueve
+    a cuarentena o elimina los archivos que ningún producto usa
+    """
+    if modo not in producto_controller.MODOS_LIMPIEZA:
+        raise HTTPException(status_code=400, detail=f"Modo inválido: use {', '.join(producto_controller.MODOS_LIMPIEZA)}")
+    logger.info(f"Usuario {current_user.identificacion} limpia imágenes huérfanas (modo {modo})")
+    if segundo_plano:
+        background_tasks.add_task(
+            producto_controller.reconciliar_imagenes_huerfanas_en_segundo_plano, modo, gracia_minutos
+        )
+        return {"mensaje": "Limpieza de imágenes programada", "modo": modo}
+    return producto_controller.reconciliar_imagenes_huerfanas(db, modo, gracia_minutos)
+
 @router.get("/productos/{id_producto}")
 def obtener_producto(
     id_producto: int,
@@ -82,7 +128,7 @@ def obtener_producto(
 async def crear_producto(
     nombre: str = Form(...),
     id_marca: int = Form(...),
-    stock: str = Form(...),
+    stock: int = Form(...),
     precio_mayorista: float = Form(...),
     precio_minorista: float = Form(...),
     id_categoria: int = Form(...),
@@ -105,32 +151,15 @@ async def crear_producto(
         }
         
         if imagen and imagen.filename:
-            # Validar tipo de archivo
-            allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
-            file_extension = os.path.splitext(imagen.filename)[1].lower()
-            
-            if file_extension not in allowed_extensions:
-                raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
-            
-            # Crear nombre único para el archivo
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
-            
-            upload_dir = "uploads/productos"
-            os.makedirs(upload_dir, exist_ok=True)
-            file_location = f"{upload_dir}/{unique_filename}"
-            
-            # Guardar archivo
-            with open(file_location, "wb+") as file_object:
-                content = await imagen.read()
-                file_object.write(content)
-            
-            # Guardar solo la ruta relativa en la base de datos
-            producto_data["imagen"] = f"/uploads/productos/{unique_filename}"
+            # Se guardan variantes reducidas (WebP/JPEG); en la base va la ruta relativa
+            producto_data["imagen"] = await guardar_imagen_producto(imagen)
         
         producto = producto_controller.create_producto(db, producto_data)
         logger.info(f"Producto creado: {producto.nombre}")
         return producto
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al crear producto: {e}")
         raise HTTPException(status_code=422, detail=str(e))
@@ -140,7 +169,7 @@ async def editar_producto(
     id_producto: int,
     nombre: Optional[str] = Form(None),
     id_marca: Optional[int] = Form(None),
-    stock: Optional[str] = Form(None),
+    stock: Optional[int] = Form(None),
     precio_mayorista: Optional[float] = Form(None),
     precio_minorista: Optional[float] = Form(None),
     id_categoria: Optional[int] = Form(None),
@@ -175,44 +204,22 @@ async def editar_producto(
             producto_data["estado"] = estado
         
         # Procesar nueva imagen si se proporciona
+        imagen_anterior = None
         if imagen and imagen.filename:
-            # Validar tipo de archivo
-            allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
-            file_extension = os.path.splitext(imagen.filename)[1].lower()
-            
-            if file_extension not in allowed_extensions:
-                raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
-            
-            # Eliminar imagen anterior si existe
-            if producto_actual.imagen:
-                try:
-                    old_image_path = producto_actual.imagen
-                    if old_image_path.startswith('/uploads/'):
-                        old_image_path = old_image_path[1:]  # Remover el primer '/'
-                    
-                    if os.path.exists(old_image_path):
-                        os.remove(old_image_path)
-                except Exception as e:
-                    logger.warning(f"No se pudo eliminar imagen anterior: {e}")
-            
-            # Crear nombre único para el nuevo archivo
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
-            
-            upload_dir = "uploads/productos"
-            os.makedirs(upload_dir, exist_ok=True)
-            file_location = f"{upload_dir}/{unique_filename}"
-            
-            # Guardar nuevo archivo
-            with open(file_location, "wb+") as file_object:
-                content = await imagen.read()
-                file_object.write(content)
-            
-            producto_data["imagen"] = f"/uploads/productos/{unique_filename}"
+            producto_data["imagen"] = await guardar_imagen_producto(imagen)
+            imagen_anterior = producto_actual.imagen
         
         producto = producto_controller.update_producto(db, id_producto, producto_data)
+        
+        # La imagen anterior (y sus variantes) se elimina cuando la nueva ya quedó guardada
+        if imagen_anterior:
+            eliminar_imagen_producto(imagen_anterior)
+        
         logger.info(f"Producto actualizado: {producto.nombre}")
         return producto
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al editar producto {id_producto}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -221,7 +228,7 @@ async def editar_producto(
 def eliminar_producto(
     id_producto: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     try:
         logger.info(f"Usuario {current_user.identificacion} elimina producto ID: {id_producto}")
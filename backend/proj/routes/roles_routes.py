@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
+from dependencias.etag import etag_por_version
 from controllers.roles_controller import get_roles, get_rol, create_rol, update_rol, delete_rol
 from models.models import Usuario
 import logging
@@ -11,7 +12,7 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/roles")
+@router.get("/roles", dependencies=[Depends(etag_por_version("roles"))])
 def listar_roles(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -48,7 +49,7 @@ def obtener_rol(
 def crear_rol(
     rol: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Crea un nuevo rol (requiere rol admin)
@@ -65,7 +66,7 @@ def editar_rol(
     id_rol: int,
     rol: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Edita un rol (requiere rol admin)
@@ -81,7 +82,7 @@ def editar_rol(
 def eliminar_rol(
     id_rol: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina un rol (requiere rol admin)
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_admin
+from dependencias.auth import get_db, get_current_user, require_admin, UsuarioToken
+from dependencias.etag import etag_por_version
 from controllers import ruta_controller
 from models.models import Usuario, AsignacionRuta, Ruta, Rol, Pedido
 from sqlalchemy import and_, or_
+from utils.respuestas import RespuestaJSONRapida
+from models.response_models import RutaItem
+from typing import List
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -11,7 +15,13 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/rutas")
+# Rutas con asignaciones, usuarios, ubicaciones, pedido, cliente y último estado
+@router.get(
+    "/rutas", response_model=List[RutaItem], response_class=RespuestaJSONRapida,
+    dependencies=[Depends(etag_por_version(
+        "ruta", "asignacion_ruta", "usuarios", "ubicacion_cliente", "pedido", "cliente", "estado_pedido"
+    ))]
+)
 def listar_rutas(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -20,7 +30,7 @@ def listar_rutas(
         logger.info(f"Usuario {current_user.identificacion} solicita lista de rutas")
         rutas = ruta_controller.get_rutas_con_asignaciones(db)
         logger.info(f"Se encontraron {len(rutas)} rutas")
-        return rutas
+        return RespuestaJSONRapida(rutas)
     except Exception as e:
         logger.error(f"Error al listar rutas: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -42,7 +52,7 @@ def obtener_ruta(
 def crear_ruta(
     ruta: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     try:
         logger.info(f"Usuario {current_user.identificacion} crea nueva ruta")
@@ -56,7 +66,7 @@ def editar_ruta(
     id_ruta: int,
     ruta: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     try:
         logger.info(f"Usuario {current_user.identificacion} edita ruta ID: {id_ruta}")
@@ -69,7 +79,7 @@ def editar_ruta(
 def eliminar_ruta(
     id_ruta: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     try:
         logger.info(f"Usuario {current_user.identificacion} elimina ruta ID: {id_ruta}")
@@ -93,6 +103,24 @@ def obtener_ubicaciones_por_sector(
         logger.error(f"Error al obtener ubicaciones del sector {sector}: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
     
+@router.get("/rutas/{id_ruta}/ubicaciones-en-poligono")
+def obtener_ubicaciones_en_poligono(
+    id_ruta: int,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Endpoint para obtener las ubicaciones de clientes dentro del polígono de la ruta"""
+    try:
+        logger.info(f"Usuario {current_user.identificacion} solicita ubicaciones dentro del polígono de la ruta {id_ruta}")
+        ubicaciones = ruta_controller.get_ubicaciones_en_ruta(db, id_ruta)
+        logger.info(f"Se encontraron {len(ubicaciones)} ubicaciones en la ruta {id_ruta}")
+        return ubicaciones
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener ubicaciones de la ruta {id_ruta}: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+    
 @router.get("/rutas/usuario/{user_id}")
 def obtener_rutas_usuario(
     user_id: str,
@@ -262,13 +290,54 @@ def actualizar_estado_ruta(
         logger.error(f"Error al actualizar estado de ruta {id_ruta}: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+@router.post("/rutas/{id_ruta}/optimizar-orden")
+def optimizar_orden_ruta(
+    id_ruta: int,
+    opciones: dict = Body(default={}),
+    db: Session = Depends(get_db),
+    current_user: UsuarioToken = Depends(require_admin())
+):
+    """
+    Optimiza el orden de visita de las asignaciones de la ruta.
+    Opcional: inicio_lat/inicio_lng (punto de partida) y tiempo_maximo_ms.
+    """
+    try:
+        inicio = None
+        if opciones.get('inicio_lat') is not None or opciones.get('inicio_lng') is not None:
+            try:
+                inicio = (float(opciones['inicio_lat']), float(opciones['inicio_lng']))
+            except (KeyError, ValueError, TypeError):
+                raise HTTPException(status_code=400, detail="inicio_lat e inicio_lng deben ser números válidos")
+            if not (-90 <= inicio[0] <= 90 and -180 <= inicio[1] <= 180):
+                raise HTTPException(status_code=400, detail="Coordenadas de inicio fuera de rango")
+        
+        try:
+            tiempo_maximo_ms = int(opciones.get('tiempo_maximo_ms', ruta_controller.TIEMPO_MAXIMO_DEFECTO_MS))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="tiempo_maximo_ms debe ser un número entero")
+        if not 1 <= tiempo_maximo_ms <= 30000:
+            raise HTTPException(status_code=400, detail="tiempo_maximo_ms debe estar entre 1 y 30000")
+        
+        logger.info(f"Usuario {current_user.identificacion} optimiza el orden de visita de la ruta {id_ruta}")
+        resultado = ruta_controller.optimizar_orden_visita(db, id_ruta, inicio, tiempo_maximo_ms)
+        logger.info(
+            f"Ruta {id_ruta}: {resultado['distancia_inicial_km']} km -> "
+            f"{resultado['distancia_optimizada_km']} km en {resultado['tiempo_ms']} ms"
+        )
+        return resultado
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al optimizar orden de la ruta {id_ruta}: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
 # NUEVO endpoint para asignar pedido a ruta:
 @router.post("/rutas/{id_ruta}/asignar-pedido")
 def asignar_pedido_ruta(
     id_ruta: int,
     pedido_data: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """Asignar un pedido específico a una ruta de entrega"""
     try:
@@ -312,7 +381,7 @@ def asignar_pedido_ruta(
 def desasignar_pedido_ruta(
     id_ruta: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """Desasignar pedido de una ruta de entrega"""
     try:
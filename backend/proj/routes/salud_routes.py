@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import text
+from database import engine
+from utils.metricas import requests_en_curso, requests_totales
+from utils.migraciones import VERSION_ESQUEMA, version_actual
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+_INICIO_PROCESO = time.monotonic()
+
+
+def _estado_worker() -> dict:
+    return {
+        "pid": os.getpid(),
+        "uptime_s": round(time.monotonic() - _INICIO_PROCESO, 1),
+        "requests_atendidos": int(requests_totales.total()),
+        "requests_en_curso": int(requests_en_curso.valor()),
+    }
+
+
+@router.get("/salud", include_in_schema=False)
+async def salud():
+    """
+    Liveness del worker que atiende: no toca la base de datos.
+    """
+    return {"estado": "ok", **_estado_worker()}
+
+
+@router.get("/salud/lista", include_in_schema=False)
+def salud_lista():
+    """
+    Readiness para el balanceador: el worker llega a la base de datos y el
+    esquema está en la versión que espera el código.
+    """
+    inicio = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Chequeo de salud: sin conexión a la base de datos: {e}")
+        raise HTTPException(status_code=503, detail="Base de datos no disponible")
+    latencia_ms = round((time.perf_counter() - inicio) * 1000, 2)
+
+    version = version_actual(engine)
+    if version < VERSION_ESQUEMA:
+        raise HTTPException(status_code=503, detail=f"Esquema en la versión {version}, se espera la {VERSION_ESQUEMA}")
+
+    return {
+        "estado": "ok",
+        "db_latencia_ms": latencia_ms,
+        "version_esquema": version,
+        **_estado_worker(),
+    }
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from dependencias.auth import get_db, get_current_user
+from controllers import sync_controller
+from models.models import Usuario
+from models.response_models import SyncRespuesta, CambiosRespuesta
+from utils.respuestas import RespuestaJSONRapida
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/sync", response_model=SyncRespuesta, response_class=RespuestaJSONRapida)
+def sincronizar(
+    since: Optional[str] = Query(None, description="Token devuelto por la sincronización anterior"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Sincronización incremental para la app y los dispositivos de campo.
+    Sin `since` devuelve todos los productos, clientes, ubicaciones y rutas
+    asignadas al usuario; con el token de la respuesta anterior, solo lo
+    creado, modificado (cambios) o eliminado (eliminados) desde entonces.
+    Un mismo cambio puede llegar en dos sincronizaciones seguidas: aplicar
+    los cambios como upsert por clave.
+    """
+    try:
+        resultado = sync_controller.sincronizar(db, current_user.identificacion, since)
+        logger.info(
+            f"Sync de {current_user.identificacion} ({'completo' if resultado['completo'] else 'incremental'}): "
+            + ", ".join(f"{seccion} {len(resultado[seccion]['cambios'])}/{len(resultado[seccion]['eliminados'])}"
+                        for seccion in ("productos", "clientes", "ubicaciones_cliente", "rutas"))
+        )
+        return RespuestaJSONRapida(resultado)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al sincronizar para {current_user.identificacion}: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/sync/cambios", response_model=CambiosRespuesta, response_class=RespuestaJSONRapida)
+def cambios(
+    contador: str = Query(..., description="Tabla (productos, cliente, ruta...) o productos.stock"),
+    desde: int = Query(0, ge=0, description="Última versión ya aplicada por el cliente"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Claves creadas, modificadas o eliminadas en una tabla después de la
+    versión `desde`, para volver a pedir solo esas filas. Con hay_mas=true,
+    repetir con desde igual a la última versión recibida.
+    """
+    try:
+        return RespuestaJSONRapida(sync_controller.cambios_desde(db, contador, desde))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al leer cambios de {contador}: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, Body, HTTPException
+from fastapi import APIRouter, Depends, Body, HTTPException, Query
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_admin
+from dependencias.auth import get_db, get_current_user, require_admin, UsuarioToken
 from controllers import ubicacion_cliente_controller
 from models.models import Usuario
+from typing import Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +43,45 @@ def obtener_ubicaciones_cliente(
         logger.error(f"Error al obtener ubicaciones del cliente {cod_cliente}: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+@router.get("/ubicaciones_cliente/cercanas")
+def obtener_ubicaciones_cercanas(
+    lat: float = Query(..., ge=-90, le=90, description="Latitud del punto"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitud del punto"),
+    radio_km: float = Query(1.0, gt=0, le=500, description="Radio de búsqueda en kilómetros"),
+    limite: Optional[int] = Query(None, ge=1, le=5000, description="Máximo de resultados"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Obtiene las ubicaciones de clientes dentro de un radio, ordenadas por distancia
+    """
+    try:
+        logger.info(f"Usuario {current_user.identificacion} busca ubicaciones a {radio_km} km de ({lat}, {lng})")
+        ubicaciones = ubicacion_cliente_controller.get_ubicaciones_en_radio(db, lat, lng, radio_km, limite)
+        logger.info(f"Se encontraron {len(ubicaciones)} ubicaciones en el radio")
+        return ubicaciones
+    except Exception as e:
+        logger.error(f"Error al buscar ubicaciones cercanas: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/ubicaciones_cliente/mas-cercanas")
+def obtener_ubicaciones_mas_cercanas(
+    lat: float = Query(..., ge=-90, le=90, description="Latitud del punto"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitud del punto"),
+    k: int = Query(10, ge=1, le=500, description="Cantidad de ubicaciones"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Obtiene las k ubicaciones de clientes más cercanas a un punto
+    """
+    try:
+        logger.info(f"Usuario {current_user.identificacion} busca las {k} ubicaciones más cercanas a ({lat}, {lng})")
+        return ubicacion_cliente_controller.get_ubicaciones_mas_cercanas(db, lat, lng, k)
+    except Exception as e:
+        logger.error(f"Error al buscar ubicaciones más cercanas: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
 @router.get("/ubicaciones_cliente/{id_ubicacion}")
 def obtener_ubicacion(
     id_ubicacion: int,
@@ -119,7 +159,7 @@ def establecer_ubicacion_principal(
 def eliminar_ubicacion(
     id_ubicacion: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     try:
         logger.info(f"Usuario {current_user.identificacion} elimina ubicación ID: {id_ubicacion}")
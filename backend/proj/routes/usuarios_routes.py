@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from fastapi.responses import StreamingResponse  # ← Nueva importación
 from sqlalchemy.orm import Session
-from dependencias.auth import get_db, get_current_user, require_role, require_admin
+from dependencias.auth import get_db, get_current_user, require_role, require_admin, UsuarioToken
+from dependencias.etag import etag_por_version
 from controllers import usuarios_controller
 from models.models import Usuario, Rol
 import logging
@@ -14,7 +15,7 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/usuarios")
+@router.get("/usuarios", dependencies=[Depends(etag_por_version("usuarios", "roles"))])
 def listar_usuarios(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -85,7 +86,7 @@ def obtener_usuario(
 def crear_usuario(
     usuario: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Crea un nuevo usuario (requiere rol admin)
@@ -118,7 +119,7 @@ def editar_usuario(
 def eliminar_usuario(
     identificacion: str,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin())
+    current_user: UsuarioToken = Depends(require_admin())
 ):
     """
     Elimina un usuario (requiere rol admin)
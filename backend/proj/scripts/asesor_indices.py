@@ -0,0 +1,131 @@
+"""
+Asesor de índices
+Reproduce la carga de scripts/bench_api.py (un request por escenario, más el
+login) contra la base de DATABASE_URL, captura las consultas SQL que ejecuta
+cada endpoint, obtiene su plan con EXPLAIN y marca los recorridos secuenciales
+(Seq Scan en PostgreSQL, SCAN sin índice en SQLite) sobre tablas grandes.
+Para cada uno sugiere las columnas de la tabla que aparecen en condiciones de
+la consulta y no tienen índice.
+
+Uso: DATABASE_URL=sqlite:///bench.db python scripts/asesor_indices.py [filas_minimas] [salida.json]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import re
+from sqlalchemy import event, inspect, text
+
+# Tablas con menos filas se recorren completas sin problema
+FILAS_MINIMAS_DEFECTO = 10000
+LARGO_SENTENCIA_REPORTE = 160
+
+_PATRON_SCAN_SQLITE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def capturar_consultas(engine) -> dict:
+    """Escenario -> lista de (sentencia, parámetros) únicas que ejecutó"""
+    from scripts.bench_api import ESCENARIOS, cliente_autenticado
+
+    capturadas = {}
+    actual = ["login"]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith("SELECT"):
+            return
+        consultas = capturadas.setdefault(actual[0], {})
+        consultas.setdefault(statement, parameters)
+
+    client = cliente_autenticado()
+    for nombre, ruta, _ in ESCENARIOS:
+        actual[0] = nombre
+        client.get(ruta)
+    event.remove(engine, "before_cursor_execute", capturar)
+    return {nombre: list(consultas.items()) for nombre, consultas in capturadas.items()}
+
+
+def _recorrer_plan_postgres(nodo, encontrados: list):
+    if nodo.get("Node Type") == "Seq Scan":
+        encontrados.append((nodo.get("Relation Name"), f"Seq Scan (filas estimadas {nodo.get('Plan Rows')})"))
+    for hijo in nodo.get("Plans", []):
+        _recorrer_plan_postgres(hijo, encontrados)
+
+
+def recorridos_secuenciales(conn, dialecto: str, sentencia: str, parametros) -> list:
+    """Lista de (tabla, detalle) recorridas sin índice según EXPLAIN"""
+    encontrados = []
+    if dialecto == "postgresql":
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sentencia}", parametros).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        _recorrer_plan_postgres(plan[0]["Plan"], encontrados)
+    elif dialecto == "sqlite":
+        for fila in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sentencia}", parametros):
+            detalle = fila[-1]
+            coincidencia = _PATRON_SCAN_SQLITE.match(detalle)
+            if coincidencia:
+                encontrados.append((coincidencia.group(1), detalle))
+    else:
+        raise SystemExit(f"Dialecto no soportado por el asesor: {dialecto}")
+    return encontrados
+
+
+def columnas_sin_indice(inspector, tabla: str, sentencia: str) -> list:
+    """Columnas de `tabla` usadas en comparaciones de la consulta que no encabezan ningún índice"""
+    indexadas = {indice["column_names"][0] for indice in inspector.get_indexes(tabla) if indice["column_names"]}
+    indexadas.update(inspector.get_pk_constraint(tabla).get("constrained_columns", [])[:1])
+    usadas = re.findall(rf"\b{tabla}\.(\w+)\s*(?:=|IN\b|>|<|LIKE\b|ILIKE\b)", sentencia, re.IGNORECASE)
+    usadas += re.findall(rf"(?:=|IN\b)\s*\(?\s*{tabla}\.(\w+)", sentencia, re.IGNORECASE)
+    return sorted(set(usadas) - indexadas)
+
+
+def analizar(engine, filas_minimas: int) -> list:
+    capturadas = capturar_consultas(engine)
+    inspector = inspect(engine)
+    dialecto = engine.dialect.name
+    filas = {}
+    hallazgos = []
+
+    with engine.connect() as conn:
+        for tabla in inspector.get_table_names():
+            filas[tabla] = conn.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
+
+        for escenario, consultas in capturadas.items():
+            for sentencia, parametros in consultas:
+                for tabla, detalle in recorridos_secuenciales(conn, dialecto, sentencia, parametros):
+                    if filas.get(tabla, 0) < filas_minimas:
+                        continue
+                    hallazgos.append({
+                        "escenario": escenario,
+                        "tabla": tabla,
+                        "filas": filas[tabla],
+                        "plan": detalle,
+                        "columnas_sugeridas": columnas_sin_indice(inspector, tabla, sentencia),
+                        "sentencia": " ".join(sentencia.split()),
+                    })
+    return hallazgos
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    filas_minimas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS_MINIMAS_DEFECTO
+    hallazgos = analizar(engine, filas_minimas)
+
+    if not hallazgos:
+        print(f"Sin recorridos secuenciales sobre tablas de {filas_minimas} filas o más")
+    for h in hallazgos:
+        print(f"[{h['escenario']}] {h['tabla']} ({h['filas']} filas): {h['plan']}")
+        if h["columnas_sugeridas"]:
+            print(f"  índice sugerido en: {', '.join(h['columnas_sugeridas'])}")
+        else:
+            print("  recorrido completo sin filtro (listado sin paginar o agregación)")
+        print(f"  {h['sentencia'][:LARGO_SENTENCIA_REPORTE]}")
+
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w") as f:
+            json.dump(hallazgos, f, indent=2, ensure_ascii=False)
+        print(f"\nReporte guardado en {sys.argv[2]}")
@@ -0,0 +1,214 @@
+"""
+Benchmark de carga de la API
+Recorre los endpoints principales en el mismo proceso con TestClient contra
+la base indicada en DATABASE_URL (llenarla antes con
+scripts/generar_datos_sinteticos.py) y reporta por escenario la latencia
+p50/p95/p99, las consultas SQL por request, el tamaño de la respuesta y el
+RSS del proceso. El resultado se guarda en JSON con el commit actual para
+comparar regresiones entre commits.
+
+Uso: DATABASE_URL=sqlite:///bench.db python scripts/bench_api.py [repeticiones] [salida.json]
+     python scripts/bench_api.py --comparar base.json nuevo.json
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    # Sin psutil solo se reporta el RSS máximo (ru_maxrss)
+    psutil = None
+
+REPETICIONES_DEFECTO = 30
+CALENTAMIENTO = 2
+DIRECTORIO_RESULTADOS = "bench_resultados"
+# Variación de p95 a partir de la cual --comparar marca una regresión
+UMBRAL_REGRESION = 0.10
+
+# (nombre, ruta, repeticiones máximas); los listados completos de pedidos y
+# clientes son pesados con volúmenes reales, se repiten menos
+ESCENARIOS = [
+    ("productos", "/productos", None),
+    ("productos_filtrados", "/productos?categoria_id=3&price_range=medium", None),
+    ("productos_buscar", "/productos/buscar?q=leche%20entera&limite=20", None),
+    ("producto_detalle", "/productos/1", None),
+    ("clientes", "/clientes", 5),
+    ("pedidos", "/pedidos", 3),
+    ("pedido_detalle", "/pedidos/1", None),
+    ("facturas", "/facturas", 5),
+    ("rutas", "/rutas", None),
+    ("ubicaciones_cercanas", "/ubicaciones_cliente/cercanas?lat=-0.18&lng=-78.48&radio_km=2", None),
+    ("ubicaciones_mas_cercanas", "/ubicaciones_cliente/mas-cercanas?lat=-0.18&lng=-78.48&k=20", None),
+    ("catalogo_info", "/api/catalogo/export/info", None),
+]
+
+TABLAS_CONTADAS = ["productos", "cliente", "ubicacion_cliente", "pedido", "detalle_pedido", "factura", "ruta"]
+
+
+def rss_actual_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    return None
+
+
+def rss_maximo_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def contar_filas(engine) -> dict:
+    from sqlalchemy import text
+    conteos = {}
+    with engine.connect() as conn:
+        for tabla in TABLAS_CONTADAS:
+            conteos[tabla] = conn.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
+    return conteos
+
+
+def cliente_autenticado():
+    """TestClient de la app con sesión iniciada como el administrador sembrado"""
+    # Importar después de fijar DATABASE_URL: database.py crea el engine al importarse
+    from fastapi.testclient import TestClient
+    from app import app
+    from scripts.generar_datos_sinteticos import ADMIN
+
+    logging.disable(logging.INFO)
+    client = TestClient(app)
+    respuesta = client.post("/login", json={
+        "rucempresarial": ADMIN["rucempresarial"], "correo": ADMIN["correo"], "contrasena": ADMIN["contrasena"]
+    })
+    if respuesta.status_code != 200:
+        raise SystemExit(f"No se pudo iniciar sesión ({respuesta.status_code}): ¿se generaron los datos sintéticos?")
+    client.headers["Authorization"] = f"Bearer {respuesta.json()['access_token']}"
+    return client
+
+
+def ejecutar(repeticiones: int) -> dict:
+    from sqlalchemy import event
+    from database import engine
+
+    client = cliente_autenticado()
+    consultas = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def contar_consulta(conn, cursor, statement, parameters, context, executemany):
+        consultas[0] += 1
+
+    resultados = {}
+    for nombre, ruta, maximo in ESCENARIOS:
+        n = min(repeticiones, maximo) if maximo else repeticiones
+        for _ in range(CALENTAMIENTO):
+            client.get(ruta)
+
+        latencias, por_request = [], []
+        bytes_respuesta = estado = 0
+        for _ in range(n):
+            antes = consultas[0]
+            inicio = time.perf_counter()
+            respuesta = client.get(ruta)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            por_request.append(consultas[0] - antes)
+            bytes_respuesta = len(respuesta.content)
+            estado = respuesta.status_code
+
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+        rss = rss_actual_mb()
+        resultados[nombre] = {
+            "ruta": ruta,
+            "estado": estado,
+            "repeticiones": n,
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "consultas_por_request": round(sum(por_request) / n, 1),
+            "bytes_respuesta": bytes_respuesta,
+            "rss_mb": round(rss, 1) if rss is not None else None,
+            "rss_maximo_mb": round(rss_maximo_mb(), 1),
+        }
+        r = resultados[nombre]
+        print(f"{nombre:<26} {estado:>4} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+              f"{r['consultas_por_request']:>6.1f} {bytes_respuesta / 1024:>9.1f}KB {r['rss_maximo_mb']:>7.1f}MB")
+
+    return {
+        "commit": commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "dialecto": engine.dialect.name,
+        "filas": contar_filas(engine),
+        "escenarios": resultados,
+    }
+
+
+def comparar(ruta_base: str, ruta_nueva: str):
+    with open(ruta_base) as f:
+        base = json.load(f)
+    with open(ruta_nueva) as f:
+        nueva = json.load(f)
+    print(f"{base['commit']} -> {nueva['commit']}\n")
+    print(f"{'escenario':<26} {'p95 base':>9} {'p95 nuevo':>10} {'cambio':>8} {'consultas':>12}")
+    regresiones = 0
+    for nombre, r in nueva["escenarios"].items():
+        anterior = base["escenarios"].get(nombre)
+        if anterior is None:
+            print(f"{nombre:<26} {'-':>9} {r['p95_ms']:>10.1f}")
+            continue
+        cambio = (r["p95_ms"] - anterior["p95_ms"]) / anterior["p95_ms"] if anterior["p95_ms"] else 0.0
+        marca = ""
+        if cambio > UMBRAL_REGRESION or r["consultas_por_request"] > anterior["consultas_por_request"]:
+            marca = "  <- regresión"
+            regresiones += 1
+        print(f"{nombre:<26} {anterior['p95_ms']:>9.1f} {r['p95_ms']:>10.1f} {cambio:>+8.0%} "
+              f"{anterior['consultas_por_request']:>5.1f} -> {r['consultas_por_request']:<5.1f}{marca}")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API (base en DATABASE_URL)")
+    parser.add_argument("repeticiones", nargs="?", type=int, default=REPETICIONES_DEFECTO,
+                        help=f"requests por escenario (por defecto {REPETICIONES_DEFECTO})")
+    parser.add_argument("salida", nargs="?",
+                        help=f"archivo JSON de resultados (por defecto en {DIRECTORIO_RESULTADOS}/)")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"),
+                        help="compara dos resultados guardados y sale con 1 si hay regresiones")
+    args = parser.parse_args()
+
+    if args.comparar:
+        sys.exit(1 if comparar(*args.comparar) else 0)
+    if args.repeticiones < 1:
+        parser.error("repeticiones debe ser al menos 1")
+
+    print(f"{'escenario':<26} {'HTTP':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL':>6} {'respuesta':>11} {'RSS máx':>9}")
+    resultado = ejecutar(args.repeticiones)
+
+    if args.salida:
+        salida = args.salida
+    else:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        salida = os.path.join(
+            DIRECTORIO_RESULTADOS, f"api_{resultado['commit']}_{datetime.now():%Y%m%d_%H%M%S}.json"
+        )
+    with open(salida, "w") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
@@ -0,0 +1,86 @@
+"""
+Benchmark de arranque de un worker
+Importa app.py en procesos nuevos (como un worker recién lanzado) y reporta
+la mediana del tiempo de import, el RSS después del import y qué librerías
+pesadas quedaron cargadas. También mide el costo de la primera carga de los
+subsistemas de exportación (Excel y PDF), que ahora se importan al usarse.
+
+Uso: python scripts/bench_arranque.py [repeticiones]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import statistics
+import subprocess
+
+LIBRERIAS_PESADAS = ("pandas", "openpyxl", "reportlab", "PIL.Image", "requests", "pypdf")
+
+# Código que corre el proceso hijo: import de app y luego de cada subsistema
+_MEDICION = r"""
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1]) / 1024
+
+inicio = time.perf_counter()
+import app
+resultado = {
+    "import_app_s": time.perf_counter() - inicio,
+    "rss_mb": rss_mb(),
+    "cargadas": [nombre for nombre in %(librerias)r if nombre in sys.modules],
+}
+
+primer_uso = {}
+for nombre, modulos in %(subsistemas)r:
+    inicio = time.perf_counter()
+    for modulo in modulos:
+        __import__(modulo)
+    primer_uso[nombre] = time.perf_counter() - inicio
+resultado["primer_uso_s"] = primer_uso
+resultado["rss_todo_cargado_mb"] = rss_mb()
+print(json.dumps(resultado))
+"""
+
+# Lo que se importa la primera vez que se exporta un Excel o se genera un PDF
+SUBSISTEMAS = [
+    ("excel", ["pandas", "openpyxl", "openpyxl.styles", "openpyxl.utils.dataframe"]),
+    ("pdf_factura", ["reportlab.platypus", "reportlab.lib.styles"]),
+    ("pdf_catalogo", ["controllers.catalogo_pdf_controller"]),
+    ("imagenes", ["PIL.Image", "PIL.ImageOps"]),
+]
+
+
+def medir_una_vez(directorio: str) -> dict:
+    codigo = _MEDICION % {"librerias": LIBRERIAS_PESADAS, "subsistemas": SUBSISTEMAS}
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=directorio, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    directorio = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    medir_una_vez(directorio)  # calienta la caché de archivos y de bytecode
+    corridas = [medir_una_vez(directorio) for _ in range(repeticiones)]
+
+    import_ms = statistics.median(c["import_app_s"] for c in corridas) * 1000
+    rss = statistics.median(c["rss_mb"] for c in corridas)
+    rss_total = statistics.median(c["rss_todo_cargado_mb"] for c in corridas)
+    print(f"{repeticiones} procesos")
+    print(f"import app:             {import_ms:8.1f} ms (mediana)")
+    print(f"RSS tras el import:     {rss:8.1f} MB")
+    print(f"librerías pesadas:      {', '.join(corridas[0]['cargadas']) or 'ninguna'}")
+    print("primer uso de cada subsistema:")
+    for nombre, _ in SUBSISTEMAS:
+        ms = statistics.median(c["primer_uso_s"][nombre] for c in corridas) * 1000
+        print(f"  {nombre:<20} {ms:8.1f} ms")
+    print(f"RSS con todo cargado:   {rss_total:8.1f} MB")
@@ -0,0 +1,80 @@
+"""
+Benchmark de la búsqueda de productos
+Genera N productos con nombres en español y compara, por consulta, el índice
+de trigramas en memoria con un ILIKE '%texto%' en SQLite y con el recorrido
+en Python que hacía el catálogo.
+
+Uso: python scripts/bench_busqueda_productos.py [productos]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import time
+from sqlalchemy import create_engine, text
+from utils.busqueda_productos import IndiceProductos
+
+BASES = ["Leche", "Yogur", "Café", "Azúcar", "Arroz", "Atún", "Galletas", "Jabón", "Champú",
+         "Aceite", "Harina", "Fideos", "Mermelada", "Chocolate", "Té", "Agua", "Jugo", "Salsa"]
+VARIANTES = ["entera", "deslactosada", "integral", "de piña", "de maracuyá", "en polvo", "light",
+             "clásico", "orgánico", "con limón", "extra", "premium", "familiar", "económico"]
+MARCAS = ["Nestlé", "Toni", "La Favorita", "Pronaca", "Real", "Colgate", "Supermaxi", "Facundo"]
+TAMANOS = ["250 g", "500 g", "1 kg", "1 L", "2 L", "400 ml", "12 unidades"]
+
+CONSULTAS = ["lech", "leche deslac", "cafe", "maracuya", "azucar 1 kg", "yogurt", "chocolat premium", "nestle"]
+
+
+def generar(n: int):
+    random.seed(3)
+    return [
+        {
+            "id_producto": i,
+            "nombre": f"{random.choice(BASES)} {random.choice(VARIANTES)} {random.choice(TAMANOS)}",
+            "marca": random.choice(MARCAS),
+            "categoria": None,
+            "precio_minorista": round(random.uniform(0.5, 30), 2),
+            "precio_mayorista": None,
+            "estado": "activo",
+            "imagen": None,
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def medir(funcion, repeticiones: int = 5):
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000, resultado
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    productos = generar(n)
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE productos (id_producto INTEGER PRIMARY KEY, nombre TEXT, marca TEXT)"))
+        conn.execute(text("INSERT INTO productos VALUES (:id_producto, :nombre, :marca)"), productos)
+
+    indice = IndiceProductos()
+    inicio = time.perf_counter()
+    indice.reconstruir(productos)
+    print(f"{n} productos; índice construido en {(time.perf_counter() - inicio) * 1000:.0f} ms\n")
+
+    print(f"{'consulta':<20} {'scan Python':>12} {'ILIKE SQLite':>13} {'índice':>9}  primer resultado")
+    with engine.connect() as conn:
+        for consulta in CONSULTAS:
+            t_py, _ = medir(lambda: [p for p in productos if consulta in p["nombre"].lower()])
+            t_sql, _ = medir(lambda: conn.execute(
+                text("SELECT id_producto FROM productos WHERE nombre LIKE :p OR marca LIKE :p"),
+                {"p": f"%{consulta}%"}
+            ).fetchall())
+            t_idx, resultados = medir(lambda: indice.buscar(consulta, 10))
+            primero = resultados[0]["nombre"] if resultados else "-"
+            print(f"{consulta:<20} {t_py:>10.1f}ms {t_sql:>11.1f}ms {t_idx:>7.2f}ms  {primero}")
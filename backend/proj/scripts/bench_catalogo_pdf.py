@@ -0,0 +1,121 @@
+"""
+Benchmark del catálogo PDF
+Genera N productos sintéticos (con imagen local en la mitad de ellos) en
+varias categorías y renderiza el catálogo armando la lista completa de
+flowables antes de doc.build ("lista") y generándolos por categoría a medida
+que se dibujan las páginas ("streaming"), y con una categoría por proceso
+unida luego con pypdf ("paralelo"). Cada modo corre en un proceso aparte y
+reporta las páginas por segundo y el RSS máximo (en paralelo, el del hijo más
+grande), y en una segunda pasada el pico de memoria Python (tracemalloc) del
+proceso principal.
+
+Uso: python scripts/bench_catalogo_pdf.py [productos] [categorias] [procesos]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import json
+import random
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from PIL import Image as PILImage
+
+MODOS = ("lista", "streaming", "paralelo")
+
+
+def crear_imagenes(directorio: str, cantidad: int = 20):
+    """Imágenes de 600x600 en disco, como las subidas por los usuarios"""
+    random.seed(7)
+    rutas = []
+    for i in range(cantidad):
+        ruta = os.path.join(directorio, f"producto_{i}.png")
+        color = tuple(random.randint(0, 255) for _ in range(3))
+        PILImage.new("RGB", (600, 600), color).save(ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def generar_productos(n: int, categorias: int, imagenes: list):
+    # download_and_process_image resuelve las rutas relativas a la raíz del proyecto
+    from controllers import catalogo_pdf_controller
+    raiz = os.path.abspath(os.path.join(os.path.dirname(catalogo_pdf_controller.__file__), "..", "..", ".."))
+    relativas = [os.path.relpath(ruta, raiz) for ruta in imagenes]
+    random.seed(3)
+    return [
+        SimpleNamespace(
+            nombre=f"Producto de prueba número {i}",
+            imagen=random.choice(relativas) if i % 2 else None,
+            marca=SimpleNamespace(descripcion=f"Marca {i % 25}"),
+            categoria=SimpleNamespace(descripcion=f"Categoría {i % categorias:02d}"),
+        )
+        for i in range(n)
+    ]
+
+
+def renderizar(generador, destino, grupos, modo: str, procesos: int) -> int:
+    if modo == "paralelo":
+        return generador.build_catalog_parallel(destino, grupos, procesos)
+    return generador.build_catalog(destino, grupos, streaming=(modo == "streaming"))
+
+
+def medir(modo: str, n: int, categorias: int, procesos: int) -> dict:
+    from controllers.catalogo_pdf_controller import ProfessionalCatalogoPDF
+
+    with tempfile.TemporaryDirectory() as directorio:
+        productos = generar_productos(n, categorias, crear_imagenes(directorio))
+        generador = ProfessionalCatalogoPDF()
+        grupos = generador.group_products_by_category(productos)
+
+        # Tiempo y RSS sin tracemalloc, que vuelve mucho más lento el render
+        inicio = time.perf_counter()
+        salida = io.BytesIO()
+        paginas = renderizar(generador, salida, grupos, modo, procesos)
+        segundos = time.perf_counter() - inicio
+        # ru_maxrss está en KB en Linux
+        quien = resource.RUSAGE_CHILDREN if modo == "paralelo" else resource.RUSAGE_SELF
+        rss_maximo = resource.getrusage(quien).ru_maxrss / 1024
+
+        tracemalloc.start()
+        base, _ = tracemalloc.get_traced_memory()
+        renderizar(generador, io.BytesIO(), grupos, modo, procesos)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "modo": modo,
+        "paginas": paginas,
+        "segundos": round(segundos, 2),
+        "paginas_por_segundo": round(paginas / segundos, 1),
+        "pico_tracemalloc_mb": round((pico - base) / 2**20, 1),
+        "rss_maximo_mb": round(rss_maximo, 1),
+        "pdf_mb": round(len(salida.getvalue()) / 2**20, 2),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--modo":
+        # Proceso hijo: un solo modo, resultado en JSON por stdout
+        print(json.dumps(medir(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]))))
+        sys.exit(0)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    categorias = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    procesos = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+    print(f"{n} productos en {categorias} categorías; modo paralelo con {procesos} procesos\n")
+    print(f"{'modo':<10} {'páginas':>8} {'tiempo':>8} {'pág/s':>7} {'pico py':>9} {'RSS máx':>9} {'PDF':>8}")
+
+    for modo in MODOS:
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--modo", modo, str(n), str(categorias), str(procesos)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        r = json.loads(salida.strip().splitlines()[-1])
+        print(f"{r['modo']:<10} {r['paginas']:>8} {r['segundos']:>7.1f}s {r['paginas_por_segundo']:>7.1f} "
+              f"{r['pico_tracemalloc_mb']:>7.1f}MB {r['rss_maximo_mb']:>7.1f}MB {r['pdf_mb']:>6.2f}MB")
@@ -0,0 +1,127 @@
+"""
+Benchmark de las búsquedas espaciales sobre ubicacion_cliente
+Compara el recorrido completo de la tabla (lo que haría una búsqueda sin
+índice) con las consultas por rangos de geohash, sobre una base SQLite en
+memoria con N ubicaciones alrededor de Quito.
+
+Uso: python scripts/bench_geo.py [ubicaciones]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import random
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models.models import UbicacionCliente
+from controllers.ubicacion_cliente_controller import (
+    get_ubicaciones_en_radio, get_ubicaciones_mas_cercanas, get_ubicaciones_en_poligono
+)
+from utils.geo import encode_geohash, haversine_km, parse_poligono_geojson, punto_en_poligonos
+
+CENTRO = (-0.18, -78.48)
+
+
+def crear_base(filas: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    random.seed(42)
+    lote = []
+    with engine.begin() as conn:
+        for i in range(filas):
+            lat = CENTRO[0] + random.uniform(-0.3, 0.3)
+            lng = CENTRO[1] + random.uniform(-0.3, 0.3)
+            lote.append({
+                "cod_cliente": f"CLI{i % 20000:06d}",
+                "latitud": round(lat, 8),
+                "longitud": round(lng, 8),
+                "direccion": f"Calle {i}",
+                "sector": f"Sector {i % 40}",
+                "geohash": encode_geohash(lat, lng),
+            })
+            if len(lote) == 10000:
+                conn.execute(UbicacionCliente.__table__.insert(), lote)
+                lote = []
+        if lote:
+            conn.execute(UbicacionCliente.__table__.insert(), lote)
+    return sessionmaker(bind=engine)()
+
+
+def todas(db):
+    return [
+        (id_ubicacion, float(lat), float(lng))
+        for id_ubicacion, lat, lng in db.query(
+            UbicacionCliente.id_ubicacion, UbicacionCliente.latitud, UbicacionCliente.longitud
+        )
+    ]
+
+
+def radio_sin_indice(db, lat, lng, radio_km):
+    return {i for i, la, ln in todas(db) if haversine_km(lat, lng, la, ln) <= radio_km}
+
+
+def knn_sin_indice(db, lat, lng, k):
+    return sorted((haversine_km(lat, lng, la, ln), i) for i, la, ln in todas(db))[:k]
+
+
+def poligono_sin_indice(db, poligono):
+    poligonos = parse_poligono_geojson(poligono)
+    return {i for i, la, ln in todas(db) if punto_en_poligonos(la, ln, poligonos)}
+
+
+def medir(funcion, repeticiones: int = 3):
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000, resultado
+
+
+def comparar(nombre, sin_indice, con_indice, ids_sin_indice):
+    t_sin, res_sin = medir(sin_indice)
+    t_con, res_con = medir(con_indice)
+    assert ids_sin_indice(res_sin) == {u["id_ubicacion"] for u in res_con}, "Resultados distintos"
+    print(f"{nombre:<28} {t_sin:9.1f} ms {t_con:9.1f} ms  x{t_sin / t_con:6.1f}  ({len(res_con)} resultados)")
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    db = crear_base(filas)
+    lat, lng = CENTRO
+    poligono = json.dumps({
+        "type": "Polygon",
+        "coordinates": [[
+            [lng - 0.02, lat - 0.02], [lng + 0.02, lat - 0.02],
+            [lng + 0.03, lat + 0.02], [lng - 0.02, lat + 0.01],
+            [lng - 0.02, lat - 0.02]
+        ]]
+    })
+
+    print(f"{filas} ubicaciones en SQLite en memoria")
+    print(f"{'consulta':<28} {'sin índice':>12} {'geohash':>12}")
+    for radio in (0.5, 2.0, 5.0):
+        comparar(
+            f"radio {radio} km",
+            lambda: radio_sin_indice(db, lat, lng, radio),
+            lambda: get_ubicaciones_en_radio(db, lat, lng, radio),
+            lambda res: res,
+        )
+    for k in (1, 10, 100):
+        comparar(
+            f"{k} más cercanas",
+            lambda: knn_sin_indice(db, lat, lng, k),
+            lambda: get_ubicaciones_mas_cercanas(db, lat, lng, k),
+            lambda res: {i for _, i in res},
+        )
+    comparar(
+        "polígono ~20 km²",
+        lambda: poligono_sin_indice(db, poligono),
+        lambda: get_ubicaciones_en_poligono(db, poligono),
+        lambda res: res,
+    )
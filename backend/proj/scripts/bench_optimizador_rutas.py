@@ -0,0 +1,63 @@
+"""
+Benchmark del optimizador de orden de visita
+Para 50, 200 y 1000 paradas aleatorias alrededor de Quito mide el tiempo de
+la matriz de distancias (NumPy vs Python puro), la semilla por vecino más
+cercano y la mejora 2-opt/Or-opt, y la distancia total de cada etapa.
+
+Uso: python scripts/bench_optimizador_rutas.py [tiempo_maximo_ms]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import time
+from utils.geo import haversine_km
+from utils.optimizador_rutas import (
+    matriz_distancias, vecino_mas_cercano, longitud_camino, optimizar_orden
+)
+
+TAMANOS = (50, 200, 1000)
+
+
+def puntos_aleatorios(n: int, semilla: int):
+    random.seed(semilla)
+    lats = [-0.18 + random.uniform(-0.15, 0.15) for _ in range(n)]
+    lngs = [-78.48 + random.uniform(-0.1, 0.1) for _ in range(n)]
+    return lats, lngs
+
+
+def matriz_python(lats, lngs):
+    return [[haversine_km(lats[i], lngs[i], lats[j], lngs[j]) for j in range(len(lats))] for i in range(len(lats))]
+
+
+def ms(inicio: float) -> float:
+    return (time.perf_counter() - inicio) * 1000
+
+
+if __name__ == "__main__":
+    tiempo_maximo_ms = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"Presupuesto de tiempo: {tiempo_maximo_ms} ms\n")
+    print(f"{'paradas':>7} {'matriz py':>10} {'matriz np':>10} {'orden actual':>13} "
+          f"{'vecino cerc.':>13} {'optimizado':>11} {'mejora':>7} {'tiempo':>9} {'completo':>9}")
+
+    for n in TAMANOS:
+        lats, lngs = puntos_aleatorios(n, n)
+
+        inicio = time.perf_counter()
+        matriz_python(lats, lngs)
+        t_py = ms(inicio)
+
+        inicio = time.perf_counter()
+        d = matriz_distancias(lats, lngs)
+        t_np = ms(inicio)
+
+        actual = longitud_camino(d, list(range(n)))
+        semilla = longitud_camino(d, vecino_mas_cercano(d, 0))
+        resultado = optimizar_orden(lats, lngs, tiempo_maximo_ms=tiempo_maximo_ms)
+
+        assert sorted(resultado["orden"]) == list(range(n))
+        print(f"{n:>7} {t_py:>8.1f}ms {t_np:>8.1f}ms {actual:>10.1f} km {semilla:>10.1f} km "
+              f"{resultado['distancia_km']:>8.1f} km {1 - resultado['distancia_km'] / actual:>7.1%} "
+              f"{resultado['tiempo_ms']:>7.0f}ms {str(resultado['completo']):>9}")
@@ -0,0 +1,126 @@
+"""
+Benchmark de serialización y compresión para los endpoints de listas grandes
+Compara el camino por defecto de FastAPI (jsonable_encoder + json.dumps) con
+RespuestaJSONRapida (orjson) y mide los bytes enviados con y sin compresión.
+
+Uso: python scripts/bench_serializacion.py [filas]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gzip
+import random
+import time
+from datetime import date, datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from utils.respuestas import RespuestaJSONRapida
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def generar_clientes(filas: int):
+    """Payload con la forma de /clientes/con-ubicaciones"""
+    random.seed(42)
+    hoy = datetime.now()
+    clientes = []
+    for i in range(filas):
+        clientes.append({
+            "cod_cliente": f"CLI{i:06d}",
+            "identificacion": f"{1700000000 + i}",
+            "nombre": f"Cliente de prueba {i}",
+            "direccion": f"Av. Principal {i} y Secundaria",
+            "celular": f"09{random.randint(10000000, 99999999)}",
+            "correo": f"cliente{i}@correo.com",
+            "tipo_cliente": random.choice(["mayorista", "minorista"]),
+            "razon_social": f"Comercial {i} S.A.",
+            "sector": f"Sector {i % 40}",
+            "fecha_registro": date(2024, 1, 1) + timedelta(days=i % 365),
+            "id_ubicacion_principal": i,
+            "ubicaciones": [
+                {
+                    "id_ubicacion": i,
+                    "latitud": -0.18 + random.random() / 10,
+                    "longitud": -78.48 + random.random() / 10,
+                    "direccion": f"Calle {i}",
+                    "sector": f"Sector {i % 40}",
+                    "referencia": "Junto al parque",
+                    "fecha_registro": hoy,
+                }
+            ],
+        })
+    return clientes
+
+
+def generar_pedidos(filas: int):
+    """Payload con la forma de /pedidos"""
+    random.seed(7)
+    pedidos = []
+    for i in range(filas):
+        detalles = [
+            {
+                "id_detalle_pedido": i * 3 + j,
+                "id_pedido": i,
+                "id_producto": random.randint(1, 20000),
+                "cantidad": random.randint(1, 20),
+                "precio_unitario": round(random.uniform(0.5, 300), 2),
+                "descuento": 0.0,
+                "subtotal_lineal": round(random.uniform(1, 1000), 2),
+                "subtotal": round(random.uniform(1, 1000), 2),
+            }
+            for j in range(3)
+        ]
+        pedidos.append({
+            "id_pedido": i,
+            "numero_pedido": f"PED-{i:07d}",
+            "fecha_pedido": date(2025, 1, 1) + timedelta(days=i % 300),
+            "subtotal": 100.0,
+            "iva": 12.0,
+            "total": 112.0,
+            "cod_cliente": f"CLI{i % 5000:06d}",
+            "detalles": detalles,
+        })
+    return pedidos
+
+
+def medir(funcion, repeticiones: int = 5):
+    """Devuelve el mejor tiempo en ms y el resultado de la última ejecución"""
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000, resultado
+
+
+def ejecutar(nombre: str, payload):
+    por_defecto = JSONResponse(content=None)
+    rapida = RespuestaJSONRapida(content=None)
+
+    t_defecto, cuerpo_defecto = medir(lambda: por_defecto.render(jsonable_encoder(payload)))
+    t_rapida, cuerpo_rapido = medir(lambda: rapida.render(payload))
+
+    print(f"\n== {nombre} ({len(payload)} filas) ==")
+    print(f"jsonable_encoder + json : {t_defecto:8.1f} ms  {len(cuerpo_defecto):>10,} bytes")
+    print(f"RespuestaJSONRapida     : {t_rapida:8.1f} ms  {len(cuerpo_rapido):>10,} bytes"
+          f"  (x{t_defecto / t_rapida:.1f})")
+
+    t_gzip, gz = medir(lambda: gzip.compress(cuerpo_rapido, compresslevel=6), 3)
+    print(f"gzip nivel 6            : {t_gzip:8.1f} ms  {len(gz):>10,} bytes"
+          f"  ({len(gz) / len(cuerpo_rapido):.1%} del original)")
+    if brotli is not None:
+        t_br, br = medir(lambda: brotli.compress(cuerpo_rapido, quality=4), 3)
+        print(f"brotli calidad 4        : {t_br:8.1f} ms  {len(br):>10,} bytes"
+              f"  ({len(br) / len(cuerpo_rapido):.1%} del original)")
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ejecutar("/clientes/con-ubicaciones", generar_clientes(filas))
+    ejecutar("/pedidos", generar_pedidos(filas))
@@ -0,0 +1,141 @@
+"""
+Benchmark multi-worker
+Levanta el servidor de producción (gunicorn -c gunicorn.conf.py) con 1 worker
+y con N workers contra la base de DATABASE_URL, lo carga con clientes HTTP
+concurrentes y compara requests por segundo y latencia p50/p95. Con /salud
+cuenta cuántos workers distintos atendieron. Si gunicorn no está instalado
+usa uvicorn --workers, que también reparte entre procesos (sin preload).
+
+Uso: DATABASE_URL=sqlite:///bench.db python scripts/bench_workers.py [workers] [segundos] [concurrencia]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shutil
+import signal
+import subprocess
+import threading
+import time
+
+import httpx
+import numpy as np
+
+PUERTO = 8765
+CALENTAMIENTO_S = 2
+ESPERA_ARRANQUE_S = 60
+
+# Mezcla de lectura representativa: (ruta, peso)
+MEZCLA = [
+    ("/productos?categoria_id=3&price_range=medium", 4),
+    ("/productos/buscar?q=leche%20entera&limite=20", 4),
+    ("/productos/1", 4),
+    ("/pedidos/1", 2),
+    ("/rutas", 1),
+    ("/ubicaciones_cliente/mas-cercanas?lat=-0.18&lng=-78.48&k=20", 2),
+]
+
+
+def comando_servidor(workers: int) -> list:
+    if shutil.which("gunicorn"):
+        return ["gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{PUERTO}",
+                "--workers", str(workers), "app:app"]
+    return [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(PUERTO),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning"]
+
+
+def esperar_listo(base: str):
+    limite = time.monotonic() + ESPERA_ARRANQUE_S
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{base}/salud/lista", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise SystemExit("El servidor no respondió a /salud/lista a tiempo")
+
+
+def token_admin(base: str) -> str:
+    from scripts.generar_datos_sinteticos import ADMIN
+
+    respuesta = httpx.post(f"{base}/login", json={
+        "rucempresarial": ADMIN["rucempresarial"], "correo": ADMIN["correo"], "contrasena": ADMIN["contrasena"]
+    }, timeout=30)
+    if respuesta.status_code != 200:
+        raise SystemExit(f"No se pudo iniciar sesión ({respuesta.status_code}): ¿se generaron los datos sintéticos?")
+    return respuesta.json()["access_token"]
+
+
+def cargar(base: str, token: str, segundos: float, concurrencia: int) -> dict:
+    rutas = [ruta for ruta, peso in MEZCLA for _ in range(peso)]
+    latencias, errores, pids = [], [0], set()
+    bloqueo = threading.Lock()
+    fin_calentamiento = time.monotonic() + CALENTAMIENTO_S
+    fin = fin_calentamiento + segundos
+
+    def cliente(numero: int):
+        propias, fallidas = [], 0
+        with httpx.Client(base_url=base, headers={"Authorization": f"Bearer {token}"}, timeout=30) as http:
+            i = numero
+            while True:
+                ahora = time.monotonic()
+                if ahora >= fin:
+                    break
+                inicio = time.perf_counter()
+                respuesta = http.get(rutas[i % len(rutas)])
+                if ahora >= fin_calentamiento:
+                    propias.append((time.perf_counter() - inicio) * 1000)
+                    fallidas += respuesta.status_code >= 400
+                i += 1
+            # Cada conexión keep-alive queda en un worker: preguntar cuál
+            vistos = {http.get("/salud").json()["pid"] for _ in range(5)}
+        with bloqueo:
+            latencias.extend(propias)
+            errores[0] += fallidas
+            pids.update(vistos)
+
+    hilos = [threading.Thread(target=cliente, args=(n,)) for n in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    p50, p95 = np.percentile(latencias, [50, 95])
+    return {
+        "requests": len(latencias),
+        "req_s": len(latencias) / segundos,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "errores": errores[0],
+        "workers_vistos": len(pids),
+    }
+
+
+def medir(workers: int, segundos: float, concurrencia: int) -> dict:
+    directorio = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    base = f"http://127.0.0.1:{PUERTO}"
+    servidor = subprocess.Popen(comando_servidor(workers), cwd=directorio, stdout=subprocess.DEVNULL)
+    try:
+        esperar_listo(base)
+        return cargar(base, token_admin(base), segundos, concurrencia)
+    finally:
+        # SIGTERM: apagado ordenado, los workers terminan lo que tienen en curso
+        servidor.send_signal(signal.SIGTERM)
+        servidor.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(len(os.sched_getaffinity(0)), 2)
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+    concurrencia = int(sys.argv[3]) if len(sys.argv) > 3 else 4 * workers
+
+    servidor = "gunicorn" if shutil.which("gunicorn") else "uvicorn --workers (gunicorn no instalado)"
+    print(f"{servidor}, {len(os.sched_getaffinity(0))} núcleos, {concurrencia} clientes, {segundos:.0f} s\n")
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errores':>8} {'pids':>5}")
+    resultados = {}
+    for n in (1, workers):
+        r = resultados[n] = medir(n, segundos, concurrencia)
+        print(f"{n:>7} {r['req_s']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['errores']:>8} {r['workers_vistos']:>5}")
+    print(f"\nAceleración con {workers} workers: x{resultados[workers]['req_s'] / resultados[1]['req_s']:.2f}")
@@ -0,0 +1,279 @@
+"""
+Generador de datos sintéticos para benchmarks y pruebas de carga
+Llena una base vacía con volúmenes realistas a partir de models/models.py:
+20k productos, 50k clientes con su ubicación, 100k pedidos con ~1M líneas
+de detalle, estados, facturas y rutas con asignaciones. Los datos son
+deterministas (misma semilla, mismos datos) para comparar entre commits.
+
+La base se elige con DATABASE_URL; por seguridad el script se niega a
+correr si la tabla de productos ya tiene filas.
+
+Uso: DATABASE_URL=sqlite:///bench.db python scripts/generar_datos_sinteticos.py [escala]
+     (escala 1.0 = volúmenes completos; 0.1 = un décimo)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import func, select
+from database import Base, engine
+from models.models import (
+    Rol, Usuario, Marca, Categoria, Producto, Cliente, UbicacionCliente, Ruta,
+    AsignacionRuta, Pedido, EstadoPedido, DetallePedido, Factura, DetalleFactura
+)
+from utils.cambios import registrar_cambios_masivos
+from utils.geo import encode_geohash
+from utils.security import hash_password_with_salt
+
+SEMILLA = 2024
+TAMANO_LOTE = 10000
+
+# Volúmenes con escala 1.0
+VOLUMENES = {
+    "marcas": 200,
+    "categorias": 40,
+    "vendedores": 50,
+    "productos": 20000,
+    "clientes": 50000,
+    "pedidos": 100000,
+    "lineas_por_pedido": (5, 15),   # ~1M detalle_pedido
+    "facturas": 20000,
+    "lineas_por_factura": (2, 8),
+    "rutas": 500,
+    "clientes_por_ruta": (20, 60),
+}
+
+# Credenciales del administrador sembrado (las usa scripts/bench_api.py)
+ADMIN = {
+    "identificacion": "0000000001",
+    "rucempresarial": "1790000000001",
+    "correo": "admin@bench.local",
+    "contrasena": "benchmark123",
+}
+
+SECTORES = ["Norte", "Centro", "Sur", "Valle", "Cumbayá", "Conocoto", "Calderón", "Carapungo"]
+BASES_PRODUCTO = ["Leche", "Yogur", "Café", "Azúcar", "Arroz", "Atún", "Galletas", "Jabón", "Champú",
+                  "Aceite", "Harina", "Fideos", "Mermelada", "Chocolate", "Té", "Agua", "Jugo", "Salsa"]
+VARIANTES = ["entera", "deslactosada", "integral", "de piña", "light", "clásico", "orgánico", "premium"]
+TAMANOS = ["250 g", "500 g", "1 kg", "1 L", "2 L", "400 ml", "12 unidades"]
+ESTADOS_PEDIDO = ["Pendiente", "En proceso", "Enviado", "Entregado", "Cancelado"]
+
+
+def escalar(n: int, escala: float) -> int:
+    return max(1, int(n * escala))
+
+
+def insertar(conn, modelo, filas):
+    """Inserta por lotes con executemany (sin pasar por el ORM)"""
+    for i in range(0, len(filas), TAMANO_LOTE):
+        conn.execute(modelo.__table__.insert(), filas[i:i + TAMANO_LOTE])
+
+
+def generar(escala: float):
+    rnd = random.Random(SEMILLA)
+    hoy = date.today()
+    conteos = {}
+
+    def fecha_aleatoria(dias: int = 365):
+        return hoy - timedelta(days=rnd.randint(0, dias))
+
+    with engine.begin() as conn:
+        insertar(conn, Rol, [{"id_rol": 1, "descripcion": "admin"}, {"id_rol": 2, "descripcion": "vendedor"}])
+
+        salt = "bench"
+        usuarios = [{
+            "identificacion": ADMIN["identificacion"], "rucempresarial": ADMIN["rucempresarial"],
+            "nombre": "Administrador Bench", "correo": ADMIN["correo"], "celular": "0990000000",
+            "contrasena": hash_password_with_salt(ADMIN["contrasena"], salt), "salt": salt,
+            "estado": "activo", "fecha_actualizacion": hoy, "id_rol": 1,
+        }]
+        vendedores = [f"{i + 2:010d}" for i in range(escalar(VOLUMENES["vendedores"], escala))]
+        for identificacion in vendedores:
+            usuarios.append({
+                "identificacion": identificacion, "rucempresarial": ADMIN["rucempresarial"],
+                "nombre": f"Vendedor {identificacion}", "correo": f"v{identificacion}@bench.local",
+                "celular": "0990000000", "contrasena": hash_password_with_salt(ADMIN["contrasena"], salt),
+                "salt": salt, "estado": "activo", "fecha_actualizacion": hoy, "id_rol": 2,
+            })
+        insertar(conn, Usuario, usuarios)
+        conteos["usuarios"] = len(usuarios)
+
+        n_marcas = escalar(VOLUMENES["marcas"], escala)
+        n_categorias = escalar(VOLUMENES["categorias"], escala)
+        insertar(conn, Marca, [{"id_marca": i, "descripcion": f"Marca {i}"} for i in range(1, n_marcas + 1)])
+        insertar(conn, Categoria, [{"id_categoria": i, "descripcion": f"Categoría {i}"} for i in range(1, n_categorias + 1)])
+
+        n_productos = escalar(VOLUMENES["productos"], escala)
+        precios = {}
+        productos = []
+        for i in range(1, n_productos + 1):
+            precio = round(rnd.uniform(0.5, 300), 2)
+            precios[i] = precio
+            productos.append({
+                "id_producto": i,
+                "nombre": f"{rnd.choice(BASES_PRODUCTO)} {rnd.choice(VARIANTES)} {rnd.choice(TAMANOS)}",
+                "id_marca": rnd.randint(1, n_marcas),
+                "stock": rnd.randint(0, 500),
+                "precio_mayorista": round(precio * 0.85, 2),
+                "precio_minorista": precio,
+                "id_categoria": rnd.randint(1, n_categorias),
+                "iva": 0.15,
+                "estado": "activo" if rnd.random() < 0.9 else "inactivo",
+                "imagen": None,
+            })
+        insertar(conn, Producto, productos)
+        conteos["productos"] = n_productos
+        del productos
+
+        # Clientes primero sin ubicación principal (referencia circular), luego ubicaciones
+        n_clientes = escalar(VOLUMENES["clientes"], escala)
+        clientes = []
+        ubicaciones = []
+        for i in range(1, n_clientes + 1):
+            cod = f"CLI{i:07d}"
+            sector = rnd.choice(SECTORES)
+            lat = round(-0.18 + rnd.uniform(-0.2, 0.2), 8)
+            lng = round(-78.48 + rnd.uniform(-0.12, 0.12), 8)
+            clientes.append({
+                "cod_cliente": cod, "identificacion": rnd.choice(vendedores), "nombre": f"Cliente {i}",
+                "direccion": f"Calle {i}", "celular": "0991111111", "correo": f"cliente{i}@bench.local",
+                "tipo_cliente": rnd.choice(["minorista", "mayorista"]), "razon_social": f"Negocio {i}",
+                "sector": sector, "fecha_registro": fecha_aleatoria(), "id_ubicacion_principal": None,
+            })
+            ubicaciones.append({
+                "id_ubicacion": i, "cod_cliente": cod, "latitud": lat, "longitud": lng,
+                "direccion": f"Calle {i}", "sector": sector, "referencia": None,
+                # El insert masivo no dispara el evento del modelo: el geohash se calcula aquí
+                "geohash": encode_geohash(lat, lng),
+            })
+        insertar(conn, Cliente, clientes)
+        insertar(conn, UbicacionCliente, ubicaciones)
+        conn.execute(
+            Cliente.__table__.update().values(
+                id_ubicacion_principal=select(UbicacionCliente.id_ubicacion).where(
+                    UbicacionCliente.cod_cliente == Cliente.cod_cliente
+                ).scalar_subquery()
+            )
+        )
+        codigos = [c["cod_cliente"] for c in clientes]
+        conteos["clientes"] = conteos["ubicacion_cliente"] = n_clientes
+        del clientes, ubicaciones
+
+        n_pedidos = escalar(VOLUMENES["pedidos"], escala)
+        pedidos, detalles, estados = [], [], []
+        id_detalle = 0
+        for id_pedido in range(1, n_pedidos + 1):
+            subtotal = 0.0
+            for _ in range(rnd.randint(*VOLUMENES["lineas_por_pedido"])):
+                id_detalle += 1
+                id_producto = rnd.randint(1, n_productos)
+                cantidad = rnd.randint(1, 24)
+                linea = round(cantidad * precios[id_producto], 2)
+                subtotal += linea
+                detalles.append({
+                    "id_detalle_pedido": id_detalle, "id_pedido": id_pedido, "id_producto": id_producto,
+                    "cantidad": cantidad, "precio_unitario": precios[id_producto], "descuento": 0.0,
+                    "subtotal_lineal": linea, "subtotal": linea,
+                })
+            fecha = fecha_aleatoria()
+            pedidos.append({
+                "id_pedido": id_pedido, "numero_pedido": f"PED-{id_pedido:07d}", "fecha_pedido": fecha,
+                "subtotal": round(subtotal, 2), "iva": round(subtotal * 0.15, 2),
+                "total": round(subtotal * 1.15, 2), "cod_cliente": rnd.choice(codigos),
+            })
+            for n_estado in range(rnd.randint(1, 3)):
+                estados.append({
+                    "id_pedido": id_pedido, "fecha_actualizada": fecha + timedelta(days=n_estado),
+                    "descripcion": ESTADOS_PEDIDO[min(n_estado * 2, len(ESTADOS_PEDIDO) - 1)],
+                })
+            if len(detalles) >= TAMANO_LOTE * 5:
+                insertar(conn, Pedido, pedidos)
+                insertar(conn, DetallePedido, detalles)
+                insertar(conn, EstadoPedido, estados)
+                pedidos, detalles, estados = [], [], []
+        insertar(conn, Pedido, pedidos)
+        insertar(conn, DetallePedido, detalles)
+        insertar(conn, EstadoPedido, estados)
+        conteos["pedidos"] = n_pedidos
+        conteos["detalle_pedido"] = id_detalle
+
+        n_facturas = escalar(VOLUMENES["facturas"], escala)
+        facturas, detalles_factura = [], []
+        for id_factura in range(1, n_facturas + 1):
+            subtotal = 0.0
+            for _ in range(rnd.randint(*VOLUMENES["lineas_por_factura"])):
+                id_producto = rnd.randint(1, n_productos)
+                cantidad = rnd.randint(1, 24)
+                linea = round(cantidad * precios[id_producto], 2)
+                subtotal += linea
+                detalles_factura.append({
+                    "id_factura": id_factura, "id_producto": id_producto, "cantidad": cantidad,
+                    "precio_unitario": precios[id_producto], "iva_producto": round(linea * 0.15, 2),
+                    "subtotal_lineal": linea,
+                })
+            facturas.append({
+                "id_factura": id_factura, "cod_cliente": rnd.choice(codigos), "numero_factura": id_factura,
+                "fecha_emision": fecha_aleatoria(), "estado": rnd.choice(["emitida", "pagada", "anulada"]),
+                "subtotal": round(subtotal, 2), "iva": round(subtotal * 0.15, 2), "total": round(subtotal * 1.15, 2),
+            })
+        insertar(conn, Factura, facturas)
+        insertar(conn, DetalleFactura, detalles_factura)
+        conteos["facturas"] = n_facturas
+        conteos["detalle_factura"] = len(detalles_factura)
+        del facturas, detalles_factura
+
+        n_rutas = escalar(VOLUMENES["rutas"], escala)
+        rutas, asignaciones = [], []
+        for id_ruta in range(1, n_rutas + 1):
+            rutas.append({
+                "id_ruta": id_ruta, "nombre": f"Ruta {id_ruta}", "tipo_ruta": "venta",
+                "sector": rnd.choice(SECTORES), "direccion": None, "estado": "Planificada",
+                "fecha_ejecucion": fecha_aleatoria(30), "poligono_geojson": None, "id_pedido": None,
+            })
+            asignaciones.append({
+                "id_ruta": id_ruta, "identificacion_usuario": rnd.choice(vendedores), "tipo_usuario": "vendedor",
+                "cod_cliente": None, "id_ubicacion": None, "orden_visita": None,
+            })
+            indices = rnd.sample(range(n_clientes), min(n_clientes, rnd.randint(*VOLUMENES["clientes_por_ruta"])))
+            for orden, indice in enumerate(indices, start=1):
+                asignaciones.append({
+                    "id_ruta": id_ruta, "identificacion_usuario": None, "tipo_usuario": None,
+                    "cod_cliente": codigos[indice], "id_ubicacion": indice + 1, "orden_visita": orden,
+                })
+        insertar(conn, Ruta, rutas)
+        insertar(conn, AsignacionRuta, asignaciones)
+        conteos["rutas"] = n_rutas
+        conteos["asignacion_ruta"] = len(asignaciones)
+
+        # Inserciones sin Session: los cambios se registran a mano (cachés y ETag)
+        registrar_cambios_masivos(conn, Base.metadata.tables)
+
+    return conteos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Llena una base vacía (DATABASE_URL) con datos sintéticos")
+    parser.add_argument("escala", nargs="?", type=float, default=1.0,
+                        help="1.0 = volúmenes completos; 0.1 = un décimo (por defecto 1.0)")
+    escala = parser.parse_args().escala
+    if escala <= 0:
+        parser.error("la escala debe ser mayor que 0")
+    print(f"Base: {engine.url.render_as_string(hide_password=True)} (escala {escala})")
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(Producto.__table__)).scalar():
+            print("La base ya tiene productos: use una base vacía para generar datos sintéticos")
+            sys.exit(1)
+
+    inicio = time.perf_counter()
+    conteos = generar(escala)
+    for tabla, cantidad in conteos.items():
+        print(f"  {tabla:<18} {cantidad:>9}")
+    print(f"Datos generados en {time.perf_counter() - inicio:.1f} s")
+    print(f"Login del benchmark: RUC {ADMIN['rucempresarial']}, {ADMIN['correo']} / {ADMIN['contrasena']}")
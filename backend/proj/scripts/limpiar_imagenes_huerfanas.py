@@ -0,0 +1,37 @@
+"""
+Script para limpiar imágenes huérfanas de uploads/productos: archivos que
+ningún producto referencia (subidas fallidas, borrados que no se
+completaron, variantes de imágenes reemplazadas).
+Por defecto solo reporta; los archivos más recientes que el periodo de
+gracia no se tocan. Pensado para correr desde cron en backend/proj.
+
+Uso: python scripts/limpiar_imagenes_huerfanas.py [reportar|cuarentena|eliminar] [gracia_minutos]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal
+from controllers.producto_controller import reconciliar_imagenes_huerfanas, GRACIA_MINUTOS_DEFECTO
+
+
+if __name__ == "__main__":
+    modo = sys.argv[1] if len(sys.argv) > 1 else "reportar"
+    gracia_minutos = int(sys.argv[2]) if len(sys.argv) > 2 else GRACIA_MINUTOS_DEFECTO
+
+    db = SessionLocal()
+    try:
+        reporte = reconciliar_imagenes_huerfanas(db, modo, gracia_minutos)
+    finally:
+        db.close()
+
+    print(f"Modo: {reporte['modo']}")
+    print(f"Archivos revisados: {reporte['archivos_revisados']}")
+    print(f"Huérfanos: {reporte['huerfanos']} ({reporte['bytes_huerfanos'] / 2**20:.2f} MB)")
+    print(f"Omitidos por periodo de gracia: {reporte['omitidos_por_gracia']}")
+    print(f"Bytes recuperados: {reporte['bytes_recuperados']} ({reporte['bytes_recuperados'] / 2**20:.2f} MB)")
+    if reporte["errores"]:
+        print(f"Errores: {reporte['errores']}")
+    for nombre in reporte["ejemplos"]:
+        print(f"  {nombre}")
@@ -0,0 +1,33 @@
+"""
+Ejecuta las migraciones pendientes del esquema (migraciones/) y las registra
+en la tabla schema_version. Pensado para correr una vez por deploy, antes de
+levantar los workers, que por defecto solo verifican el esquema al arrancar
+(MIGRAR_AL_INICIAR, ver utils/migraciones.py).
+
+Uso: python scripts/migrar.py [estado|aplicar]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+from database import engine
+from utils.migraciones import VERSION_ESQUEMA, aplicar_migraciones, pendientes, version_actual
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    accion = sys.argv[1] if len(sys.argv) > 1 else "aplicar"
+
+    version = version_actual(engine)
+    print(f"Esquema en la versión {version} (última: {VERSION_ESQUEMA})")
+    if accion == "estado":
+        for numero, modulo in pendientes(version):
+            print(f"  pendiente {numero}: {modulo}")
+        sys.exit(1 if version < VERSION_ESQUEMA else 0)
+
+    aplicadas = aplicar_migraciones(engine)
+    if aplicadas:
+        print(f"Migraciones aplicadas: {', '.join(map(str, aplicadas))}")
+    else:
+        print("El esquema ya estaba al día")
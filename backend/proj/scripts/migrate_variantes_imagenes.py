@@ -0,0 +1,63 @@
+"""
+Script para generar las variantes (thumb/card/full en WebP y JPEG) de las
+imágenes de productos subidas antes del pipeline de imágenes, y apuntar
+productos.imagen a la variante principal. El original se elimina solo
+después de guardar el producto. Se puede ejecutar varias veces: omite los
+productos que ya tienen variantes y las imágenes que no están en disco.
+Ejecutar desde backend/proj (las rutas de uploads son relativas).
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uuid
+from fastapi import HTTPException
+from database import SessionLocal
+from models.models import Producto
+from utils.imagenes import (
+    DIRECTORIO_PRODUCTOS, URL_PRODUCTOS, VARIANTE_PRINCIPAL,
+    generar_variantes, ruta_local, ruta_variante
+)
+
+
+def migrar_imagenes():
+    db = SessionLocal()
+    convertidas = omitidas = bytes_antes = bytes_despues = 0
+    try:
+        productos = db.query(Producto.id_producto, Producto.imagen).filter(Producto.imagen != None).all()
+        for id_producto, imagen in productos:
+            ruta = ruta_local(imagen)
+            if not ruta or ruta_variante(ruta, VARIANTE_PRINCIPAL) or not os.path.exists(ruta):
+                omitidas += 1
+                continue
+
+            base = uuid.uuid4().hex
+            try:
+                creadas = generar_variantes(ruta, DIRECTORIO_PRODUCTOS, base)
+            except HTTPException:
+                print(f"  Producto {id_producto}: {ruta} no es una imagen válida, se omite")
+                omitidas += 1
+                continue
+
+            db.query(Producto).filter(Producto.id_producto == id_producto).update(
+                {"imagen": f"{URL_PRODUCTOS}/{base}_{VARIANTE_PRINCIPAL}.jpg"}, synchronize_session=False
+            )
+            db.commit()
+
+            bytes_antes += os.path.getsize(ruta)
+            bytes_despues += os.path.getsize(os.path.join(DIRECTORIO_PRODUCTOS, f"{base}_{VARIANTE_PRINCIPAL}.jpg"))
+            os.remove(ruta)
+            convertidas += 1
+            print(f"  Producto {id_producto}: {len(creadas)} variantes generadas")
+
+        print(f"{convertidas} imágenes convertidas, {omitidas} omitidas")
+        if convertidas:
+            print(f"Bytes por imagen servida: {bytes_antes // convertidas} -> {bytes_despues // convertidas} (variante {VARIANTE_PRINCIPAL})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("Generando variantes de imágenes de productos...")
+    migrar_imagenes()
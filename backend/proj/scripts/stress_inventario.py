@@ -0,0 +1,165 @@
+"""
+Prueba de estrés de la reserva de stock
+Lanza cientos de pedidos concurrentes (un hilo y una sesión por pedido)
+sobre unos pocos productos "calientes" con stock limitado, de modo que la
+demanda supere al stock y haya rechazos por stock insuficiente. Después
+verifica que no se perdió ninguna actualización:
+- ningún stock quedó negativo
+- stock inicial - stock final = unidades de los pedidos aceptados
+- los movimientos de inventario de esos pedidos suman lo mismo
+Al final elimina los pedidos creados y comprueba que el stock vuelve al
+valor inicial.
+
+Uso: DATABASE_URL=sqlite:///bench.db python scripts/stress_inventario.py [pedidos] [hilos] [productos] [stock]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+SEMILLA = 45
+MAX_LINEAS = 4
+MAX_CANTIDAD = 10
+
+
+def preparar(productos: int, stock: int) -> tuple:
+    """Elige los productos calientes, fija su stock y devuelve (ids, cod_cliente)"""
+    from database import SessionLocal
+    from models.models import Cliente, Producto
+    from controllers.inventario_controller import registrar_ajuste
+
+    with SessionLocal() as db:
+        anteriores = dict(db.execute(
+            select(Producto.id_producto, Producto.stock).order_by(Producto.id_producto).limit(productos)
+        ).all())
+        ids = list(anteriores)
+        cod_cliente = db.execute(select(Cliente.cod_cliente).limit(1)).scalar()
+        if len(ids) < productos or cod_cliente is None:
+            raise SystemExit("Faltan productos o clientes: ¿se generaron los datos sintéticos?")
+        db.execute(update(Producto).where(Producto.id_producto.in_(ids)).values(stock=stock))
+        for id_producto, anterior in anteriores.items():
+            registrar_ajuste(db, id_producto, stock - anterior)
+        db.commit()
+    return ids, cod_cliente
+
+
+def stock_de(ids: list) -> dict:
+    from database import SessionLocal
+    from models.models import Producto
+
+    with SessionLocal() as db:
+        return dict(db.execute(select(Producto.id_producto, Producto.stock).where(Producto.id_producto.in_(ids))).all())
+
+
+def crear_uno(numero: int, lineas: list, cod_cliente: str) -> tuple:
+    """(estado, id_pedido, latencia_ms): 200, 409 u otro código de error"""
+    from database import SessionLocal
+    from controllers.pedido_controller import create_pedido
+
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        try:
+            pedido = create_pedido(db, {
+                "numero_pedido": f"STRESS-{numero}",
+                "fecha_pedido": date.today().isoformat(),
+                "cod_cliente": cod_cliente,
+                "detalle_pedido": [{"id_producto": p, "cantidad": c} for p, c in lineas],
+            })
+            return 200, pedido["id_pedido"], (time.perf_counter() - inicio) * 1000
+        except HTTPException as e:
+            if e.status_code != 409:
+                print(f"Pedido {numero}: {e.status_code} {e.detail}")
+            return e.status_code, None, (time.perf_counter() - inicio) * 1000
+
+
+def eliminar(ids_pedido: list):
+    from database import SessionLocal
+    from controllers.pedido_controller import delete_pedido
+
+    for id_pedido in ids_pedido:
+        with SessionLocal() as db:
+            delete_pedido(db, id_pedido)
+
+
+def verificar(ids: list, inicial: dict, aceptados: list) -> list:
+    from database import SessionLocal
+    from models.models import DetallePedido, MovimientoInventario
+
+    final = stock_de(ids)
+    errores = []
+    with SessionLocal() as db:
+        vendido = dict(db.execute(
+            select(DetallePedido.id_producto, func.sum(DetallePedido.cantidad))
+            .where(DetallePedido.id_pedido.in_(aceptados)).group_by(DetallePedido.id_producto)
+        ).all()) if aceptados else {}
+        movido = dict(db.execute(
+            select(MovimientoInventario.id_producto, func.sum(MovimientoInventario.cantidad))
+            .where(MovimientoInventario.id_pedido.in_(aceptados)).group_by(MovimientoInventario.id_producto)
+        ).all()) if aceptados else {}
+    for id_producto in ids:
+        descontado = inicial[id_producto] - final[id_producto]
+        if final[id_producto] < 0:
+            errores.append(f"producto {id_producto}: stock negativo ({final[id_producto]})")
+        if descontado != vendido.get(id_producto, 0):
+            errores.append(f"producto {id_producto}: se descontaron {descontado}, se vendieron {vendido.get(id_producto, 0)}")
+        if -movido.get(id_producto, 0) != vendido.get(id_producto, 0):
+            errores.append(f"producto {id_producto}: movimientos {movido.get(id_producto, 0)}, vendidos {vendido.get(id_producto, 0)}")
+    return errores
+
+
+if __name__ == "__main__":
+    pedidos = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    productos = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    stock = int(sys.argv[4]) if len(sys.argv) > 4 else 800
+
+    logging.disable(logging.INFO)
+    ids, cod_cliente = preparar(productos, stock)
+    inicial = stock_de(ids)
+
+    rnd = random.Random(SEMILLA)
+    solicitudes = [
+        [(p, rnd.randint(1, MAX_CANTIDAD)) for p in rnd.sample(ids, rnd.randint(1, min(MAX_LINEAS, len(ids))))]
+        for _ in range(pedidos)
+    ]
+    demanda = sum(c for lineas in solicitudes for _, c in lineas)
+    print(f"{pedidos} pedidos, {hilos} hilos, {productos} productos con stock {stock} "
+          f"(demanda {demanda} unidades, stock total {stock * productos})")
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        resultados = list(ejecutor.map(crear_uno, range(pedidos), solicitudes, [cod_cliente] * pedidos))
+    duracion = time.perf_counter() - inicio
+
+    estados = Counter(estado for estado, _, _ in resultados)
+    aceptados = [id_pedido for estado, id_pedido, _ in resultados if estado == 200]
+    p50, p95 = np.percentile([ms for _, _, ms in resultados], [50, 95])
+    print(f"aceptados {estados[200]}, sin stock {estados[409]}, otros errores "
+          f"{sum(n for e, n in estados.items() if e not in (200, 409))}")
+    print(f"{pedidos / duracion:.1f} pedidos/s, p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+
+    errores = verificar(ids, inicial, aceptados)
+    errores += [f"{n} pedidos con error {e}" for e, n in estados.items() if e not in (200, 409)]
+
+    eliminar(aceptados)
+    restaurado = stock_de(ids)
+    errores += [f"producto {p}: tras eliminar los pedidos quedó {restaurado[p]}, era {inicial[p]}"
+                for p in ids if restaurado[p] != inicial[p]]
+
+    if errores:
+        print("\nFALLÓ:")
+        for error in errores:
+            print(f"  {error}")
+        sys.exit(1)
+    print("OK: sin actualizaciones perdidas ni stock negativo; el stock se restauró al eliminar los pedidos")
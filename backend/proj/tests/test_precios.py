@@ -0,0 +1,151 @@
+"""
+Pruebas del motor de precios (utils/precios.py): redondeo, tipo de precio,
+límites de descuento e IVA por producto.
+
+Uso: python -m pytest tests
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from utils.precios import (
+    TablaPrecios, LineaInvalida, ProductosNoEncontrados, ProductosSinPrecio, cotizar, redondear
+)
+
+# (id, nombre, minorista, mayorista, iva)
+FILAS = [
+    (3, "Arroz", 1.25, 1.10, 0.0),
+    (1, "Aceite", 3.50, 3.00, 0.15),
+    (2, "Jabón", 0.99, None, 0.15),
+    (4, "Sin precio", None, None, 0.15),
+    (5, "Solo mayorista", None, 2.00, 0.0),
+    (6, "Sin IVA cargado", 2.00, 1.80, None),
+]
+
+
+@pytest.fixture
+def tabla():
+    return TablaPrecios(FILAS)
+
+
+def linea(id_producto, cantidad=1, descuento=0):
+    return {"id_producto": id_producto, "cantidad": cantidad, "descuento": descuento}
+
+
+class TestRedondear:
+    def test_mitad_hacia_arriba(self):
+        # np.round(0.125, 2) da 0.12 (al par); el redondeo monetario da 0.13
+        assert redondear(0.125) == 0.13
+        assert redondear(2.675) == 2.68
+        assert redondear(0.005) == 0.01
+
+    def test_arreglos(self):
+        np.testing.assert_array_equal(redondear([0.114, 0.115, 1.0]), [0.11, 0.12, 1.0])
+
+
+class TestTipoDePrecio:
+    def test_minorista(self, tabla):
+        resultado = cotizar(tabla, [linea(1, 2)], mayorista=False)
+        assert resultado["tipo_precio"] == "minorista"
+        assert resultado["detalle_pedido"][0]["precio_unitario"] == 3.50
+        assert resultado["subtotal"] == 7.00
+
+    def test_mayorista(self, tabla):
+        resultado = cotizar(tabla, [linea(1, 2)], mayorista=True)
+        assert resultado["tipo_precio"] == "mayorista"
+        assert resultado["detalle_pedido"][0]["precio_unitario"] == 3.00
+
+    def test_mayorista_sin_precio_mayorista_usa_minorista(self, tabla):
+        resultado = cotizar(tabla, [linea(2, 3)], mayorista=True)
+        assert resultado["detalle_pedido"][0]["precio_unitario"] == 0.99
+        assert resultado["subtotal"] == 2.97
+
+    def test_sin_precio_minorista_no_se_vende_a_cero(self, tabla):
+        with pytest.raises(ProductosSinPrecio) as error:
+            cotizar(tabla, [linea(1), linea(4)], mayorista=False)
+        assert error.value.ids == [4]
+
+    def test_sin_ningun_precio_falla_tambien_al_mayorista(self, tabla):
+        with pytest.raises(ProductosSinPrecio):
+            cotizar(tabla, [linea(4)], mayorista=True)
+
+    def test_solo_precio_mayorista(self, tabla):
+        assert cotizar(tabla, [linea(5)], mayorista=True)["total"] == 2.00
+        with pytest.raises(ProductosSinPrecio):
+            cotizar(tabla, [linea(5)], mayorista=False)
+
+
+class TestDescuentos:
+    def test_porcentaje_sobre_subtotal_de_linea(self, tabla):
+        detalle = cotizar(tabla, [linea(1, 3, 10)], mayorista=False)["detalle_pedido"][0]
+        assert detalle["subtotal_lineal"] == 10.50
+        assert detalle["subtotal"] == 9.45
+
+    @pytest.mark.parametrize("descuento,subtotal", [(0, 3.50), (100, 0.0)])
+    def test_limites_aceptados(self, tabla, descuento, subtotal):
+        assert cotizar(tabla, [linea(1, 1, descuento)], mayorista=False)["subtotal"] == subtotal
+
+    @pytest.mark.parametrize("descuento", [-0.01, 100.01, -5, 150])
+    def test_fuera_de_rango(self, tabla, descuento):
+        with pytest.raises(LineaInvalida):
+            cotizar(tabla, [linea(1, 1, descuento)], mayorista=False)
+
+    def test_descuento_vacio_es_cero(self, tabla):
+        resultado = cotizar(tabla, [{"id_producto": 1, "cantidad": 1, "descuento": None}], mayorista=False)
+        assert resultado["subtotal"] == 3.50
+
+
+class TestIVA:
+    def test_tarifa_por_producto(self, tabla):
+        resultado = cotizar(tabla, [linea(1, 2), linea(3, 4)], mayorista=False)
+        iva_aceite, iva_arroz = (detalle["iva"] for detalle in resultado["detalle_pedido"])
+        assert iva_aceite == 1.05
+        assert iva_arroz == 0.0
+        assert resultado["subtotal"] == 12.00
+        assert resultado["iva"] == 1.05
+        assert resultado["total"] == 13.05
+
+    def test_iva_sobre_subtotal_con_descuento(self, tabla):
+        detalle = cotizar(tabla, [linea(1, 1, 50)], mayorista=False)["detalle_pedido"][0]
+        assert detalle["subtotal"] == 1.75
+        # 1.75 * 0.15 = 0.2625 -> 0.26
+        assert detalle["iva"] == 0.26
+
+    def test_iva_faltante_es_cero(self, tabla):
+        detalle = cotizar(tabla, [linea(6)], mayorista=False)["detalle_pedido"][0]
+        assert detalle["tarifa_iva"] == 0.0
+        assert detalle["iva"] == 0.0
+
+    def test_totales_redondeados_por_linea(self, tabla):
+        # 0.99 * 0.15 = 0.1485 por línea -> 0.15; el total suma los IVA ya redondeados
+        resultado = cotizar(tabla, [linea(2), linea(2)], mayorista=False)
+        assert resultado["iva"] == 0.30
+        assert resultado["total"] == 2.28
+
+
+class TestLineasInvalidas:
+    def test_sin_lineas(self, tabla):
+        with pytest.raises(LineaInvalida):
+            cotizar(tabla, [], mayorista=False)
+
+    @pytest.mark.parametrize("cantidad", [0, -1])
+    def test_cantidad_no_positiva(self, tabla, cantidad):
+        with pytest.raises(LineaInvalida):
+            cotizar(tabla, [linea(1, cantidad)], mayorista=False)
+
+    @pytest.mark.parametrize("datos", [{"cantidad": 1}, {"id_producto": "x"}, {"id_producto": 1, "descuento": "diez"}])
+    def test_datos_mal_formados(self, tabla, datos):
+        with pytest.raises(LineaInvalida):
+            cotizar(tabla, [datos], mayorista=False)
+
+    def test_producto_inexistente(self, tabla):
+        with pytest.raises(ProductosNoEncontrados) as error:
+            cotizar(tabla, [linea(1), linea(99), linea(0)], mayorista=False)
+        assert error.value.ids == [0, 99]
+
+    def test_tabla_vacia(self):
+        with pytest.raises(ProductosNoEncontrados):
+            cotizar(TablaPrecios([]), [linea(1)], mayorista=False)
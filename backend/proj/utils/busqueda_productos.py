@@ -0,0 +1,236 @@
+import re
+import threading
+import unicodedata
+
+# Índice invertido de trigramas en memoria para la búsqueda de productos.
+# Cada documento es el nombre del producto más su marca; los trigramas se
+# calculan sobre el texto sin tildes y en minúsculas, con relleno al inicio
+# de cada palabra para que las consultas cortas funcionen como prefijos.
+
+# Fracción mínima de trigramas de la consulta que debe tener un resultado
+COBERTURA_MINIMA = 0.5
+
+# Componentes del puntaje
+_EXTRA_CONTIENE = 0.3
+_EXTRA_EMPIEZA = 0.2
+_PENALIZACION_LONGITUD = 0.0005
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+# Cada edición o baja deja una posición vacía: pasado este umbral (fracción
+# del total, con un mínimo) se compactan las posiciones para que un worker de
+# larga vida no acumule memoria con cada cambio de producto
+FRACCION_HUECOS_MAXIMA = 0.25
+_HUECOS_MINIMOS = 64
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes ni signos: 'Café  Ñandú-1L' -> 'cafe nandu 1l'"""
+    if not texto:
+        return ""
+    sin_tildes = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(c for c in sin_tildes if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_tildes.lower()).strip()
+
+
+def trigramas(texto_normalizado: str, prefijo: bool = False) -> set:
+    """
+    Trigramas de cada palabra con relleno ('  ca', ' caf', 'caf', ..., 'fe ').
+    Con prefijo=True la última palabra no lleva relleno final, para que una
+    consulta a medio escribir ('lech') coincida con 'leche'.
+    """
+    resultado = set()
+    palabras = texto_normalizado.split()
+    for n, palabra in enumerate(palabras):
+        relleno = f"  {palabra}" if prefijo and n == len(palabras) - 1 else f"  {palabra} "
+        for i in range(len(relleno) - 2):
+            resultado.add(relleno[i:i + 3])
+    return resultado
+
+
+class IndiceProductos:
+    """
+    Índice de búsqueda difusa de productos.
+    Guarda por producto los datos que devuelve la búsqueda, de modo que una
+    consulta se resuelve sin ir a la base de datos.
+
+    Cada producto ocupa una posición interna; las listas de posiciones por
+    trigrama se mantienen como sets (actualización incremental barata) y se
+    convierten a arreglos NumPy bajo demanda para contar coincidencias con
+    np.bincount.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limpiar()
+        self._construido = False
+
+    def _limpiar(self):
+        self._posicion = {}        # id_producto -> posición
+        self._documentos = []      # posición -> documento (None si se eliminó)
+        self._postings = {}        # trigrama -> set de posiciones
+        self._arreglos = {}        # trigrama -> np.ndarray (caché de _postings)
+        self._nombres = None       # np.ndarray con los nombres normalizados (caché)
+        self._activos = None       # np.ndarray bool: producto vigente y activo (caché)
+        self._huecos = 0           # posiciones en None
+
+    def _quitar(self, id_producto):
+        posicion = self._posicion.pop(id_producto, None)
+        if posicion is None:
+            return
+        documento = self._documentos[posicion]
+        self._documentos[posicion] = None
+        self._huecos += 1
+        for trigrama in documento["trigramas"]:
+            posiciones = self._postings.get(trigrama)
+            if posiciones is not None:
+                posiciones.discard(posicion)
+                self._arreglos.pop(trigrama, None)
+                if not posiciones:
+                    del self._postings[trigrama]
+        self._nombres = None
+        self._activos = None
+
+    def _poner(self, datos: dict):
+        nombre = normalizar(datos.get("nombre"))
+        texto = f"{nombre} {normalizar(datos.get('marca'))}".strip()
+        self._agregar({
+            "datos": datos,
+            "nombre": nombre,
+            "trigramas": trigramas(texto),
+        })
+
+    def _agregar(self, documento: dict):
+        posicion = len(self._documentos)
+        self._posicion[documento["datos"]["id_producto"]] = posicion
+        self._documentos.append(documento)
+        for trigrama in documento["trigramas"]:
+            self._postings.setdefault(trigrama, set()).add(posicion)
+            self._arreglos.pop(trigrama, None)
+        self._nombres = None
+        self._activos = None
+
+    def _compactar_si_hace_falta(self):
+        if self._huecos <= max(_HUECOS_MINIMOS, FRACCION_HUECOS_MAXIMA * len(self._documentos)):
+            return
+        # Mismo orden relativo: se conserva el desempate por posición de inserción
+        vigentes = [documento for documento in self._documentos if documento is not None]
+        self._limpiar()
+        for documento in vigentes:
+            self._agregar(documento)
+
+    def _arreglo(self, trigrama):
+        arreglo = self._arreglos.get(trigrama)
+        if arreglo is None:
+            import numpy as np
+
+            arreglo = np.fromiter(self._postings[trigrama], dtype=np.int64)
+            self._arreglos[trigrama] = arreglo
+        return arreglo
+
+    def _vectores(self):
+        if self._nombres is None:
+            import numpy as np
+
+            self._nombres = np.array([d["nombre"] if d else "" for d in self._documentos], dtype=str)
+            self._activos = np.array(
+                [bool(d) and d["datos"].get("estado") == "activo" for d in self._documentos], dtype=bool
+            )
+        return self._nombres, self._activos
+
+    def _reconstruir(self, filas):
+        self._limpiar()
+        for datos in filas:
+            self._poner(datos)
+        self._construido = True
+
+    def reconstruir(self, filas):
+        """Reemplaza todo el índice con las filas dadas (dicts de producto)"""
+        with self._lock:
+            self._reconstruir(filas)
+
+    @property
+    def construido(self) -> bool:
+        with self._lock:
+            return self._construido
+
+    def actualizar(self, datos: dict):
+        """Agrega o reemplaza un producto"""
+        with self._lock:
+            if not self._construido:
+                return
+            self._quitar(datos["id_producto"])
+            self._poner(datos)
+            self._compactar_si_hace_falta()
+
+    def eliminar(self, id_producto):
+        with self._lock:
+            self._quitar(id_producto)
+            self._compactar_si_hace_falta()
+
+    def invalidar(self):
+        """Marca el índice para reconstruirlo en la próxima búsqueda"""
+        with self._lock:
+            self._limpiar()
+            self._construido = False
+
+    def __len__(self):
+        return len(self._posicion)
+
+    def buscar(self, consulta: str, limite: int = 10, solo_activos: bool = True, cargar_filas=None):
+        """
+        Devuelve hasta `limite` productos ordenados por relevancia:
+        proporción de trigramas de la consulta presentes (tolera errores de
+        tipeo), más un extra si el nombre contiene o empieza con la consulta,
+        y a igualdad primero los nombres más cortos.
+        Si el índice no está construido y se pasa cargar_filas(), se
+        construye con el lock tomado: una sola búsqueda lo reconstruye y
+        las demás esperan en lugar de repetir la consulta.
+        """
+        # NumPy se importa al primer uso (ver utils/precios.py)
+        import numpy as np
+
+        texto = normalizar(consulta)
+        grams_consulta = trigramas(texto, prefijo=True)
+        if not grams_consulta:
+            return []
+
+        with self._lock:
+            if not self._construido and cargar_filas is not None:
+                self._reconstruir(cargar_filas())
+            arreglos = [self._arreglo(g) for g in grams_consulta if g in self._postings]
+            if not arreglos:
+                return []
+            nombres, activos = self._vectores()
+
+            conteos = np.bincount(np.concatenate(arreglos), minlength=len(self._documentos))
+            candidatos = np.flatnonzero(conteos >= COBERTURA_MINIMA * len(grams_consulta))
+            if solo_activos:
+                candidatos = candidatos[activos[candidatos]]
+            if not len(candidatos):
+                return []
+
+            nombres_candidatos = nombres[candidatos]
+            contiene = np.char.find(nombres_candidatos, texto) >= 0
+            empieza = np.char.startswith(nombres_candidatos, texto)
+            puntajes = (
+                conteos[candidatos] / len(grams_consulta)
+                + contiene * _EXTRA_CONTIENE
+                + empieza * _EXTRA_EMPIEZA
+                - np.char.str_len(nombres_candidatos) * _PENALIZACION_LONGITUD
+            )
+
+            if len(candidatos) > limite:
+                seleccion = np.argpartition(-puntajes, limite - 1)[:limite]
+            else:
+                seleccion = np.arange(len(candidatos))
+            # Orden final: puntaje descendente y, a igualdad, posición de inserción
+            seleccion = seleccion[np.lexsort((candidatos[seleccion], -puntajes[seleccion]))]
+            return [
+                {**self._documentos[candidatos[i]]["datos"], "puntaje": round(float(puntajes[i]), 4)}
+                for i in seleccion
+            ]
+
+
+# Instancia global (una por proceso)
+indice_productos = IndiceProductos()
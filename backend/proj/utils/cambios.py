@@ -0,0 +1,316 @@
+import os
+import threading
+import logging
+from sqlalchemy import BigInteger, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+from models.models import RegistroCambio
+
+logger = logging.getLogger(__name__)
+
+# Registro de cambios y versiones por tabla. Todo se escribe desde los eventos
+# de sesión de este módulo, no desde los controladores:
+#
+# - after_flush anota las filas que la sesión insertó, modificó o eliminó
+# - do_orm_execute anota los INSERT/UPDATE/DELETE masivos (session.execute
+#   con insert()/update()/delete(), query.delete()); de esos no se conocen
+#   las filas, se registran con clave NULL
+# - before_commit agrega las filas a registro_cambio, todas con la versión
+#   de la transacción, en la misma transacción
+# - after_commit avisa a las cachés de este worker; los demás workers se
+#   enteran leyendo registro_cambio cada CAMBIOS_INTERVALO_S (MonitorVersiones)
+#
+# La versión no sale de un contador con bloqueo de fila (serializaría todos
+# los commits que tocan la misma tabla): en PostgreSQL es el id de la
+# transacción, en SQLite el máximo registrado + 1 (hay un solo escritor a la
+# vez). Dos transacciones pueden confirmar en otro orden que sus ids, así que
+# los lectores solo confían en las versiones menores que la transacción en
+# curso más antigua (el xmin de su snapshot): esas ya terminaron y ninguna
+# versión menor puede aparecer después. La versión de un contador es la
+# mayor versión confiable registrada para él.
+#
+# Los cambios hechos fuera de una Session (engine.begin() en migraciones y
+# scripts) no se registran solos: ver registrar_cambios_masivos.
+
+# Segundos entre lecturas de registro_cambio en cada worker: lo que tarda en
+# verse en este worker un cambio confirmado en otro
+INTERVALO_S = float(os.getenv("CAMBIOS_INTERVALO_S", "2"))
+
+# Tablas que no se registran: el propio registro y otros historiales de solo inserción
+TABLAS_SIN_REGISTRO = {"registro_cambio", "movimiento_inventario",
+                       "registro_eliminado", "schema_version"}
+
+# Un UPDATE que solo toca estas columnas se registra en un contador aparte: cada pedido
+# mueve el stock y no debe invalidar la tabla de precios ni el índice de búsqueda
+CONTADORES_PARCIALES = {
+    "productos": ("productos.stock", {"stock", "updated_at"}),
+}
+
+
+def contadores(nombres_tablas) -> list:
+    """Nombres de los contadores (columna registro_cambio.contador) de estas tablas"""
+    resultado = []
+    for tabla in nombres_tablas:
+        if tabla in TABLAS_SIN_REGISTRO:
+            continue
+        resultado.append(tabla)
+        if tabla in CONTADORES_PARCIALES:
+            resultado.append(CONTADORES_PARCIALES[tabla][0])
+    return resultado
+
+
+def _contador(tabla: str, operacion: str, columnas) -> str:
+    parcial = CONTADORES_PARCIALES.get(tabla)
+    if parcial and operacion == "update" and columnas and set(columnas) <= parcial[1]:
+        return parcial[0]
+    return tabla
+
+
+def _anotar(session, tabla, clave, operacion, columnas=None):
+    if tabla in TABLAS_SIN_REGISTRO:
+        return
+    # dict como conjunto ordenado: la misma fila tocada dos veces se registra una vez
+    session.info.setdefault("cambios", {})[(tabla, clave, operacion, _contador(tabla, operacion, columnas))] = None
+
+
+def _clave(estado) -> str:
+    # En after_flush las filas nuevas ya tienen clave pero todavía no identity
+    return ",".join(str(valor) for valor in estado.mapper.primary_key_from_instance(estado.obj()))
+
+
+def _dialecto(conexion) -> str:
+    # Connection o Session
+    return (getattr(conexion, "dialect", None) or conexion.get_bind().dialect).name
+
+
+def _horizonte(dialecto: str):
+    """
+    Expresión SQL de la primera versión en la que todavía no se puede
+    confiar: el xmin del snapshot en PostgreSQL (pg_snapshot_xmin; se usa la
+    variante txid_ que devuelve bigint, como txid_current) y, en SQLite, el
+    máximo registrado + 1.
+    """
+    if dialecto == "postgresql":
+        return func.txid_snapshot_xmin(func.txid_current_snapshot(), type_=BigInteger)
+    return select(func.coalesce(func.max(RegistroCambio.version), 0) + 1).scalar_subquery()
+
+
+def _version_transaccion(conexion) -> int:
+    dialecto = _dialecto(conexion)
+    if dialecto == "postgresql":
+        # La transacción ya escribió: tiene id y esto no toma ningún bloqueo
+        return conexion.execute(select(func.txid_current())).scalar()
+    # SQLite: la transacción ya escribió y tiene el único lock de escritura
+    # hasta el commit, así que nadie más toma esta versión
+    return conexion.execute(select(_horizonte(dialecto))).scalar()
+
+
+def registrar_cambios(conexion, cambios) -> int:
+    """
+    Agrega a registro_cambio las filas (tabla, clave, operacion, contador)
+    con la versión de la transacción en curso y la devuelve.
+    """
+    version = _version_transaccion(conexion)
+    conexion.execute(insert(RegistroCambio.__table__), [
+        {"tabla": tabla, "clave": clave, "operacion": operacion, "contador": contador, "version": version}
+        for tabla, clave, operacion, contador in cambios
+    ])
+    return version
+
+
+def registrar_cambios_masivos(conexion, nombres_tablas, operacion: str = "insert") -> int:
+    """
+    Un cambio masivo (clave NULL) por contador de estas tablas. Lo llaman
+    los scripts que escriben sin Session (engine.begin()) al final de su
+    transacción, para que las cachés y los ETag vean sus cambios.
+    """
+    return registrar_cambios(conexion, [
+        (tabla, None, operacion, contador)
+        for tabla in nombres_tablas
+        for contador in contadores([tabla])
+    ])
+
+
+def leer_versiones(conexion, contadores_buscados) -> dict:
+    """
+    Versión confiable de cada contador (0 si no tiene cambios), en una
+    consulta: por contador, la mayor versión por debajo del horizonte.
+    """
+    contadores_buscados = list(contadores_buscados)
+    condiciones = []
+    if _dialecto(conexion) == "postgresql":
+        # En SQLite todo lo visible ya es confiable
+        condiciones.append(RegistroCambio.version < _horizonte("postgresql"))
+    fila = conexion.execute(select(*(
+        select(func.max(RegistroCambio.version))
+        .where(RegistroCambio.contador == contador, *condiciones)
+        .scalar_subquery()
+        for contador in contadores_buscados
+    ))).one()
+    return {contador: version or 0 for contador, version in zip(contadores_buscados, fila)}
+
+
+@event.listens_for(Session, "after_flush")
+def _anotar_flush(session, flush_context):
+    for objeto in session.new:
+        estado = inspect(objeto)
+        _anotar(session, estado.mapper.local_table.name, _clave(estado), "insert")
+    for objeto in session.dirty:
+        estado = inspect(objeto)
+        columnas = [atributo.key for atributo in estado.mapper.column_attrs
+                    if estado.attrs[atributo.key].history.has_changes()]
+        if columnas:
+            _anotar(session, estado.mapper.local_table.name, _clave(estado), "update", columnas)
+    for objeto in session.deleted:
+        estado = inspect(objeto)
+        _anotar(session, estado.mapper.local_table.name, _clave(estado), "delete")
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _anotar_masivo(estado_ejecucion):
+    if estado_ejecucion.is_insert:
+        operacion = "insert"
+    elif estado_ejecucion.is_update:
+        operacion = "update"
+    elif estado_ejecucion.is_delete:
+        operacion = "delete"
+    else:
+        return
+    sentencia = estado_ejecucion.statement
+    columnas = None
+    if operacion == "update":
+        # Columnas del SET: .values(...) o parámetros de un executemany
+        columnas = {getattr(columna, "key", columna) for columna in (sentencia._values or {})}
+        parametros = estado_ejecucion.parameters
+        for fila in (parametros if isinstance(parametros, list) else [parametros] if parametros else []):
+            columnas.update(fila)
+    _anotar(estado_ejecucion.session, sentencia.table.name, None, operacion, columnas)
+
+
+@event.listens_for(Session, "before_commit")
+def _escribir_cambios(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    cambios = session.info.pop("cambios", None)
+    if not cambios:
+        return
+    version = registrar_cambios(session.connection(), cambios)
+    session.info["version_confirmada"] = (version, {cambio[3] for cambio in cambios})
+
+
+@event.listens_for(Session, "after_commit")
+def _avisar_cambios(session):
+    confirmada = session.info.pop("version_confirmada", None)
+    if confirmada:
+        monitor_versiones.registrar_locales(*confirmada)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _descartar_cambios(session, transaccion):
+    # Rollback o close() sin commit: lo anotado no llegó a la base
+    if transaccion.parent is not None:
+        return
+    session.info.pop("cambios", None)
+    session.info.pop("version_confirmada", None)
+
+
+class MonitorVersiones:
+    """
+    Cambios de registro_cambio vistos por este worker. Las cachés se
+    suscriben a los contadores de las tablas de las que dependen y se
+    invalidan cuando cambian: al instante si el cambio lo confirmó este
+    worker, y en la siguiente lectura periódica si lo confirmó otro.
+    """
+
+    def __init__(self, intervalo: float = INTERVALO_S):
+        self._lock = threading.Lock()
+        self._intervalo = intervalo
+        # Horizonte de la última lectura: lo de versiones menores ya se vio
+        self._desde = None
+        # versión -> contadores confirmados por este worker que la lectura
+        # periódica todavía no alcanzó (no se avisan dos veces)
+        self._locales = {}
+        self._suscriptores = []
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def suscribir(self, contadores_cache, callback, locales: bool = True):
+        """
+        callback(contadores_cambiados) cuando cambia alguno de los contadores.
+        locales=False: la caché ya se actualiza sola con los cambios de este
+        worker y solo necesita enterarse de los que confirman los demás.
+        """
+        self._suscriptores.append((frozenset(contadores_cache), callback, locales))
+
+    def _avisar(self, locales: set, remotos: set):
+        for contadores_cache, callback, acepta_locales in self._suscriptores:
+            cambiados = (contadores_cache & remotos) | (contadores_cache & locales if acepta_locales else set())
+            if not cambiados:
+                continue
+            try:
+                callback(cambiados)
+            except Exception:
+                logger.exception(f"Error al invalidar caché por cambios en {sorted(cambiados)}")
+
+    def registrar_locales(self, version: int, contadores_confirmados):
+        """Versión y contadores de una transacción confirmada por este worker"""
+        with self._lock:
+            if self._desde is not None and version >= self._desde:
+                self._locales.setdefault(version, set()).update(contadores_confirmados)
+        self._avisar(set(contadores_confirmados), set())
+
+    def revisar(self, engine):
+        """
+        Lee el horizonte y las filas de registro_cambio que pasaron a ser
+        confiables desde la lectura anterior, y avisa de sus contadores
+        salvo los que confirmó este worker. La primera lectura solo fija la
+        base: las cachés que se construyan después ya ven esos datos.
+        """
+        with engine.connect() as conn:
+            horizonte = conn.execute(select(_horizonte(engine.dialect.name))).scalar()
+            desde = self._desde
+            filas = []
+            if desde is not None and horizonte > desde:
+                filas = conn.execute(
+                    select(RegistroCambio.contador, RegistroCambio.version).distinct()
+                    .where(RegistroCambio.version >= desde, RegistroCambio.version < horizonte)
+                ).all()
+        remotos = set()
+        with self._lock:
+            if self._desde is not None and horizonte <= self._desde:
+                return
+            for contador, version in filas:
+                # Un commit local que esta lectura ve antes de que corra
+                # after_commit cuenta como remoto: solo invalida de más
+                if contador not in self._locales.get(version, ()):
+                    remotos.add(contador)
+            self._locales = {version: locales for version, locales in self._locales.items() if version >= horizonte}
+            self._desde = horizonte
+        self._avisar(set(), remotos)
+
+    def _bucle(self, engine):
+        while not self._detener.wait(self._intervalo):
+            try:
+                self.revisar(engine)
+            except Exception as e:
+                logger.warning(f"No se pudo leer registro_cambio: {e}")
+
+    def iniciar(self, engine):
+        """Primera lectura y luego un hilo por worker que relee cada intervalo"""
+        try:
+            self.revisar(engine)
+        except Exception as e:
+            logger.warning(f"No se pudo leer registro_cambio: {e}")
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(engine,), name="monitor-versiones", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self._intervalo + 1)
+            self._hilo = None
+
+
+monitor_versiones = MonitorVersiones()
@@ -0,0 +1,147 @@
+from starlette.datastructures import Headers, MutableHeaders
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+# Solo se comprimen tipos de texto; imágenes, PDF y Excel ya vienen comprimidos
+TIPOS_COMPRIMIBLES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def elegir_codificacion(accept_encoding: str):
+    """Elige 'br' o 'gzip' según el header Accept-Encoding del cliente"""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        partes = parte.strip().split(";")
+        nombre = partes[0].strip()
+        calidad = 1.0
+        for param in partes[1:]:
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    calidad = float(param[2:])
+                except ValueError:
+                    calidad = 0.0
+        if nombre:
+            aceptadas[nombre] = calidad
+
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compresor:
+    """Compresor incremental con la misma interfaz para gzip y brotli"""
+
+    def __init__(self, codificacion: str, nivel_gzip: int, calidad_brotli: int):
+        if codificacion == "br":
+            self._obj = brotli.Compressor(quality=calidad_brotli)
+            self._procesar = self._obj.process
+            self._terminar = self._obj.finish
+        else:
+            self._obj = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)
+            self._procesar = self._obj.compress
+            self._terminar = self._obj.flush
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._procesar(datos)
+
+    def terminar(self) -> bytes:
+        return self._terminar()
+
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI que comprime con Brotli (si está instalado) o GZip las
+    respuestas de texto/JSON que superan `minimum_size` bytes.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, nivel_gzip: int = 6, calidad_brotli: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compresor = None
+        pasar_directo = False
+
+        async def send_wrapper(message):
+            nonlocal inicio, compresor, pasar_directo
+
+            if message["type"] == "http.response.start":
+                inicio = message
+                headers = Headers(raw=message["headers"])
+                tipo = headers.get("content-type", "")
+                pasar_directo = (
+                    "content-encoding" in headers
+                    or not tipo.startswith(TIPOS_COMPRIMIBLES)
+                    # Un rango parcial comprimido ya no corresponde a Content-Range
+                    or message["status"] == 206
+                )
+                if pasar_directo:
+                    await send(inicio)
+                return
+
+            if pasar_directo:
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                # Extensiones como pathsend: no se comprimen
+                pasar_directo = True
+                await send(inicio)
+                await send(message)
+                return
+
+            cuerpo = message.get("body", b"")
+            mas_cuerpo = message.get("more_body", False)
+
+            if compresor is None:
+                if not mas_cuerpo and len(cuerpo) < self.minimum_size:
+                    pasar_directo = True
+                    await send(inicio)
+                    await send(message)
+                    return
+
+                compresor = _Compresor(codificacion, self.nivel_gzip, self.calidad_brotli)
+                headers = MutableHeaders(raw=inicio["headers"])
+                headers["Content-Encoding"] = codificacion
+                headers.add_vary_header("Accept-Encoding")
+
+                if not mas_cuerpo:
+                    comprimido = compresor.comprimir(cuerpo) + compresor.terminar()
+                    headers["Content-Length"] = str(len(comprimido))
+                    await send(inicio)
+                    await send({"type": "http.response.body", "body": comprimido})
+                    return
+
+                del headers["Content-Length"]
+                await send(inicio)
+
+            datos = compresor.comprimir(cuerpo)
+            if not mas_cuerpo:
+                datos += compresor.terminar()
+            await send({"type": "http.response.body", "body": datos, "more_body": mas_cuerpo})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,127 @@
+import os
+import re
+import hashlib
+import logging
+from functools import lru_cache
+from mimetypes import guess_type
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from utils.compresion import TIPOS_COMPRIMIBLES, elegir_codificacion
+
+logger = logging.getLogger(__name__)
+
+# Archivos con un UUID en el nombre no cambian nunca: una imagen nueva
+# siempre se guarda con otro nombre, así que se pueden cachear un año.
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+_PATRON_UUID = re.compile(r"[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}", re.IGNORECASE)
+
+# Imágenes que se pueden reemplazar por su hermana .webp si el cliente la acepta
+_EXTENSIONES_CON_WEBP = (".jpg", ".jpeg", ".png")
+# Extensión de los archivos precomprimidos junto al original
+_PRECOMPRIMIDOS = {"br": ".br", "gzip": ".gz"}
+
+_TAMANO_BLOQUE_HASH = 1024 * 1024
+
+
+@lru_cache(maxsize=8192)
+def _etag_contenido(ruta: str, mtime_ns: int, tamano: int) -> str:
+    """ETag fuerte: hash del contenido, cacheado mientras no cambien mtime ni tamaño"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as archivo:
+        while bloque := archivo.read(_TAMANO_BLOQUE_HASH):
+            digest.update(bloque)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_fuerte(ruta: str, stat_result: os.stat_result) -> str:
+    return _etag_contenido(ruta, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def _stat_archivo(ruta: str):
+    try:
+        resultado = os.stat(ruta)
+    except OSError:
+        return None
+    return resultado if os.path.isfile(ruta) else None
+
+
+class ArchivosEstaticos(StaticFiles):
+    """
+    StaticFiles para /uploads con:
+    - Cache-Control inmutable de un año para nombres con UUID (el resto se revalida)
+    - ETag fuerte por hash de contenido, y 304 con If-None-Match
+    - la hermana .webp de una imagen JPEG/PNG si el header Accept incluye image/webp
+    - la versión precomprimida .br/.gz de archivos de texto si existe
+    Los rangos (Range/If-Range) y el envío sin copia (extensión ASGI pathsend,
+    si el servidor la ofrece) los resuelve FileResponse.
+    """
+
+    def lookup_path(self, path: str):
+        # Corre en un hilo aparte: se aprovecha para calcular el ETag del
+        # original y de sus variantes sin bloquear el event loop
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None and os.path.isfile(full_path):
+            etag_fuerte(full_path, stat_result)
+            for alternativa in self._alternativas(full_path):
+                stat_alternativa = _stat_archivo(alternativa)
+                if stat_alternativa is not None:
+                    etag_fuerte(alternativa, stat_alternativa)
+        return full_path, stat_result
+
+    @staticmethod
+    def _alternativas(full_path: str) -> list:
+        base, extension = os.path.splitext(full_path)
+        alternativas = [full_path + sufijo for sufijo in _PRECOMPRIMIDOS.values()]
+        if extension.lower() in _EXTENSIONES_CON_WEBP:
+            alternativas.append(base + ".webp")
+        return alternativas
+
+    def _elegir_variante(self, full_path: str, stat_result, request_headers: Headers):
+        """Devuelve (ruta, stat, content-type, content-encoding, vary) a servir"""
+        tipo = guess_type(full_path)[0] or "application/octet-stream"
+        base, extension = os.path.splitext(full_path)
+
+        if extension.lower() in _EXTENSIONES_CON_WEBP:
+            if "image/webp" in request_headers.get("accept", ""):
+                ruta_webp = base + ".webp"
+                stat_webp = _stat_archivo(ruta_webp)
+                if stat_webp is not None:
+                    return ruta_webp, stat_webp, "image/webp", None, "Accept"
+            return full_path, stat_result, tipo, None, "Accept"
+
+        if tipo.startswith(TIPOS_COMPRIMIBLES):
+            codificacion = elegir_codificacion(request_headers.get("accept-encoding", ""))
+            if codificacion is not None:
+                ruta_comprimida = full_path + _PRECOMPRIMIDOS[codificacion]
+                stat_comprimido = _stat_archivo(ruta_comprimida)
+                if stat_comprimido is not None:
+                    return ruta_comprimida, stat_comprimido, tipo, codificacion, "Accept-Encoding"
+            return full_path, stat_result, tipo, None, "Accept-Encoding"
+
+        return full_path, stat_result, tipo, None, None
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        ruta, stat_variante, tipo, codificacion, vary = self._elegir_variante(
+            str(full_path), stat_result, request_headers
+        )
+
+        nombre = os.path.basename(str(full_path))
+        headers = {
+            "cache-control": CACHE_INMUTABLE if _PATRON_UUID.search(nombre) else CACHE_REVALIDAR,
+            "etag": etag_fuerte(ruta, stat_variante),
+        }
+        if vary:
+            headers["vary"] = vary
+        if codificacion:
+            headers["content-encoding"] = codificacion
+
+        response = FileResponse(
+            ruta, status_code=status_code, headers=headers, media_type=tipo, stat_result=stat_variante
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,66 @@
+import os
+import hashlib
+from starlette.datastructures import MutableHeaders
+
+# GET condicional de los listados: el ETag sale de las versiones de las
+# tablas de las que depende la respuesta (registro_cambio, ver utils/cambios.py),
+# así que se calcula con una consulta indexada antes de leer los datos.
+# Es débil (W/): la misma lista puede viajar comprimida o no.
+
+# Cambia el ETag de todas las listas al desplegar otra versión de la API
+# aunque los datos sean los mismos (el formato de la respuesta pudo cambiar)
+VERSION_APP = os.getenv("VENDLY_VERSION", "")
+
+# El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def calcular_etag(*partes) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    for parte in (VERSION_APP,) + partes:
+        digest.update(str(parte).encode())
+        digest.update(b"|")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def coincide_etag(if_none_match: str, etag: str) -> bool:
+    """
+    Comparación débil de If-None-Match (lista separada por comas). "*" no
+    coincide: solo revalida quien ya tiene una copia con ese ETag
+    """
+    if not if_none_match:
+        return False
+    buscado = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == buscado for candidato in if_none_match.split(","))
+
+
+class ETagMiddleware:
+    """
+    Agrega ETag y Cache-Control a las respuestas 200 de GET/HEAD cuyo
+    endpoint dejó un ETag en request.state.etag (dependencias/etag.py).
+    Se hace aquí y no en la dependencia porque los endpoints que devuelven
+    una Response directamente (RespuestaJSONRapida) no reciben los headers
+    de la Response inyectada. Los 304 los responde la propia dependencia.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        # request.state usa este mismo diccionario
+        estado = scope.setdefault("state", {})
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                etag = estado.get("etag")
+                if etag:
+                    headers = MutableHeaders(scope=message)
+                    headers["ETag"] = etag
+                    headers["Cache-Control"] = CACHE_CONTROL
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,217 @@
+import json
+import math
+
+# Índice espacial basado en geohash: cada ubicación guarda su geohash y las
+# búsquedas se traducen a rangos de prefijos sobre un índice B-tree normal,
+# lo que funciona igual en PostgreSQL y en SQLite.
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precisión almacenada: 9 caracteres ~ celdas de 4.8 m x 4.8 m
+PRECISION_GEOHASH = 9
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+# Máximo de celdas que se consultan para cubrir un rectángulo (radio o polígono)
+MAX_CELDAS = 64
+
+
+def encode_geohash(lat: float, lng: float, precision: int = PRECISION_GEOHASH) -> str:
+    """Codifica una coordenada como geohash de `precision` caracteres"""
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    resultado = []
+    valor = 0
+    bits = 0
+    par = True
+
+    while len(resultado) < precision:
+        if par:
+            medio = (lng_min + lng_max) / 2
+            if lng >= medio:
+                valor = (valor << 1) | 1
+                lng_min = medio
+            else:
+                valor <<= 1
+                lng_max = medio
+        else:
+            medio = (lat_min + lat_max) / 2
+            if lat >= medio:
+                valor = (valor << 1) | 1
+                lat_min = medio
+            else:
+                valor <<= 1
+                lat_max = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            resultado.append(_BASE32[valor])
+            valor = 0
+            bits = 0
+
+    return "".join(resultado)
+
+
+def tamano_celda(precision: int):
+    """Alto y ancho (en grados) de una celda geohash de la precisión dada"""
+    bits_lat = (5 * precision) // 2
+    bits_lng = 5 * precision - bits_lat
+    return 180.0 / (2 ** bits_lat), 360.0 / (2 ** bits_lng)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia en kilómetros sobre la esfera terrestre"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _normalizar_lng(lng: float) -> float:
+    return ((lng + 180.0) % 360.0) - 180.0
+
+
+def _limitar_lat(lat: float) -> float:
+    return max(-90.0, min(89.999999, lat))
+
+
+def celdas_para_radio(lat: float, lng: float, radio_km: float):
+    """
+    Celdas geohash que cubren el círculo (lat, lng, radio_km), a partir de su
+    rectángulo envolvente. Devuelve None si el radio es tan grande que
+    conviene recorrer toda la tabla.
+    """
+    delta_lat = radio_km / KM_POR_GRADO
+    cos_lat = math.cos(math.radians(min(abs(lat) + delta_lat, 90.0)))
+    if cos_lat <= 0 or radio_km / (KM_POR_GRADO * cos_lat) >= 180.0:
+        return None
+    delta_lng = radio_km / (KM_POR_GRADO * cos_lat)
+    return celdas_para_bbox(lat - delta_lat, lng - delta_lng, lat + delta_lat, lng + delta_lng)
+
+
+def celdas_para_bbox(lat_min: float, lng_min: float, lat_max: float, lng_max: float):
+    """
+    Celdas geohash que cubren un rectángulo, con la mayor precisión que no
+    supere MAX_CELDAS celdas. None si ni la precisión 1 alcanza.
+    """
+    for precision in range(PRECISION_GEOHASH, 0, -1):
+        alto, ancho = tamano_celda(precision)
+        filas = math.ceil((lat_max - lat_min) / alto) + 1
+        columnas = math.ceil((lng_max - lng_min) / ancho) + 1
+        if filas * columnas > MAX_CELDAS:
+            continue
+        lats = [min(lat_min + i * alto, lat_max) for i in range(filas)]
+        lngs = [min(lng_min + j * ancho, lng_max) for j in range(columnas)]
+        return {
+            encode_geohash(_limitar_lat(la), _normalizar_lng(ln), precision)
+            for la in lats
+            for ln in lngs
+        }
+    return None
+
+
+def _siguiente_prefijo(prefijo: str):
+    """Menor cadena mayor que todos los geohash que empiezan con `prefijo`"""
+    recortado = prefijo.rstrip(_BASE32[-1])
+    if not recortado:
+        return None
+    return recortado[:-1] + _BASE32[_BASE32.index(recortado[-1]) + 1]
+
+
+def rangos_geohash(celdas):
+    """
+    Convierte un conjunto de celdas en rangos [inicio, fin) ordenados,
+    fusionando celdas contiguas. `fin` es None cuando no hay cota superior.
+    """
+    rangos = []
+    for celda in sorted(celdas):
+        fin = _siguiente_prefijo(celda)
+        if rangos and rangos[-1][1] is not None and rangos[-1][1] >= celda:
+            if fin is None or fin > rangos[-1][1]:
+                rangos[-1] = (rangos[-1][0], fin)
+            continue
+        rangos.append((celda, fin))
+    return rangos
+
+
+def parse_poligono_geojson(texto: str):
+    """
+    Interpreta un GeoJSON (Polygon, MultiPolygon, Feature o FeatureCollection)
+    y devuelve una lista de polígonos; cada polígono es una lista de anillos
+    (el primero exterior, el resto huecos) con puntos (lng, lat).
+    Lanza ValueError si el texto no contiene polígonos válidos.
+    """
+    try:
+        datos = json.loads(texto) if isinstance(texto, str) else texto
+    except (TypeError, ValueError):
+        raise ValueError("El polígono no es un JSON válido")
+
+    poligonos = []
+
+    def agregar(geometria):
+        if not isinstance(geometria, dict):
+            return
+        tipo = geometria.get("type")
+        if tipo == "Feature":
+            agregar(geometria.get("geometry"))
+        elif tipo == "FeatureCollection":
+            for feature in geometria.get("features") or []:
+                agregar(feature)
+        elif tipo == "GeometryCollection":
+            for sub in geometria.get("geometries") or []:
+                agregar(sub)
+        elif tipo == "Polygon":
+            poligonos.append(geometria.get("coordinates") or [])
+        elif tipo == "MultiPolygon":
+            poligonos.extend(geometria.get("coordinates") or [])
+
+    agregar(datos)
+
+    resultado = []
+    for poligono in poligonos:
+        anillos = []
+        for anillo in poligono:
+            puntos = [(float(p[0]), float(p[1])) for p in anillo]
+            if len(puntos) >= 3:
+                anillos.append(puntos)
+        if anillos:
+            resultado.append(anillos)
+
+    if not resultado:
+        raise ValueError("El GeoJSON no contiene polígonos")
+    return resultado
+
+
+def bbox_poligonos(poligonos):
+    """Rectángulo (lat_min, lng_min, lat_max, lng_max) que contiene los polígonos"""
+    lngs = [p[0] for poligono in poligonos for p in poligono[0]]
+    lats = [p[1] for poligono in poligonos for p in poligono[0]]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def _punto_en_anillo(lat: float, lng: float, anillo) -> bool:
+    """Ray casting: cuenta cruces de una semirrecta horizontal con el anillo"""
+    dentro = False
+    j = len(anillo) - 1
+    for i in range(len(anillo)):
+        xi, yi = anillo[i]
+        xj, yj = anillo[j]
+        if (yi > lat) != (yj > lat):
+            x_cruce = xi + (lat - yi) * (xj - xi) / (yj - yi)
+            if lng < x_cruce:
+                dentro = not dentro
+        j = i
+    return dentro
+
+
+def punto_en_poligonos(lat: float, lng: float, poligonos) -> bool:
+    """True si el punto está dentro de algún polígono (y fuera de sus huecos)"""
+    for anillos in poligonos:
+        if _punto_en_anillo(lat, lng, anillos[0]) and not any(
+            _punto_en_anillo(lat, lng, hueco) for hueco in anillos[1:]
+        ):
+            return True
+    return False
@@ -0,0 +1,187 @@
+import os
+import re
+import uuid
+import logging
+from urllib.parse import urlparse
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Imágenes de productos: la subida se copia a disco por bloques fuera del
+# event loop y se generan variantes de tamaño en WebP y JPEG. Se sirven desde
+# el mount /uploads con el nombre <id>_<variante>.<formato>; el original no
+# se guarda.
+
+DIRECTORIO_PRODUCTOS = "uploads/productos"
+URL_PRODUCTOS = "/uploads/productos"
+HOSTS_LOCALES = ("127.0.0.1", "localhost")
+
+EXTENSIONES_PERMITIDAS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+TAMANO_BLOQUE = 1024 * 1024
+TAMANO_MAXIMO_SUBIDA = 15 * 1024 * 1024
+
+# Lado mayor en píxeles de cada variante
+VARIANTES = {
+    "thumb": 160,   # tablas y PDF
+    "card": 480,    # tarjetas del catálogo y detalle
+    "full": 1200,   # vista ampliada
+}
+FORMATOS = ("webp", "jpg")
+# Variante que se guarda en productos.imagen
+VARIANTE_PRINCIPAL = "card"
+
+CALIDAD_WEBP = 80
+CALIDAD_JPEG = 82
+
+_PATRON_VARIANTE = re.compile(r"^(?P<base>.+)_(?:%s)\.(?:%s)$" % ("|".join(VARIANTES), "|".join(FORMATOS)))
+
+
+def ruta_variante(imagen: str, variante: str, formato: str = "jpg"):
+    """
+    Ruta o URL de otra variante de una imagen guardada por este módulo
+    ('/uploads/productos/abc_card.jpg' -> '/uploads/productos/abc_thumb.webp').
+    Devuelve None para imágenes antiguas sin variantes.
+    """
+    coincidencia = _PATRON_VARIANTE.match(imagen or "")
+    if not coincidencia:
+        return None
+    return f"{coincidencia.group('base')}_{variante}.{formato}"
+
+
+def clave_imagen(nombre_archivo: str) -> str:
+    """
+    Identificador común de un archivo y sus variantes
+    ('abc_thumb.webp' -> 'abc'); para imágenes sin variantes, el nombre completo.
+    """
+    coincidencia = _PATRON_VARIANTE.match(nombre_archivo)
+    return coincidencia.group("base") if coincidencia else nombre_archivo
+
+
+def _copiar_subida(origen, destino: str):
+    """Copia el archivo subido por bloques, cortando si supera el tamaño máximo"""
+    copiados = 0
+    with open(destino, "wb") as archivo:
+        while True:
+            bloque = origen.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            copiados += len(bloque)
+            if copiados > TAMANO_MAXIMO_SUBIDA:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"La imagen supera el máximo de {TAMANO_MAXIMO_SUBIDA // (1024 * 1024)} MB"
+                )
+            archivo.write(bloque)
+
+
+def _a_rgb(img):
+    """Aplana la transparencia sobre fondo blanco (JPEG no tiene canal alfa)"""
+    from PIL import Image as PILImage
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        fondo = PILImage.new("RGB", img.size, (255, 255, 255))
+        fondo.paste(img, mask=img.getchannel("A"))
+        return fondo
+    return img.convert("RGB")
+
+
+def generar_variantes(ruta_original: str, directorio: str, base: str) -> list:
+    """Genera <base>_<variante>.webp/.jpg en `directorio` y devuelve las rutas creadas"""
+    # PIL se carga con la primera imagen procesada, no al arrancar el worker
+    from PIL import Image as PILImage, ImageOps
+
+    creadas = []
+    try:
+        with PILImage.open(ruta_original) as original:
+            # En JPEG decodifica directamente a una escala reducida
+            original.draft("RGB", (VARIANTES["full"], VARIANTES["full"]))
+            img = ImageOps.exif_transpose(original)
+            img.load()
+    except PILImage.DecompressionBombError as e:
+        # No hereda de OSError: sin esto una imagen de dimensiones enormes llega como 500
+        logger.warning(f"Imagen demasiado grande {ruta_original}: {e}")
+        raise HTTPException(status_code=400, detail="La imagen tiene demasiados píxeles")
+    except (PILImage.UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Imagen inválida {ruta_original}: {e}")
+        raise HTTPException(status_code=400, detail="El archivo no es una imagen válida")
+
+    con_alfa = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA") if con_alfa else img.convert("RGB")
+    try:
+        # De mayor a menor: cada variante se reduce a partir de la anterior
+        for variante, lado in sorted(VARIANTES.items(), key=lambda item: -item[1]):
+            img.thumbnail((lado, lado), PILImage.Resampling.LANCZOS)
+            ruta_webp = os.path.join(directorio, f"{base}_{variante}.webp")
+            img.save(ruta_webp, "WEBP", quality=CALIDAD_WEBP, method=4)
+            creadas.append(ruta_webp)
+            ruta_jpg = os.path.join(directorio, f"{base}_{variante}.jpg")
+            _a_rgb(img).save(ruta_jpg, "JPEG", quality=CALIDAD_JPEG, optimize=True, progressive=True)
+            creadas.append(ruta_jpg)
+    except Exception:
+        for ruta in creadas:
+            _eliminar_archivo(ruta)
+        raise
+    return creadas
+
+
+async def guardar_imagen_producto(imagen: UploadFile, directorio: str = DIRECTORIO_PRODUCTOS) -> str:
+    """
+    Guarda la imagen subida de un producto y devuelve la URL relativa de su
+    variante principal, que es lo que se almacena en productos.imagen.
+    La escritura y el procesamiento corren en el threadpool, no en el event loop.
+    """
+    extension = os.path.splitext(imagen.filename or "")[1].lower()
+    if extension not in EXTENSIONES_PERMITIDAS:
+        raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
+
+    os.makedirs(directorio, exist_ok=True)
+    base = uuid.uuid4().hex
+    temporal = os.path.join(directorio, f"{base}.subida")
+    try:
+        await run_in_threadpool(_copiar_subida, imagen.file, temporal)
+        await run_in_threadpool(generar_variantes, temporal, directorio, base)
+    finally:
+        _eliminar_archivo(temporal)
+
+    return f"{URL_PRODUCTOS}/{base}_{VARIANTE_PRINCIPAL}.jpg"
+
+
+def _eliminar_archivo(ruta: str):
+    try:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    except OSError as e:
+        logger.warning(f"No se pudo eliminar {ruta}: {e}")
+
+
+def ruta_local(imagen: str):
+    """
+    Ruta en disco de una imagen guardada como '/uploads/...', como nombre
+    suelto o como URL de este mismo servidor (la que arma url_imagen).
+    """
+    if not imagen:
+        return None
+    if imagen.startswith("http"):
+        url = urlparse(imagen)
+        if url.hostname not in HOSTS_LOCALES or not url.path.startswith("/uploads/"):
+            return None
+        imagen = url.path
+    if imagen.startswith("/uploads/"):
+        return imagen[1:]
+    return f"{DIRECTORIO_PRODUCTOS}/{imagen}"
+
+
+def eliminar_imagen_producto(imagen: str):
+    """Elimina del disco la imagen de un producto junto con todas sus variantes"""
+    ruta = ruta_local(imagen)
+    if not ruta:
+        return
+    rutas = [ruta]
+    for variante in VARIANTES:
+        for formato in FORMATOS:
+            otra = ruta_variante(ruta, variante, formato)
+            if otra:
+                rutas.append(otra)
+    for ruta in set(rutas):
+        _eliminar_archivo(ruta)
@@ -0,0 +1,315 @@
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+
+from utils.metricas_sql import estadisticas_actuales
+
+# Métricas en formato de texto de Prometheus, sin dependencias externas.
+# Registrar una observación es una búsqueda binaria y unas sumas bajo un lock;
+# los valores que ya existen en otro lado (pool de conexiones, threadpool,
+# lru_cache) se leen recién al exponer /metrics. Cada proceso (worker) tiene
+# sus propias métricas.
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_RENDER = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Etiqueta para requests que no coinciden con ninguna ruta (evita una serie por URL)
+RUTA_DESCONOCIDA = "sin_ruta"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: tuple, valores: tuple, extra: str = "") -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores_etiquetas, cantidad: float = 1):
+        with self._lock:
+            self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def valor(self, *valores_etiquetas) -> float:
+        return self._valores.get(valores_etiquetas, 0)
+
+    def total(self) -> float:
+        """Suma de todas las series"""
+        with self._lock:
+            return sum(self._valores.values())
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            valores = list(self._valores.items())
+        for clave, valor in sorted(valores):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_HTTP):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = tuple(sorted(buckets))
+        # clave de etiquetas -> [conteos por bucket (+Inf al final), suma]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_etiquetas):
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = [(clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items()]
+        for clave, conteos, suma in sorted(series):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                etiquetas = _etiquetas(self.etiquetas, clave, f'le="{_numero(limite)}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+
+class Medidor:
+    """Gauge; con `funcion`, el valor (o dict etiquetas -> valor) se lee al exponer"""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), funcion=None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.funcion = funcion
+        self._valor = 0
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: float = 1):
+        with self._lock:
+            self._valor += cantidad
+
+    def dec(self, cantidad: float = 1):
+        with self._lock:
+            self._valor -= cantidad
+
+    def valor(self):
+        return self.funcion() if self.funcion is not None else self._valor
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        valores = self.valor()
+        if not isinstance(valores, dict):
+            valores = {(): valores}
+        for clave, valor in sorted(valores.items()):
+            if valor is not None:
+                lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exponer(self) -> str:
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+registro = RegistroMetricas()
+
+requests_totales = registro.registrar(Contador(
+    "vendly_http_requests_total", "Requests HTTP atendidos", ("metodo", "ruta", "estado")
+))
+duracion_requests = registro.registrar(Histograma(
+    "vendly_http_request_duration_seconds", "Latencia de los requests HTTP por plantilla de ruta",
+    ("metodo", "ruta"), BUCKETS_HTTP
+))
+requests_en_curso = registro.registrar(Medidor(
+    "vendly_http_requests_en_curso", "Requests HTTP en curso"
+))
+consultas_sql = registro.registrar(Contador(
+    "vendly_db_consultas_total", "Consultas SQL ejecutadas por plantilla de ruta", ("ruta",)
+))
+tiempo_sql = registro.registrar(Contador(
+    "vendly_db_tiempo_segundos_total", "Tiempo en consultas SQL por plantilla de ruta", ("ruta",)
+))
+duracion_render = registro.registrar(Histograma(
+    "vendly_render_duration_seconds", "Duración de la generación de PDF y Excel", ("tipo",), BUCKETS_RENDER
+))
+cache_aciertos = registro.registrar(Contador(
+    "vendly_cache_aciertos_total", "Aciertos de caché", ("cache",)
+))
+cache_fallos = registro.registrar(Contador(
+    "vendly_cache_fallos_total", "Fallos de caché", ("cache",)
+))
+
+# Cachés lru_cache que se reportan leyendo cache_info() al exponer: nombre -> función
+_caches_lru = {}
+
+
+def registrar_cache_lru(nombre: str, funcion):
+    _caches_lru[nombre] = funcion
+
+
+def _ratio_aciertos_caches() -> dict:
+    ratios = {}
+    for (nombre,) in set(cache_aciertos._valores) | set(cache_fallos._valores):
+        aciertos = cache_aciertos.valor(nombre)
+        total = aciertos + cache_fallos.valor(nombre)
+        ratios[(nombre,)] = round(aciertos / total, 4) if total else None
+    for nombre, funcion in _caches_lru.items():
+        info = funcion.cache_info()
+        total = info.hits + info.misses
+        ratios[(nombre,)] = round(info.hits / total, 4) if total else None
+    return ratios
+
+
+def _estado_caches_lru():
+    lineas = []
+    for tipo, atributo in (("counter", "hits"), ("counter", "misses"), ("gauge", "currsize")):
+        nombre = f"vendly_cache_lru_{atributo}" + ("_total" if tipo == "counter" else "")
+        lineas += [f"# HELP {nombre} {atributo} de las cachés lru_cache", f"# TYPE {nombre} {tipo}"]
+        for cache, funcion in sorted(_caches_lru.items()):
+            lineas.append(f'{nombre}{{cache="{cache}"}} {getattr(funcion.cache_info(), atributo)}')
+    return lineas
+
+
+class _MetricasCachesLRU:
+    def exponer(self) -> list:
+        return _estado_caches_lru()
+
+
+registro.registrar(Medidor(
+    "vendly_cache_ratio_aciertos", "Proporción de aciertos de cada caché", ("cache",), _ratio_aciertos_caches
+))
+registro.registrar(_MetricasCachesLRU())
+
+
+def registrar_pool(engine):
+    """Gauges del pool de conexiones de `engine` (QueuePool; otros pools se omiten)"""
+    def lector(metodo):
+        def leer():
+            funcion = getattr(engine.pool, metodo, None)
+            return funcion() if callable(funcion) else None
+        return leer
+
+    registro.registrar(Medidor("vendly_db_pool_tamano", "Conexiones del pool base", funcion=lector("size")))
+    registro.registrar(Medidor("vendly_db_pool_en_uso", "Conexiones prestadas (checked out)", funcion=lector("checkedout")))
+    registro.registrar(Medidor("vendly_db_pool_desborde", "Conexiones de desborde (overflow) abiertas", funcion=lector("overflow")))
+    registro.registrar(Medidor("vendly_db_pool_libres", "Conexiones libres en el pool", funcion=lector("checkedin")))
+
+
+def _estado_threadpool():
+    # Solo se puede leer desde el event loop (el endpoint /metrics es async)
+    from anyio import to_thread
+    limitador = to_thread.current_default_thread_limiter()
+    estadisticas = limitador.statistics()
+    return {
+        ("ocupados",): estadisticas.borrowed_tokens,
+        ("capacidad",): limitador.total_tokens,
+        ("en_espera",): estadisticas.tasks_waiting,
+    }
+
+
+registro.registrar(Medidor(
+    "vendly_threadpool_hilos", "Threadpool de endpoints síncronos: hilos ocupados, capacidad y tareas en espera",
+    ("estado",), _estado_threadpool
+))
+
+
+def medir_render(tipo: str):
+    """Decorador que registra la duración de una generación de PDF/Excel"""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                duracion_render.observar(time.perf_counter() - inicio, tipo)
+        return envoltura
+    return decorador
+
+
+def _plantilla_ruta(scope) -> str:
+    """Plantilla de la ruta que atendió el request ('/productos/{id_producto}')"""
+    ruta = scope.get("route")
+    plantilla = getattr(ruta, "path_format", None)
+    path = scope["path"]
+    if plantilla is None:
+        for montaje in getattr(scope.get("app"), "routes", ()):
+            if type(montaje).__name__ == "Mount" and path.startswith(montaje.path + "/"):
+                return montaje.path + "/{path}"
+        return RUTA_DESCONOCIDA
+    return plantilla
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que registra latencia, estado y requests en curso por
+    plantilla de ruta, y las consultas SQL del request (si corre dentro de
+    MetricasSQLMiddleware).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        inicio = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+
+        requests_en_curso.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            requests_en_curso.dec()
+            duracion = time.perf_counter() - inicio
+            ruta = _plantilla_ruta(scope)
+            metodo = scope["method"]
+            duracion_requests.observar(duracion, metodo, ruta)
+            requests_totales.inc(metodo, ruta, str(estado))
+            estadisticas = estadisticas_actuales()
+            if estadisticas is not None and estadisticas.consultas:
+                consultas_sql.inc(ruta, cantidad=estadisticas.consultas)
+                tiempo_sql.inc(ruta, cantidad=estadisticas.tiempo_ms / 1000)
@@ -0,0 +1,144 @@
+import os
+import time
+import logging
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Un request que supera cualquiera de estos umbrales se registra como WARNING
+# junto con su consulta más lenta (se configuran por variable de entorno)
+UMBRAL_REQUEST_LENTO_MS = float(os.getenv("UMBRAL_REQUEST_LENTO_MS", "500"))
+UMBRAL_CONSULTAS_REQUEST = int(os.getenv("UMBRAL_CONSULTAS_REQUEST", "30"))
+# Largo máximo de la sentencia SQL que se escribe en el log
+LARGO_MAXIMO_SENTENCIA = 300
+
+
+class EstadisticasSQL:
+    """Consultas ejecutadas durante un request"""
+
+    __slots__ = ("consultas", "tiempo_ms", "mas_lenta_ms", "sentencia_mas_lenta")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_ms = 0.0
+        self.mas_lenta_ms = 0.0
+        self.sentencia_mas_lenta = None
+
+    def registrar(self, sentencia: str, duracion_ms: float):
+        self.consultas += 1
+        self.tiempo_ms += duracion_ms
+        if duracion_ms > self.mas_lenta_ms:
+            self.mas_lenta_ms = duracion_ms
+            self.sentencia_mas_lenta = sentencia
+
+
+# El objeto es mutable: los endpoints síncronos corren en el threadpool con
+# una copia del contexto, pero la copia apunta al mismo EstadisticasSQL
+_estadisticas_request: ContextVar = ContextVar("estadisticas_sql", default=None)
+
+
+def estadisticas_actuales():
+    """EstadisticasSQL del request en curso, o None fuera de un request"""
+    return _estadisticas_request.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if _estadisticas_request.get() is not None:
+        conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    estadisticas = _estadisticas_request.get()
+    inicios = conn.info.get("inicio_consultas")
+    if estadisticas is None or not inicios:
+        return
+    estadisticas.registrar(statement, (time.perf_counter() - inicios.pop()) * 1000)
+
+
+@event.listens_for(Engine, "handle_error")
+def _consulta_fallida(contexto_error):
+    # Si la consulta falla no hay after_cursor_execute: se saca aquí su inicio
+    # para que no quede en la conexión (vuelve al pool) ni desfase las siguientes
+    conexion = contexto_error.connection
+    inicios = conexion.info.get("inicio_consultas") if conexion is not None else None
+    if not inicios:
+        return
+    inicio = inicios.pop()
+    estadisticas = _estadisticas_request.get()
+    if estadisticas is not None and contexto_error.statement:
+        estadisticas.registrar(contexto_error.statement, (time.perf_counter() - inicio) * 1000)
+
+
+def _sentencia_para_log(sentencia):
+    if not sentencia:
+        return None
+    sentencia = " ".join(sentencia.split())
+    if len(sentencia) > LARGO_MAXIMO_SENTENCIA:
+        return sentencia[:LARGO_MAXIMO_SENTENCIA] + "..."
+    return sentencia
+
+
+class MetricasSQLMiddleware:
+    """
+    Middleware ASGI que mide las consultas SQL de cada request (con eventos
+    del engine) y las expone en los headers X-DB-Queries, X-DB-Time-Ms,
+    X-DB-Slowest-Ms y Server-Timing, además de una línea de log por request.
+    Los requests lentos o con demasiadas consultas (N+1) se registran como
+    WARNING con la sentencia más lenta.
+    """
+
+    def __init__(self, app, umbral_ms: float = UMBRAL_REQUEST_LENTO_MS,
+                 umbral_consultas: int = UMBRAL_CONSULTAS_REQUEST):
+        self.app = app
+        self.umbral_ms = umbral_ms
+        self.umbral_consultas = umbral_consultas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estadisticas = EstadisticasSQL()
+        token = _estadisticas_request.set(estadisticas)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def send_wrapper(message):
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(estadisticas.consultas)
+                headers["X-DB-Time-Ms"] = f"{estadisticas.tiempo_ms:.1f}"
+                headers["X-DB-Slowest-Ms"] = f"{estadisticas.mas_lenta_ms:.1f}"
+                headers.append("Server-Timing", f"db;dur={estadisticas.tiempo_ms:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _estadisticas_request.reset(token)
+            self._registrar(scope, estado, estadisticas, (time.perf_counter() - inicio) * 1000)
+
+    def _registrar(self, scope, estado: int, estadisticas: EstadisticasSQL, total_ms: float):
+        lento = total_ms >= self.umbral_ms or estadisticas.consultas >= self.umbral_consultas
+        datos = {
+            "metodo": scope["method"],
+            "ruta": scope["path"],
+            "estado": estado,
+            "total_ms": round(total_ms, 1),
+            "consultas": estadisticas.consultas,
+            "db_ms": round(estadisticas.tiempo_ms, 1),
+            "mas_lenta_ms": round(estadisticas.mas_lenta_ms, 1),
+        }
+        mensaje = " ".join(f"{clave}={valor}" for clave, valor in datos.items())
+        if lento:
+            datos["sentencia_mas_lenta"] = _sentencia_para_log(estadisticas.sentencia_mas_lenta)
+            logger.warning(f"request lento {mensaje} sql={datos['sentencia_mas_lenta']!r}", extra={"sql_request": datos})
+        else:
+            logger.info(f"request {mensaje}", extra={"sql_request": datos})
@@ -0,0 +1,113 @@
+import os
+import time
+import logging
+import importlib
+from sqlalchemy import Column, Integer, MetaData, String, Table, TIMESTAMP, func, insert, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+# Migraciones del esquema en orden: (versión, módulo dentro de migraciones/).
+# Cada módulo define DESCRIPCION y aplicar(engine). La 1 crea las tablas a
+# partir de models.py, así que en una base nueva ya deja las columnas e
+# índices de las siguientes: toda migración debe poder correr sobre un
+# esquema que ya tiene sus cambios (IF NOT EXISTS, revisar columnas, etc.).
+MIGRACIONES = [
+    (1, "m0001_esquema_inicial"),
+    (2, "m0002_geohash_ubicaciones"),
+    (3, "m0003_indices_productos"),
+    (4, "m0004_indices_claves_foraneas"),
+    (5, "m0005_stock_entero"),
+    (6, "m0006_idempotencia_pedidos"),
+    (7, "m0007_sincronizacion"),
+    (8, "m0008_registro_cambios"),
+    (9, "m0009_revocacion_tokens"),
+    (10, "m0010_movimientos_producto_eliminado"),
+    (11, "m0011_versiones_sin_bloqueo"),
+]
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+# Clave del advisory lock de PostgreSQL que serializa a los procesos que migran
+CLAVE_LOCK_MIGRACIONES = 7_310_043
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String(200)),
+    Column("aplicada_en", TIMESTAMP, server_default=func.now()),
+)
+
+
+class EsquemaDesactualizado(RuntimeError):
+    pass
+
+
+def version_actual(engine) -> int:
+    """Versión aplicada del esquema con una sola consulta (0 si nunca se migró)"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        # La tabla schema_version todavía no existe
+        return 0
+
+
+def pendientes(version: int) -> list:
+    return [(numero, modulo) for numero, modulo in MIGRACIONES if numero > version]
+
+
+def aplicar_migraciones(engine) -> list:
+    """
+    Aplica las migraciones pendientes y registra cada una en schema_version.
+    En PostgreSQL un advisory lock hace que, si varios procesos llaman a la
+    vez, uno migre y los demás esperen y encuentren el esquema al día.
+    Devuelve las versiones aplicadas por este proceso.
+    """
+    aplicadas = []
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as lock:
+        if postgres:
+            lock.execute(text("SELECT pg_advisory_lock(:clave)"), {"clave": CLAVE_LOCK_MIGRACIONES})
+        try:
+            _metadata.create_all(engine)
+            for numero, nombre in pendientes(version_actual(engine)):
+                modulo = importlib.import_module(f"migraciones.{nombre}")
+                logger.info(f"Aplicando migración {numero}: {modulo.DESCRIPCION}")
+                inicio = time.perf_counter()
+                modulo.aplicar(engine)
+                with engine.begin() as conn:
+                    conn.execute(insert(schema_version).values(version=numero, descripcion=modulo.DESCRIPCION))
+                logger.info(f"Migración {numero} aplicada en {time.perf_counter() - inicio:.1f} s")
+                aplicadas.append(numero)
+        finally:
+            if postgres:
+                lock.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": CLAVE_LOCK_MIGRACIONES})
+    return aplicadas
+
+
+def verificar_esquema(engine, modo: str = None) -> int:
+    """
+    Chequeo de arranque de un worker, según MIGRAR_AL_INICIAR:
+    - "verificar" (por defecto): si el esquema está atrasado, falla sin tocar
+      la base (las migraciones se corren con scripts/migrar.py o en el
+      on_starting de gunicorn, una sola vez)
+    - "auto": si está atrasado, aplica las migraciones; solo para un proceso
+      único en desarrollo, con `uvicorn --workers N` migraría cada worker
+    - "no": no consulta nada (ya lo verificó el proceso maestro o el deploy)
+    Con el esquema al día cuesta una sola consulta.
+    """
+    modo = modo or os.getenv("MIGRAR_AL_INICIAR", "verificar")
+    if modo == "no":
+        return VERSION_ESQUEMA
+
+    version = version_actual(engine)
+    if version >= VERSION_ESQUEMA:
+        return version
+    if modo == "verificar":
+        raise EsquemaDesactualizado(
+            f"Esquema en la versión {version}, se requiere la {VERSION_ESQUEMA}: "
+            f"ejecute python scripts/migrar.py"
+        )
+    aplicar_migraciones(engine)
+    return VERSION_ESQUEMA
@@ -0,0 +1,189 @@
+import time
+
+from utils.geo import RADIO_TIERRA_KM
+
+# Optimización del orden de visita de una ruta (camino abierto):
+# semilla por vecino más cercano y mejora local 2-opt / Or-opt sobre una
+# matriz de distancias haversine calculada con NumPy. NumPy se importa
+# dentro de cada función: ruta_controller importa este módulo al arrancar
+# y solo la optimización lo necesita.
+
+TIEMPO_MAXIMO_DEFECTO_MS = 2000
+# La matriz de distancias es densa, (n+2)² float64: con 1000 paradas ya son
+# 8 MB por request. Rutas más grandes se deben dividir antes de optimizar.
+MAXIMO_PARADAS = 1000
+LONGITUD_MAXIMA_OR_OPT = 3
+_EPSILON = 1e-9
+
+
+def matriz_distancias(lats, lngs):
+    """Matriz NxN de distancias haversine en kilómetros"""
+    import numpy as np
+
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lng = np.radians(np.asarray(lngs, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def longitud_camino(distancias, orden) -> float:
+    """Longitud de recorrer los nodos en el orden dado (sin volver al inicio)"""
+    import numpy as np
+
+    orden = np.asarray(orden, dtype=int)
+    if len(orden) < 2:
+        return 0.0
+    return float(distancias[orden[:-1], orden[1:]].sum())
+
+
+def vecino_mas_cercano(distancias, inicio: int = 0) -> list:
+    """Recorrido semilla: siempre ir al nodo no visitado más cercano"""
+    import numpy as np
+
+    n = len(distancias)
+    visitado = np.zeros(n, dtype=bool)
+    orden = [inicio]
+    visitado[inicio] = True
+    actual = inicio
+    for _ in range(n - 1):
+        fila = np.where(visitado, np.inf, distancias[actual])
+        actual = int(np.argmin(fila))
+        visitado[actual] = True
+        orden.append(actual)
+    return orden
+
+
+def _pasada_2opt(d, camino, limite: float) -> bool:
+    """
+    Una pasada de 2-opt: para cada i invierte el tramo camino[i..j] con la
+    mejor j. Los extremos del camino están fijos.
+    """
+    import numpy as np
+
+    mejorado = False
+    ultimo = len(camino) - 1
+    for i in range(1, ultimo - 1):
+        if time.perf_counter() > limite:
+            break
+        a, b = camino[i - 1], camino[i]
+        js = np.arange(i + 1, ultimo)
+        c = camino[js]
+        e = camino[js + 1]
+        delta = d[a, c] + d[b, e] - d[a, b] - d[c, e]
+        k = int(np.argmin(delta))
+        if delta[k] < -_EPSILON:
+            j = js[k]
+            camino[i:j + 1] = camino[i:j + 1][::-1]
+            mejorado = True
+    return mejorado
+
+
+def _pasada_or_opt(d, camino, limite: float):
+    """
+    Una pasada de Or-opt: mueve tramos de 1 a 3 nodos (opcionalmente
+    invertidos) a la posición donde más acortan el camino.
+    """
+    import numpy as np
+
+    mejorado = False
+    for largo in range(1, LONGITUD_MAXIMA_OR_OPT + 1):
+        i = 1
+        while i + largo < len(camino):
+            if time.perf_counter() > limite:
+                return camino, mejorado
+            primero, ultimo_tramo = camino[i], camino[i + largo - 1]
+            antes, despues = camino[i - 1], camino[i + largo]
+            ahorro = d[antes, primero] + d[ultimo_tramo, despues] - d[antes, despues]
+
+            resto = np.concatenate((camino[:i], camino[i + largo:]))
+            p = resto[:-1]
+            q = resto[1:]
+            directo = d[p, primero] + d[ultimo_tramo, q] - d[p, q]
+            invertido = d[p, ultimo_tramo] + d[primero, q] - d[p, q]
+            # La posición original no cuenta como movimiento
+            directo[i - 1] = np.inf
+            invertido[i - 1] = np.inf
+
+            k_directo = int(np.argmin(directo))
+            k_invertido = int(np.argmin(invertido))
+            if directo[k_directo] <= invertido[k_invertido]:
+                k, costo, tramo = k_directo, directo[k_directo], camino[i:i + largo]
+            else:
+                k, costo, tramo = k_invertido, invertido[k_invertido], camino[i:i + largo][::-1]
+
+            if costo - ahorro < -_EPSILON:
+                camino = np.concatenate((resto[:k + 1], tramo, resto[k + 1:]))
+                mejorado = True
+            i += 1
+    return camino, mejorado
+
+
+def optimizar_orden(lats, lngs, inicio=None, tiempo_maximo_ms: int = TIEMPO_MAXIMO_DEFECTO_MS) -> dict:
+    """
+    Calcula un orden de visita corto para las paradas (lats[i], lngs[i]).
+
+    `inicio` es un punto (lat, lng) opcional desde el que parte el recorrido
+    (bodega, posición del vendedor); sin él, el recorrido empieza en la parada
+    que resulte más conveniente. El recorrido no vuelve al inicio.
+    La mejora local se detiene al agotar `tiempo_maximo_ms`.
+
+    Devuelve el orden (índices de las paradas) y las distancias en km.
+    """
+    import numpy as np
+
+    n = len(lats)
+    if n > MAXIMO_PARADAS:
+        raise ValueError(f"La ruta tiene {n} paradas; el máximo para optimizar es {MAXIMO_PARADAS}")
+    t0 = time.perf_counter()
+    limite = t0 + tiempo_maximo_ms / 1000
+    if n == 0:
+        return {"orden": [], "distancia_inicial_km": 0.0, "distancia_km": 0.0, "tiempo_ms": 0.0, "completo": True}
+
+    puntos_lat = list(lats)
+    puntos_lng = list(lngs)
+    if inicio is not None:
+        puntos_lat.append(inicio[0])
+        puntos_lng.append(inicio[1])
+
+    # Nodo ficticio a distancia 0 de todos: cierra el camino abierto
+    m = len(puntos_lat)
+    d = np.zeros((m + 1, m + 1))
+    d[:m, :m] = matriz_distancias(puntos_lat, puntos_lng)
+    ficticio = m
+    origen = n if inicio is not None else ficticio
+
+    distancia_inicial = longitud_camino(d, [origen] + list(range(n)))
+
+    if inicio is not None:
+        semilla = vecino_mas_cercano(d[:m, :m], n)
+    else:
+        # Sin punto de inicio: la semilla parte de la parada más periférica
+        semilla = vecino_mas_cercano(d[:n, :n], int(np.argmax(d[:n, :n].sum(axis=1))))
+    paradas = [nodo for nodo in semilla if nodo < n]
+    camino = np.array([origen] + paradas + [ficticio], dtype=int)
+
+    completo = False
+    while time.perf_counter() < limite:
+        mejorado = _pasada_2opt(d, camino, limite)
+        camino, mejorado_or = _pasada_or_opt(d, camino, limite)
+        if not (mejorado or mejorado_or):
+            # Sin mejoras en una pasada entera: óptimo local alcanzado
+            completo = time.perf_counter() < limite
+            break
+
+    orden = [int(nodo) for nodo in camino[1:-1]]
+    distancia = longitud_camino(d, [origen] + orden)
+    if distancia > distancia_inicial:
+        # El orden actual ya era mejor: no se empeora
+        orden = list(range(n))
+        distancia = distancia_inicial
+
+    return {
+        "orden": orden,
+        "distancia_inicial_km": round(distancia_inicial, 4),
+        "distancia_km": round(distancia, 4),
+        "tiempo_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "completo": completo,
+    }
@@ -0,0 +1,163 @@
+import threading
+
+# Motor de precios de pedidos. Los precios e IVA de los productos se guardan
+# en arreglos NumPy ordenados por id_producto; una cotización ubica todas sus
+# líneas con np.searchsorted y calcula precios, descuentos, IVA y totales en
+# una sola pasada vectorizada. NumPy se importa al primer uso (como pandas y
+# reportlab, ver scripts/bench_arranque.py): importar el módulo no lo carga.
+
+# Tipos de cliente que compran a precio mayorista
+TIPOS_MAYORISTA = {"juridico", "mayorista"}
+
+
+class LineaInvalida(ValueError):
+    pass
+
+
+class ProductosNoEncontrados(LookupError):
+    def __init__(self, ids):
+        super().__init__(f"Productos no encontrados: {ids}")
+        self.ids = ids
+
+
+class ProductosSinPrecio(LookupError):
+    def __init__(self, ids):
+        super().__init__(f"Productos sin precio de venta: {ids}")
+        self.ids = ids
+
+
+def es_mayorista(tipo_cliente: str) -> bool:
+    return (tipo_cliente or "").strip().lower() in TIPOS_MAYORISTA
+
+
+def redondear(valores):
+    """Redondeo monetario a centavos, mitad hacia arriba (np.round redondea al par)"""
+    import numpy as np
+
+    return np.floor(np.asarray(valores, dtype=np.float64) * 100 + 0.5 + 1e-9) / 100
+
+
+class TablaPrecios:
+    """Precios e IVA de un conjunto de productos en arreglos paralelos ordenados por id"""
+
+    def __init__(self, filas):
+        import numpy as np
+
+        filas = sorted(filas, key=lambda fila: fila[0])
+        self.ids = np.array([fila[0] for fila in filas], dtype=np.int64)
+        self.nombres = [fila[1] for fila in filas]
+        # None -> NaN: un precio faltante se detecta con np.isnan
+        self.minorista = np.array([fila[2] for fila in filas], dtype=np.float64)
+        self.mayorista = np.array([fila[3] for fila in filas], dtype=np.float64)
+        self.iva = np.nan_to_num(np.array([fila[4] for fila in filas], dtype=np.float64))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posiciones(self, ids):
+        """Posición de cada id (arreglo NumPy) en la tabla; ProductosNoEncontrados si falta alguno"""
+        import numpy as np
+
+        if not len(self.ids):
+            raise ProductosNoEncontrados(sorted(set(ids.tolist())))
+        posiciones = np.searchsorted(self.ids, ids)
+        posiciones = np.minimum(posiciones, len(self.ids) - 1)
+        faltan = self.ids[posiciones] != ids
+        if faltan.any():
+            raise ProductosNoEncontrados(sorted(set(ids[faltan].tolist())))
+        return posiciones
+
+
+def cotizar(tabla: TablaPrecios, lineas: list, mayorista: bool) -> dict:
+    """
+    Calcula un carrito. Cada línea es {"id_producto", "cantidad", "descuento"},
+    con el descuento como porcentaje (0-100) sobre el subtotal de la línea.
+    El precio unitario es el mayorista o el minorista del producto (si no
+    tiene precio mayorista se usa el minorista) y el IVA es la tarifa del
+    producto sobre el subtotal con descuento. ProductosSinPrecio si alguno
+    no tiene precio que aplicar (nunca se vende a 0).
+    """
+    import numpy as np
+
+    if not lineas:
+        raise LineaInvalida("El pedido no tiene líneas")
+    try:
+        ids = np.array([int(linea["id_producto"]) for linea in lineas], dtype=np.int64)
+        cantidades = np.array([int(linea.get("cantidad", 1)) for linea in lineas], dtype=np.int64)
+        descuentos = np.array([float(linea.get("descuento") or 0) for linea in lineas], dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        raise LineaInvalida("Cada línea necesita id_producto y cantidad enteros y un descuento numérico")
+    if (cantidades <= 0).any():
+        raise LineaInvalida("Las cantidades deben ser mayores a cero")
+    if ((descuentos < 0) | (descuentos > 100)).any():
+        raise LineaInvalida("El descuento es un porcentaje entre 0 y 100")
+
+    posiciones = tabla.posiciones(ids)
+    precios = tabla.minorista[posiciones]
+    if mayorista:
+        precios = np.where(np.isnan(tabla.mayorista[posiciones]), precios, tabla.mayorista[posiciones])
+    sin_precio = np.isnan(precios)
+    if sin_precio.any():
+        raise ProductosSinPrecio(sorted(set(ids[sin_precio].tolist())))
+    precios = redondear(precios)
+
+    subtotal_lineal = redondear(cantidades * precios)
+    subtotal = redondear(subtotal_lineal * (1 - descuentos / 100))
+    tasas = tabla.iva[posiciones]
+    iva = redondear(subtotal * tasas)
+
+    total_subtotal = float(redondear(subtotal.sum()))
+    total_iva = float(redondear(iva.sum()))
+    return {
+        "tipo_precio": "mayorista" if mayorista else "minorista",
+        "subtotal": total_subtotal,
+        "iva": total_iva,
+        "total": float(redondear(total_subtotal + total_iva)),
+        "detalle_pedido": [
+            {
+                "id_producto": int(ids[i]),
+                "nombre": tabla.nombres[posiciones[i]],
+                "cantidad": int(cantidades[i]),
+                "precio_unitario": float(precios[i]),
+                "descuento": float(descuentos[i]),
+                "subtotal_lineal": float(subtotal_lineal[i]),
+                "subtotal": float(subtotal[i]),
+                "tarifa_iva": float(tasas[i]),
+                "iva": float(iva[i]),
+            }
+            for i in range(len(ids))
+        ],
+    }
+
+
+class CachePrecios:
+    """
+    Tabla de precios de todos los productos, compartida por el worker. Se
+    carga con una sola consulta y se invalida cuando sube la versión de
+    productos (cambio confirmado en cualquier worker, ver utils/cambios.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tabla = None
+
+    def obtener(self, cargar_filas) -> TablaPrecios:
+        """cargar_filas() -> filas (id, nombre, minorista, mayorista, iva); solo se llama si hace falta"""
+        tabla = self._tabla
+        if tabla is not None:
+            return tabla
+        with self._lock:
+            if self._tabla is None:
+                self._tabla = TablaPrecios(cargar_filas())
+            return self._tabla
+
+    def invalidar(self):
+        with self._lock:
+            self._tabla = None
+
+    @property
+    def cargada(self) -> bool:
+        return self._tabla is not None
+
+
+cache_precios = CachePrecios()
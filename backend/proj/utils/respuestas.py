@@ -0,0 +1,71 @@
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, List
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import inspect as sa_inspect
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el json estándar
+    orjson = None
+
+
+def _default(obj: Any):
+    """Serializa los tipos que orjson/json no manejan de forma nativa"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+class RespuestaJSONRapida(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson.
+
+    Las rutas que la devuelven directamente evitan la pasada de
+    jsonable_encoder de FastAPI; el contenido debe ser dicts/listas con
+    tipos simples (fechas y Decimal se convierten aquí).
+    Si el contenido ya son bytes JSON, se envían tal cual.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=_default,
+        ).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _adaptador_lista(schema):
+    """TypeAdapter cacheado por esquema (construirlo es costoso)"""
+    return TypeAdapter(List[schema])
+
+
+def respuesta_lista(schema, objetos) -> RespuestaJSONRapida:
+    """
+    Valida objetos ORM contra el esquema de respuesta y los serializa a JSON
+    en un solo paso dentro de pydantic-core, sin pasar por jsonable_encoder
+    """
+    adaptador = _adaptador_lista(schema)
+    return RespuestaJSONRapida(
+        adaptador.dump_json(adaptador.validate_python(objetos, from_attributes=True))
+    )
+
+
+def columnas(modelo, schema) -> list:
+    """
+    Columnas del modelo ORM que el esquema de respuesta necesita,
+    para usarlas con load_only
+    """
+    columnas_modelo = sa_inspect(modelo).column_attrs.keys()
+    return [getattr(modelo, campo) for campo in schema.model_fields if campo in columnas_modelo]
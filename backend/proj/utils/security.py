@@ -1,10 +1,17 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.models import TokenRevocado, Usuario
+from utils.cambios import monitor_versiones
 import hashlib
 import secrets
+import threading
+import time
 
 # Configuración para el hashing de contraseñas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -13,6 +20,7 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = "tu_clave_secreta_super_segura_aqui"  # En producción, usa variables de entorno
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 def generate_salt() -> str:
     """Genera un salt aleatorio"""
@@ -42,22 +50,175 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crea un token JWT"""
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.setdefault("type", "access")
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": secrets.token_hex(16)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> dict:
-    """Verifica y decodifica un token JWT"""
+def create_refresh_token(identificacion: str, expires_delta: Optional[timedelta] = None):
+    """Crea un token de refresco de larga duración (solo contiene el usuario)"""
+    if expires_delta is None:
+        expires_delta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    return create_access_token(
+        data={"sub": identificacion, "type": "refresh"},
+        expires_delta=expires_delta
+    )
+
+def build_user_claims(usuario) -> dict:
+    """Claims firmados de rol y estado que viajan en el token de acceso"""
+    return {
+        "sub": usuario.identificacion,
+        "rol": usuario.id_rol,
+        "rol_desc": usuario.rol.descripcion if usuario.rol else "",
+        "estado": usuario.estado,
+    }
+
+# La revocación vive en la base (token_revocado y usuarios.tokens_validos_desde)
+# para que valga en todos los workers y sobreviva a sus reinicios. Cada
+# worker la consulta en memoria (CacheRevocaciones) y la vuelve a leer cuando
+# cambian esas tablas.
+
+def _a_columna(momento: datetime) -> datetime:
+    # Las columnas TIMESTAMP (sin zona) guardan la hora UTC
+    return momento.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _desde_columna(valor: datetime) -> float:
+    return valor.replace(tzinfo=timezone.utc).timestamp()
+
+def revoke_token(db: Session, payload: dict) -> bool:
+    """
+    Revoca un token (access o refresh) a partir de su payload decodificado
+    y confirma la transacción. Devuelve False si ya estaba revocado (dos
+    requests que rotan el mismo refresh token a la vez: solo uno gana).
+    """
+    jti = payload.get("jti")
+    if not jti:
+        return False
+    ahora = datetime.now(timezone.utc)
+    exp = datetime.fromtimestamp(payload["exp"], timezone.utc) if payload.get("exp") else ahora
+    # Los jti que ya expiraron por sí solos no hace falta recordarlos
+    db.execute(delete(TokenRevocado).where(TokenRevocado.exp <= _a_columna(ahora)))
+    if db.get(TokenRevocado, jti) is not None:
+        db.commit()
+        return False
+    db.add(TokenRevocado(jti=jti, exp=_a_columna(exp)))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+def revoke_user_tokens(usuario: Usuario):
+    """Invalida todos los tokens emitidos al usuario hasta ahora (el commit lo hace quien llama)"""
+    usuario.tokens_validos_desde = _a_columna(datetime.now(timezone.utc))
+
+class CacheRevocaciones:
+    """
+    Revocaciones vistas por este worker, para no consultar la base en cada
+    request autenticado:
+
+    - jti revocados de tokens de acceso: los de token_revocado que expiran
+      en las próximas dos vidas de un token de acceso, así la carga sirve
+      para los tokens emitidos durante la siguiente media vida. Los tokens
+      de vida más larga (refresh) se consultan en la base: solo se usan en
+      /refresh y /logout, que escriben de todos modos.
+    - por usuario, desde cuándo valen sus tokens (None: el usuario no existe),
+      cargado a demanda.
+
+    Se descartan cuando cambian token_revocado o usuarios (utils/cambios.py):
+    al instante si el cambio es de este worker y en la siguiente lectura
+    periódica de registro_cambio si es de otro.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = None
+        self._hasta = 0.0
+        self._usuarios = {}
+
+    def _jti_revocado(self, db: Session, payload: dict) -> bool:
+        jti = payload.get("jti")
+        if not jti:
+            return False
+        if payload.get("exp", 0) > time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60:
+            return db.get(TokenRevocado, jti) is not None
+        jtis = self._jtis
+        if jtis is not None and payload.get("exp", 0) <= self._hasta:
+            return jti in jtis
+        with self._lock:
+            # Los jti cargados solo cubren los tokens que expiran antes de _hasta
+            if self._jtis is None or payload.get("exp", 0) > self._hasta:
+                ahora = datetime.now(timezone.utc)
+                hasta = ahora + timedelta(minutes=2 * ACCESS_TOKEN_EXPIRE_MINUTES)
+                self._jtis = frozenset(db.execute(
+                    select(TokenRevocado.jti).where(
+                        TokenRevocado.exp > _a_columna(ahora), TokenRevocado.exp <= _a_columna(hasta)
+                    )
+                ).scalars())
+                self._hasta = hasta.timestamp()
+            return jti in self._jtis
+
+    def _validos_desde(self, db: Session, identificacion: str):
+        usuarios = self._usuarios
+        if identificacion in usuarios:
+            return usuarios[identificacion]
+        with self._lock:
+            if identificacion not in self._usuarios:
+                fila = db.execute(
+                    select(Usuario.tokens_validos_desde).where(Usuario.identificacion == identificacion)
+                ).first()
+                if fila is None:
+                    self._usuarios[identificacion] = None
+                else:
+                    self._usuarios[identificacion] = _desde_columna(fila[0]) if fila[0] is not None else 0.0
+            return self._usuarios[identificacion]
+
+    def revocado(self, db: Session, payload: dict) -> bool:
+        """jti revocado, tokens del usuario invalidados o usuario eliminado"""
+        if self._jti_revocado(db, payload):
+            return True
+        validos_desde = self._validos_desde(db, payload.get("sub"))
+        return validos_desde is None or payload.get("iat", 0) < validos_desde
+
+    def invalidar_tokens(self):
+        with self._lock:
+            self._jtis = None
+
+    def invalidar_usuarios(self):
+        with self._lock:
+            self._usuarios = {}
+
+
+cache_revocaciones = CacheRevocaciones()
+
+monitor_versiones.suscribir({"token_revocado"}, lambda _: cache_revocaciones.invalidar_tokens())
+monitor_versiones.suscribir({"usuarios"}, lambda _: cache_revocaciones.invalidar_usuarios())
+
+def is_token_revoked(db: Session, payload: dict) -> bool:
+    """Revocación del token según la caché de este worker (ver CacheRevocaciones)"""
+    return cache_revocaciones.revocado(db, payload)
+
+def verify_token(token: str, db: Session, expected_type: str = "access") -> dict:
+    """Verifica y decodifica un token JWT (firma, expiración, tipo y revocación)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+    
+    # Los tokens emitidos antes de los refresh tokens no tienen "type" y son de acceso
+    if payload.get("type", "access") != expected_type or is_token_revoked(db, payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
\ No newline at end of file
@@ -50,6 +50,9 @@ export const authService = {
           localStorage.setItem('authToken', data.access_token);
           localStorage.setItem('access_token', data.access_token);
           localStorage.setItem('token_type', data.token_type || 'bearer');
+          if (data.refresh_token) {
+            localStorage.setItem('refresh_token', data.refresh_token);
+          }
           console.log('Token guardado correctamente:', data.access_token.substring(0, 20) + '...');
         } catch (storageError) {
           console.error('Error guardando token en localStorage:', storageError);